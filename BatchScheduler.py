@@ -0,0 +1,231 @@
+import os
+import threading
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+from PoleCore import PoleVerifier, ORDER_BY_CAPTURE
+from FolderScan import FolderScanner
+from LogChannel import DEBUG, INFO, WARNING, ERROR, print_log, ignore
+from RunControl import RunControl
+
+# Verification jobs that may run at once, and how many of them may share one disk
+DEFAULT_MAX_JOBS = 4
+DEFAULT_PER_DISK = 1
+
+def disk_key(folder):
+    """ Identify the device a folder lives on, so jobs on one SD card / NAS share don't thrash it. """
+    try:
+        return os.stat(folder).st_dev
+    except OSError:
+        return os.path.splitdrive(os.path.abspath(folder))[0] or folder
+
+####################################################################
+
+class VerifyJob:
+    """ One folder + node name in a batch, with its live status and final report. """
+
+    def __init__(self, folder, node_name):
+        self.folder = os.path.abspath(folder)
+        self.node_name = node_name
+        self.output_folder = os.path.join(self.folder, node_name)
+        self.disk = disk_key(self.folder)
+        self.status = "queued"  # queued -> running -> done / failed / cancelled
+        self.image_count = 0
+        self.progress = 0.0
+        self.processed = 0
+        self.rate = 0.0  # Images per second
+        self.pole_count = 0
+        self.report = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "folder": self.folder,
+            "node": self.node_name,
+            "output_folder": self.output_folder,
+            "status": self.status,
+            "image_count": self.image_count,
+            "pole_count": self.pole_count,
+            "error": self.error,
+            "summary": self.report["summary"] if self.report else None,
+        }
+
+####################################################################
+
+class BatchScheduler:
+    """ Runs many VerifyJobs on a pool, at most max_jobs at once and per_disk per device.
+
+    Jobs can be submitted while run() is going; run() returns once the queue is drained.
+    pause() / resume() hold and release every running job; cancel() stops them (their queued
+    pole moves still finish) and drops the jobs that have not started.
+    Callbacks: log(message, color, level), on_progress(job) and on_job_finished(job).
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, per_disk=DEFAULT_PER_DISK, max_workers=None,
+                 use_processes=False, use_cache=True, cache_path=None, log=None, on_progress=None, on_job_finished=None,
+                 log_level=DEBUG, order=ORDER_BY_CAPTURE, resume=False, control=None, profile=None,
+                 rules=None, dedupe=False, fingerprint_path=None, use_pole_index=True, pole_index_path=None):
+        self.max_jobs = max(1, max_jobs)
+        self.per_disk = max(1, per_disk)
+        self.max_workers = max_workers  # Metadata reader threads per job
+        self.use_processes = use_processes  # Worker processes instead of threads
+        self.use_cache = use_cache
+        self.cache_path = cache_path
+        self.log = log or print_log
+        self.on_progress = on_progress or ignore
+        self.on_job_finished = on_job_finished or ignore
+        self.log_level = log_level
+        self.order = order
+        self.resume = resume  # Continue jobs from the checkpoint of an interrupted run
+        self.control = control or RunControl()  # Shared by all jobs
+        self.profile = profile  # RunProfile shared by all jobs, or None
+        self.rules = rules      # PoleRules for every job, None = the defaults
+        self.dedupe = dedupe    # Skip copies of images seen in this or any earlier job
+        self.fingerprint_path = fingerprint_path
+        self.use_pole_index = use_pole_index  # Flag poles flown again, here or in any earlier job
+        self.pole_index_path = pole_index_path
+
+        self.jobs = []
+        self._pending = deque()
+        self._running = 0
+        self._running_per_disk = Counter()
+        self._closed = False
+        self._lock = threading.Condition()
+
+    def submit(self, folder, node_name):
+        """ Queue a job. Returns None if run() has already drained the queue and exited. """
+        job = VerifyJob(folder, node_name)
+        with self._lock:
+            if self._closed or self.control.cancelled:
+                return None
+            self.jobs.append(job)
+            self._pending.append(job)
+            self._lock.notify_all()
+        return job
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            while True:
+                with self._lock:
+                    self._drop_cancelled()
+                    job = self._next_runnable()
+                    while job is None:
+                        if not self._pending and self._running == 0:
+                            self._closed = True
+                            break
+                        self._lock.wait()
+                        self._drop_cancelled()
+                        job = self._next_runnable()
+                    if job is None:
+                        break
+                    self._running += 1
+                    self._running_per_disk[job.disk] += 1
+                    job.status = "running"
+                executor.submit(self._run_job, job)
+        return self.jobs
+
+    def cancel(self):
+        self.control.cancel()
+        with self._lock:
+            self._lock.notify_all()
+
+    def pause(self):
+        self.control.pause()
+
+    def resume(self):
+        self.control.resume()
+
+    def totals(self):
+        """ Aggregate counters over all submitted jobs; progress is the mean job percentage,
+        rate the combined images/s of the running jobs and eta the seconds left at that rate
+        for the images found so far. """
+        with self._lock:
+            jobs = list(self.jobs)
+        rate = sum(job.rate for job in jobs if job.status == "running")
+        remaining = sum(job.image_count - job.processed for job in jobs if job.status == "running")
+        return {
+            "jobs": len(jobs),
+            "done": sum(1 for job in jobs if job.status == "done"),
+            "failed": sum(1 for job in jobs if job.status == "failed"),
+            "cancelled": sum(1 for job in jobs if job.status == "cancelled"),
+            "images": sum(job.image_count for job in jobs),
+            "processed": sum(job.processed for job in jobs),
+            "rate": rate,
+            "eta": remaining / rate if rate > 0 else 0.0,
+            "poles": sum(job.pole_count for job in jobs),
+            "progress": sum(job.progress for job in jobs) / len(jobs) if jobs else 0.0,
+        }
+
+    def _drop_cancelled(self):
+        """ After cancel(), queued jobs never start (caller holds the lock). """
+        if not self.control.cancelled:
+            return
+        while self._pending:
+            job = self._pending.popleft()
+            job.status = "cancelled"
+            self.log(f"[{job.node_name}] Cancelled before it started", "orange", WARNING)
+
+    def _next_runnable(self):
+        """ First queued job whose disk still has a free slot (caller holds the lock). """
+        if self._running >= self.max_jobs:
+            return None
+        for job in self._pending:
+            if self._running_per_disk[job.disk] < self.per_disk:
+                self._pending.remove(job)
+                return job
+        return None
+
+    def _run_job(self, job):
+        log = lambda message, color=None, level=INFO: self.log(f"[{job.node_name}] {message}", color, level)
+        try:
+            if not os.path.exists(job.output_folder):
+                os.makedirs(job.output_folder)
+                log(f"Created output folder at: {job.output_folder}")
+
+            # Images are streamed from the walk straight into the pipeline; the output folder
+            # lives inside the tree and must not be re-read while poles are moved into it
+            log(f"Scanning {job.folder}...")
+            scanner = FolderScanner(job.folder, exclude=[job.output_folder], profile=self.profile)
+
+            verifier = PoleVerifier(scanner, job.output_folder,
+                                    max_workers=self.max_workers,
+                                    use_processes=self.use_processes,
+                                    use_cache=self.use_cache,
+                                    cache_path=self.cache_path,
+                                    log=log,
+                                    log_level=self.log_level,
+                                    order=self.order,
+                                    resume=self.resume,
+                                    control=self.control,
+                                    profile=self.profile,
+                                    rules=self.rules,
+                                    dedupe=self.dedupe,
+                                    fingerprint_path=self.fingerprint_path,
+                                    use_pole_index=self.use_pole_index,
+                                    pole_index_path=self.pole_index_path,
+                                    progress=lambda *args: self._job_progress(job, *args),
+                                    pole_count=lambda count: self._job_poles(job, count))
+            job.report = verifier.run()
+            job.image_count = scanner.found
+            job.status = "cancelled" if job.report["cancelled"] else "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            log(f"Job failed: {e}", "red", ERROR)
+        finally:
+            job.progress = 100.0
+            with self._lock:
+                self._running -= 1
+                self._running_per_disk[job.disk] -= 1
+                self._lock.notify_all()
+            self.on_job_finished(job)
+
+    def _job_progress(self, job, processed, total, rate, eta):
+        job.processed = processed
+        job.image_count = total
+        job.progress = processed / total * 100 if total else 100.0
+        job.rate = rate
+        self.on_progress(job)
+
+    def _job_poles(self, job, count):
+        job.pole_count = count
+        self.on_progress(job)
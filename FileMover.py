@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from LogChannel import INFO, ERROR, print_log, ignore
+from FolderScan import OUTPUT_MARKER
+from RunControl import RunControl
+
+# Parallel move streams; renames are instant, cross-volume copies benefit from a few at once
+DEFAULT_MOVE_WORKERS = 4
+# Copy size for moves across volumes
+MOVE_CHUNK_SIZE = 4 * 1024 * 1024
+# Poles that may wait for the mover; submit() blocks beyond that (slow cross-volume copies)
+MAX_QUEUED_BATCHES = 64
+JOURNAL_NAME = '.poleio-moves.jsonl'
+PARTIAL_SUFFIX = '.poleio-partial'
+
+####################################################################
+
+def same_volume(src, dst_folder):
+    try:
+        return os.stat(src).st_dev == os.stat(dst_folder).st_dev
+    except OSError:
+        return False
+
+def move_file(src, dst):
+    """ Move one file: an atomic rename on the same volume, otherwise a chunked copy to a
+    temporary name, fsync, rename into place and only then unlink the source. Returns the
+    number of bytes copied (0 for a rename). """
+    if same_volume(src, os.path.dirname(dst)):
+        os.rename(src, dst)
+        return 0
+
+    partial = dst + PARTIAL_SUFFIX
+    copied = 0
+    try:
+        with open(src, 'rb') as fsrc, open(partial, 'wb') as fdst:
+            while True:
+                chunk = fsrc.read(MOVE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                fdst.write(chunk)
+                copied += len(chunk)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        shutil.copystat(src, partial)
+        os.replace(partial, dst)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.remove(src)
+    return copied
+
+####################################################################
+
+class MoveJournal:
+    """ Append-only JSON-lines log of move batches, so an interrupted or failed batch can be
+    rolled back or finished later. Records: begin (with all planned moves), moved (one per
+    file), commit / rollback. Every record names the run that wrote it, as batch ids (pole
+    numbers) repeat from one run to the next. """
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record, sync=False):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_path, 'a')
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def close(self, remove=False):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if remove and os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+    def batches(self):
+        """ {key: {"run": run_id, "batch": batch_id, "moves": [[src, dst], ...], "done":
+        [[src, dst], ...], "state": "open" / "commit" / "rollback"}} for every batch in the
+        journal, in journal order. A batch begun again by the same run (a resumed run moving
+        a rewound pole anew) is kept as a separate entry; the records that follow apply to
+        the latest one. """
+        batches = {}
+        if not os.path.exists(self.journal_path):
+            return batches
+        latest = {}  # (run, batch) -> key of its latest begin
+        with open(self.journal_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                run_id = record.get("run")
+                batch_id = record.get("batch")
+                op = record.get("op")
+                if op == "begin":
+                    key = f"{run_id}:{batch_id}" if run_id is not None else str(batch_id)
+                    base = key
+                    generation = 1
+                    while key in batches:
+                        generation += 1
+                        key = f"{base}#{generation}"
+                    batches[key] = {"run": run_id, "batch": batch_id, "moves": record["moves"], "done": [],
+                                    "state": "open"}
+                    latest[(run_id, batch_id)] = key
+                    continue
+                key = latest.get((run_id, batch_id))
+                if key is None:
+                    continue
+                if op == "moved":
+                    batches[key]["done"].append([record["src"], record["dst"]])
+                elif op in ("commit", "rollback"):
+                    batches[key]["state"] = op
+        return batches
+
+    def open_batches(self):
+        """ The batches that were begun but never committed or rolled back. """
+        return {batch_id: batch for batch_id, batch in self.batches().items() if batch["state"] == "open"}
+
+####################################################################
+
+class FileMover:
+    """ Moves pole batches into an output folder on its own worker pool, so sequence detection
+    never waits on file I/O. The files of a batch move in parallel; if any of them fails,
+    the ones already moved are put back and the batch is rolled back as a whole.
+
+    A paused `control` (RunControl) holds batches that have not started yet. Cancelling does
+    not stop the mover: every submitted batch still completes or rolls back, so no pole is
+    left half moved.
+
+    Batches are journaled under `run_id` (a new one if not given), so a later run reusing
+    the same batch ids never hides them. Callbacks: log(message, color, level),
+    on_batch_done(batch_id, moved_ok) and on_files_moved(batch_id, [(src, dst), ...]) for
+    every committed batch, just before its on_batch_done. A RunProfile gets one "move"
+    record per file, with the bytes copied.
+    """
+
+    def __init__(self, output_folder, max_workers=DEFAULT_MOVE_WORKERS, log=None, on_batch_done=None,
+                 control=None, profile=None, max_queued=MAX_QUEUED_BATCHES, on_files_moved=None,
+                 run_id=None):
+        self.output_folder = output_folder
+        self.run_id = run_id or uuid.uuid4().hex
+        self.log = log or print_log
+        self.on_batch_done = on_batch_done or ignore
+        self.on_files_moved = on_files_moved or ignore
+        self.control = control or RunControl()
+        self.profile = profile
+        self.journal = MoveJournal(os.path.join(output_folder, JOURNAL_NAME))
+        self.failed_batches = 0
+        # Marks the folder as ours, so later scans of the input tree skip it
+        open(os.path.join(output_folder, OUTPUT_MARKER), 'a').close()
+        # A journal left open by a crashed run must survive this run, until it is recovered
+        self.keep_journal = bool(self.journal.open_batches())
+        if self.keep_journal:
+            self.log(f"{output_folder} has unfinished moves from an earlier run; "
+                     f"use 'PoleIO-CLI.py recover' to roll them back or finish them", "red", ERROR)
+        self._files = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="FileMover")
+        # Batches are coordinated on a separate small pool so they never starve the file pool
+        self._batches = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="MoveBatch")
+        self._reserved = set()
+        self._lock = threading.Lock()
+        self._queue_slots = threading.Semaphore(max(1, max_queued))
+
+    def destination_for(self, src):
+        """ Pick a free name in the output folder; repeated file names (counter resets, other
+        folders) get a _1, _2... suffix instead of overwriting an earlier pole's image. """
+        name, ext = os.path.splitext(os.path.basename(src))
+        with self._lock:
+            candidate = os.path.join(self.output_folder, name + ext)
+            suffix = 1
+            while candidate in self._reserved or os.path.exists(candidate):
+                candidate = os.path.join(self.output_folder, f"{name}_{suffix}{ext}")
+                suffix += 1
+            self._reserved.add(candidate)
+        return candidate
+
+    def submit(self, batch_id, image_paths):
+        """ Queue a batch of source paths; returns a Future resolving to True if all moved.
+        Blocks while max_queued batches are already waiting. """
+        self._queue_slots.acquire()
+        try:
+            moves = [[src, self.destination_for(src)] for src in image_paths]
+            self.journal.write({"run": self.run_id, "batch": batch_id, "op": "begin", "moves": moves}, sync=True)
+            return self._batches.submit(self._run_batch, batch_id, moves)
+        except BaseException:
+            self._queue_slots.release()
+            raise
+
+    def close(self):
+        """ Wait for every queued batch; the journal is removed if nothing is left open. """
+        self._batches.shutdown(wait=True)
+        self._files.shutdown(wait=True)
+        self.journal.close(remove=self.failed_batches == 0 and not self.keep_journal)
+
+    def _run_batch(self, batch_id, moves):
+        try:
+            return self._move_batch(batch_id, moves)
+        finally:
+            # Moved files now exist (and rolled back ones are gone), so the names need no reservation
+            with self._lock:
+                self._reserved.difference_update(dst for _, dst in moves)
+            self._queue_slots.release()
+
+    def _move_batch(self, batch_id, moves):
+        self.control.wait_while_paused()
+        futures = [(src, dst, self._files.submit(self._move_one, batch_id, src, dst)) for src, dst in moves]
+        done = []
+        error = None
+        for src, dst, future in futures:
+            try:
+                future.result()
+                done.append((src, dst))
+            except Exception as e:
+                error = error or e
+
+        if error is None:
+            self.journal.write({"run": self.run_id, "batch": batch_id, "op": "commit"})
+            self.log(f"Moved {len(moves)} images to {self.output_folder}", "black", INFO)
+            self.on_files_moved(batch_id, done)
+            self.on_batch_done(batch_id, True)
+            return True
+
+        self.log(f"Error moving images of pole #{batch_id}: {error}; rolling back", "red", ERROR)
+        if self.rollback(batch_id, done):
+            self.journal.write({"run": self.run_id, "batch": batch_id, "op": "rollback"})
+        else:
+            self.failed_batches += 1  # Keep the journal so the batch can be recovered by hand
+        self.on_batch_done(batch_id, False)
+        return False
+
+    def _move_one(self, batch_id, src, dst):
+        start = time.perf_counter()
+        copied = move_file(src, dst)
+        if self.profile is not None:
+            self.profile.record("move", time.perf_counter() - start, copied)
+        self.journal.write({"run": self.run_id, "batch": batch_id, "op": "moved", "src": src, "dst": dst})
+
+    def rollback(self, batch_id, done):
+        ok = True
+        for src, dst in reversed(done):
+            try:
+                move_file(dst, src)
+            except Exception as e:
+                ok = False
+                self.log(f"Could not roll back {dst} -> {src}: {e}", "red", ERROR)
+        return ok
+
+####################################################################
+
+def recover_moves(output_folder, resume=False, log=None):
+    """ Finish (resume=True) or undo (resume=False) the batches crashed runs left open in
+    output_folder's journal. Returns the number of batches recovered. """
+    return _recover(output_folder, lambda batch: ("finish" if resume else "undo")
+                    if batch["state"] == "open" else None, log or print_log)
+
+def rewind_moves(output_folder, run_id, last_batch, log=None, on_files_moved=None):
+    """ Bring output_folder back to a checkpoint run `run_id` took after batch `last_batch`:
+    its open batches up to it are finished, every batch after it is undone, even if it was
+    committed. Batch ids must be pole numbers; batches of other runs are left alone.
+    on_files_moved(batch_id, [(src, dst), ...]) is called for every batch finished. Returns
+    the number of batches recovered. """
+    def action(batch):
+        if batch["run"] != run_id:
+            return None
+        try:
+            after_checkpoint = int(batch["batch"]) > last_batch
+        except (TypeError, ValueError):
+            after_checkpoint = False
+        if after_checkpoint:
+            return "undo" if batch["state"] != "rollback" else None
+        return "finish" if batch["state"] == "open" else None
+    return _recover(output_folder, action, log or print_log, on_files_moved)
+
+def _remove_partial(path):
+    # Left behind by a cross-volume copy that was cut short
+    if os.path.exists(path + PARTIAL_SUFFIX):
+        os.remove(path + PARTIAL_SUFFIX)
+
+def _recover(output_folder, action, log, on_files_moved=None):
+    journal = MoveJournal(os.path.join(output_folder, JOURNAL_NAME))
+    batches = journal.batches()
+    recovered = 0
+    failed = 0
+    still_open = 0
+    for key, batch in batches.items():
+        todo = action(batch)
+        if todo is None:
+            still_open += batch["state"] == "open"
+            continue
+        record = {"run": batch["run"], "batch": batch["batch"]}
+        try:
+            if todo == "finish":
+                for src, dst in batch["moves"]:
+                    _remove_partial(dst)
+                    if not os.path.exists(src):
+                        continue  # Already moved
+                    if os.path.exists(dst):
+                        os.remove(src)  # Crashed after the copy landed but before the unlink
+                    else:
+                        move_file(src, dst)
+                journal.write(dict(record, op="commit"))
+                log(f"Completed the moves of batch {key}", "green", INFO)
+                if on_files_moved is not None:
+                    on_files_moved(batch["batch"], [tuple(move) for move in batch["moves"]])
+            else:
+                for src, dst in reversed(batch["moves"]):
+                    _remove_partial(dst)
+                    _remove_partial(src)
+                    if not os.path.exists(dst):
+                        continue  # Never moved
+                    if os.path.exists(src):
+                        os.remove(dst)  # Complete copy of a source that was never unlinked
+                    else:
+                        move_file(dst, src)
+                journal.write(dict(record, op="rollback"))
+                log(f"Rolled back batch {key}", "orange", INFO)
+            recovered += 1
+        except Exception as e:
+            failed += 1
+            log(f"Could not recover batch {key}: {e}", "red", ERROR)
+    # Open batches of other runs keep the journal, until they are recovered too
+    journal.close(remove=failed == 0 and still_open == 0)
+    return recovered
@@ -0,0 +1,260 @@
+import os
+import time
+import sqlite3
+import hashlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from FolderScan import ImageEntry
+from LogChannel import WARNING, ignore
+from SqliteStore import SqliteStore
+
+FINGERPRINT_FILE_NAME = 'fingerprints.sqlite'
+# Quick fingerprint: the head (JPEG headers: EXIF capture time to the sub-second, DJI XMP with
+# gimbal and GPS), a few evenly spaced samples of the image data and the tail, plus the size
+FINGERPRINT_HEAD = 64 * 1024
+FINGERPRINT_SAMPLES = 4
+FINGERPRINT_SAMPLE_SIZE = 4096
+FULL_HASH_CHUNK = 1024 * 1024
+DEFAULT_FINGERPRINT_WORKERS = 8
+PREFETCH_PER_WORKER = 4
+# Rows kept in the index; the least recently seen are dropped past this
+DEFAULT_MAX_FINGERPRINTS = 500000
+
+####################################################################
+
+def quick_fingerprint(image_path, size=None):
+    """ 16-byte blake2b over the file size, the first FINGERPRINT_HEAD bytes, FINGERPRINT_SAMPLES
+    sampled ranges and the last block. Small files are hashed whole. Returns (digest, bytes read). """
+    if size is None:
+        size = os.path.getsize(image_path)
+    digest = hashlib.blake2b(size.to_bytes(8, 'little'), digest_size=16)
+    read = 0
+    with open(image_path, 'rb') as f:
+        if size <= FINGERPRINT_HEAD + (FINGERPRINT_SAMPLES + 1) * FINGERPRINT_SAMPLE_SIZE:
+            data = f.read()
+            digest.update(data)
+            return digest.digest(), len(data)
+
+        head = f.read(FINGERPRINT_HEAD)
+        digest.update(head)
+        read += len(head)
+        span = size - FINGERPRINT_HEAD - FINGERPRINT_SAMPLE_SIZE
+        for index in range(1, FINGERPRINT_SAMPLES + 1):
+            f.seek(FINGERPRINT_HEAD + span * index // (FINGERPRINT_SAMPLES + 1))
+            sample = f.read(FINGERPRINT_SAMPLE_SIZE)
+            digest.update(sample)
+            read += len(sample)
+        f.seek(size - FINGERPRINT_SAMPLE_SIZE)
+        tail = f.read(FINGERPRINT_SAMPLE_SIZE)
+        digest.update(tail)
+        read += len(tail)
+    return digest.digest(), read
+
+def full_fingerprint(image_path):
+    """ 32-byte blake2b of the whole file, to confirm a quick fingerprint match. """
+    digest = hashlib.blake2b(digest_size=32)
+    with open(image_path, 'rb') as f:
+        while True:
+            chunk = f.read(FULL_HASH_CHUNK)
+            if not chunk:
+                return digest.digest()
+            digest.update(chunk)
+
+####################################################################
+
+class FingerprintIndex(SqliteStore):
+    """ Persistent index of image fingerprints, shared by all folders and jobs, to spot the
+    same frame copied twice (re-copied SD cards, merged card dumps).
+
+    check() registers a file and returns the path of an earlier identical copy, if any. A
+    quick fingerprint match is confirmed with a full hash of both files before anything
+    is called a duplicate; copies that have changed or disappeared are forgotten. Files
+    moved into an output folder are relocate()d, so later jobs still find them.
+
+    Not thread-safe, like MetadataCache: use it on the thread that runs the verification.
+    """
+    FILE_NAME = FINGERPRINT_FILE_NAME
+    TABLE = 'files'
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS files ("
+              " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, quick BLOB, full BLOB,"
+              " duplicate_of TEXT, last_used REAL)",
+              "CREATE INDEX IF NOT EXISTS files_quick ON files (quick)",
+              "CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+
+    def __init__(self, index_path=None, max_entries=DEFAULT_MAX_FINGERPRINTS):
+        super().__init__(index_path, max_entries)
+        self.full_hashes = 0  # Files read whole to confirm a match
+
+    def known(self, image_path, size, mtime_ns):
+        """ (quick fingerprint, duplicate_of) of an unchanged indexed file, else None. """
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, quick, duplicate_of FROM files WHERE path = ?", (image_path,)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            return None
+        return row[2], row[3]
+
+    def check(self, image_path, size, mtime_ns, quick):
+        """ Register a file; returns the path of an earlier identical copy, or None. """
+        known = self.known(image_path, size, mtime_ns)
+        if known is not None and known[0] == quick:
+            self.touch(image_path)
+            return known[1]
+
+        full = None
+        candidates = self.conn.execute(
+            "SELECT path, size, mtime_ns, full FROM files WHERE quick = ? AND path != ? AND duplicate_of IS NULL",
+            (quick, image_path)).fetchall()
+        for other_path, other_size, other_mtime_ns, other_full in candidates:
+            try:
+                stat = os.stat(other_path)
+            except OSError:
+                stat = None
+            if stat is None or stat.st_size != other_size or stat.st_mtime_ns != other_mtime_ns:
+                self._forget(other_path)  # Gone or changed since it was indexed
+                continue
+            if full is None:
+                full = self._full_hash(image_path)
+            if other_full is None:
+                other_full = self._full_hash(other_path)
+                self.conn.execute("UPDATE files SET full = ? WHERE path = ?", (other_full, other_path))
+            if other_full == full:
+                self._put(image_path, size, mtime_ns, quick, full, other_path)
+                return other_path
+
+        self._put(image_path, size, mtime_ns, quick, full, None)
+        return None
+
+    def relocate(self, src, dst):
+        """ A registered file was moved (e.g. into a pole's output folder). """
+        self.conn.execute("DELETE FROM files WHERE path = ?", (dst,))
+        # Counts as a use: a touch() still pending would miss the row under its new path
+        self.conn.execute("UPDATE files SET path = ?, last_used = ? WHERE path = ?", (dst, time.time(), src))
+        self.conn.execute("UPDATE files SET duplicate_of = ? WHERE duplicate_of = ?", (dst, src))
+        self.wrote()
+
+    def _full_hash(self, image_path):
+        self.full_hashes += 1
+        return full_fingerprint(image_path)
+
+    def _put(self, image_path, size, mtime_ns, quick, full, duplicate_of):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, quick, full, duplicate_of, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)", (image_path, size, mtime_ns, quick, full, duplicate_of, time.time()))
+        self.wrote()
+
+    def _forget(self, image_path):
+        self.conn.execute("DELETE FROM files WHERE path = ?", (image_path,))
+        # Copies that pointed at it are checked again the next time they are seen
+        self.conn.execute("DELETE FROM files WHERE duplicate_of = ?", (image_path,))
+        self.wrote()
+
+####################################################################
+
+def iter_unique(image_files, index, on_duplicate=None, max_workers=DEFAULT_FINGERPRINT_WORKERS, profile=None,
+                log=None):
+    """ Yield the items of image_files (paths or ImageEntry objects, any iterable) that are not
+    copies of an image already in the FingerprintIndex, in their original order.
+
+    Quick fingerprints are computed ahead on a thread pool (unchanged files already in the
+    index are not read at all); the index itself is only used on the calling thread.
+    on_duplicate(path, original_path) is called for every skipped copy. A RunProfile gets a
+    "fingerprint" record (with the bytes read) per file hashed. With max_workers=1 files are
+    hashed inline, without looking ahead (for streams that block, like a FolderWatcher).
+    If the index file can't be used (locked by another job past SQLite's timeout), that is
+    logged and every file after it is passed through unchecked.
+    """
+    on_duplicate = on_duplicate or ignore
+    log = log or ignore
+    prefetch = max(1, max_workers) * PREFETCH_PER_WORKER
+    pending = deque()
+    files = iter(image_files)
+
+    def index_failed(error):
+        log(f"Fingerprint index unavailable, not checking for duplicates: {error}", "red", WARNING)
+        return None
+
+    def fingerprint(image_path, size):
+        start = time.perf_counter()
+        quick, read = quick_fingerprint(image_path, size)
+        if profile is not None:
+            profile.record("fingerprint", time.perf_counter() - start, read)
+        return quick
+
+    if max_workers <= 1:
+        for item in files:
+            image_path, size, mtime_ns = _path_and_stat(item)
+            original = None
+            if size is not None and index is not None:
+                try:
+                    known = index.known(image_path, size, mtime_ns)
+                    quick = known[0] if known is not None else fingerprint(image_path, size)
+                    original = index.check(image_path, size, mtime_ns, quick)
+                except OSError:
+                    pass
+                except sqlite3.OperationalError as e:
+                    index = index_failed(e)
+            if original is None:
+                yield item
+            else:
+                on_duplicate(image_path, original)
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="fingerprint") as executor:
+
+        def submit(item):
+            nonlocal index
+            image_path, size, mtime_ns = _path_and_stat(item)
+            if size is None or index is None:
+                pending.append((item, image_path, None, None, None))  # Unreadable: let the metadata pass report it
+                return
+            try:
+                known = index.known(image_path, size, mtime_ns)
+            except sqlite3.OperationalError as e:
+                index = index_failed(e)
+                pending.append((item, image_path, None, None, None))
+                return
+            if known is not None:
+                future = Future()
+                future.set_result(known[0])
+            else:
+                future = executor.submit(fingerprint, image_path, size)
+            pending.append((item, image_path, size, mtime_ns, future))
+
+        try:
+            for item in files:
+                submit(item)
+                if len(pending) >= prefetch:
+                    break
+            while pending:
+                item, image_path, size, mtime_ns, future = pending.popleft()
+                next_item = next(files, None)
+                if next_item is not None:
+                    submit(next_item)
+                if future is None or index is None:
+                    yield item
+                    continue
+                try:
+                    original = index.check(image_path, size, mtime_ns, future.result())
+                except OSError:
+                    original = None  # Vanished while we looked; the metadata pass reports it
+                except sqlite3.OperationalError as e:
+                    index = index_failed(e)
+                    original = None
+                if original is None:
+                    yield item
+                else:
+                    on_duplicate(image_path, original)
+        finally:
+            # Stop the fingerprints queued ahead if the consumer gave up early
+            for entry in pending:
+                if entry[4] is not None:
+                    entry[4].cancel()
+
+def _path_and_stat(item):
+    if isinstance(item, ImageEntry):
+        return item.path, item.size, item.mtime_ns
+    try:
+        stat = os.stat(item)
+    except OSError:
+        return item, None, None
+    return item, stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,125 @@
+import os
+import time
+import queue
+import threading
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Entries the background scanner may get ahead of the pipeline
+SCAN_QUEUE_SIZE = 4096
+# Written into every node output folder; folders holding it are skipped by later scans
+OUTPUT_MARKER = '.poleio-output'
+
+_END = object()
+
+class ImageEntry:
+    """ An image found by the scanner, with the stat info scandir gave us (reused as cache key). """
+    __slots__ = ('path', 'size', 'mtime_ns')
+
+    def __init__(self, path, size, mtime_ns):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self):
+        return f"ImageEntry({self.path!r}, {self.size}, {self.mtime_ns})"
+
+####################################################################
+
+def scan_images(folder_path, exclude=(), profile=None):
+    """ Yield an ImageEntry for every image below folder_path, one directory at a time.
+
+    Same order as the old os.walk + sorted(files): a folder's images (by name) come before
+    its subfolders, and subfolders are visited by name. Folders in `exclude` are skipped,
+    and so are output folders of earlier runs (marked with OUTPUT_MARKER) below folder_path.
+    A RunProfile gets one "scan" record per folder listed.
+    """
+    excluded = {os.path.normcase(os.path.abspath(path)) for path in exclude}
+    stack = [folder_path]
+    while stack:
+        current = stack.pop()
+        start = time.perf_counter()
+        files = []
+        subfolders = []
+        is_output = False
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.normcase(os.path.abspath(entry.path)) not in excluded:
+                                subfolders.append(entry.path)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            files.append(entry)
+                        elif entry.name == OUTPUT_MARKER:
+                            is_output = True
+                    except OSError:
+                        continue
+        except OSError:
+            continue  # Unreadable folder, same as os.walk's default
+        if is_output and current != folder_path:
+            continue  # Poles already moved by an earlier run
+
+        files.sort(key=lambda entry: entry.name)  # Sort files by name (which includes timestamp)
+        images = []
+        for entry in files:
+            try:
+                st = entry.stat()  # Free on Windows, one stat call elsewhere
+            except OSError:
+                continue
+            images.append(ImageEntry(entry.path, st.st_size, st.st_mtime_ns))
+        if profile is not None:
+            profile.record("scan", time.perf_counter() - start)
+
+        yield from images
+        stack.extend(sorted(subfolders, reverse=True))
+
+class FolderScanner:
+    """ Runs scan_images on a background thread and streams its entries to the consumer.
+
+    Iterate it to get ImageEntry objects as soon as each directory has been listed;
+    `found` counts the entries so far and `done` turns True when the walk is finished.
+    """
+
+    def __init__(self, folder_path, exclude=(), max_queued=SCAN_QUEUE_SIZE, profile=None):
+        self.folder_path = folder_path
+        self.exclude = exclude
+        self.profile = profile
+        self.found = 0
+        self.done = False
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._stopped = threading.Event()
+
+    def __iter__(self):
+        thread = threading.Thread(target=self._scan, name="FolderScanner", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._stopped.set()
+
+    def _scan(self):
+        try:
+            for entry in scan_images(self.folder_path, self.exclude, self.profile):
+                if self._stopped.is_set():
+                    return
+                self.found += 1
+                self._put(entry)
+            self.done = True
+            self._put(_END)
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        # Don't block forever if the consumer has gone away
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
@@ -0,0 +1,343 @@
+import os
+import sys
+import time
+import errno
+import bisect
+import itertools
+import select
+import struct
+import ctypes
+import ctypes.util
+from FolderScan import IMAGE_EXTENSIONS, OUTPUT_MARKER, ImageEntry, scan_images
+from LogChannel import INFO, WARNING, print_log, ignore
+from RunControl import RunControl
+
+# A file found by a scan (not seen being written) is complete once its size and mtime have
+# held this long; copies that stall longer than this on a slow card reader would be cut short
+SETTLE_SECONDS = 5.0
+# Seconds between full scans when polling, and between stability checks with inotify
+POLL_INTERVAL = 2.0
+# Files completing this close together are handed out together, in name order
+BATCH_WINDOW = 0.25
+# Longest wait before looking at the RunControl again
+WAKE_INTERVAL = 0.5
+INOTIFY_READ_SIZE = 64 * 1024
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+_libc = None
+
+def _load_libc():
+    """ The C library if it has inotify (Linux), else None. """
+    global _libc
+    if _libc is None:
+        _libc = False
+        if sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                _libc = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc or None
+
+####################################################################
+
+class Inotify:
+    """ Just enough of inotify(7) over ctypes: add watches and read events. """
+
+    def __init__(self):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this system")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1: {os.strerror(error)}")
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"Can't watch {path}: {os.strerror(error)}")
+        return wd
+
+    def read(self, timeout):
+        """ [(wd, mask, name)] of the events queued within `timeout` seconds. """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, INOTIFY_READ_SIZE)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            events.append((wd, mask, os.fsdecode(data[offset:offset + length].rstrip(b'\0'))))
+            offset += length
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+####################################################################
+
+class FolderWatcher:
+    """ Streams an ImageEntry for every image that finishes landing below `folder`, for as
+    long as it is iterated: the images already there first, then new ones as they are
+    copied in. Like FolderScanner, `found` counts the entries handed out so far.
+
+    On Linux, inotify says when a file is closed after writing (or renamed into place, as
+    rsync does), so it is handed out at once. Images already there when the watch starts,
+    or found in a new folder before its watch was in place, count as complete once their
+    size and mtime have held for `settle` seconds. Elsewhere, or with use_inotify=False,
+    the tree is rescanned every poll_interval seconds with the same rule.
+
+    Images are handed out in name order, the order a card is copied in: one that lands
+    while an image sorting before it is still being written waits for that one.
+
+    Iteration blocks while waiting for files, calls control.check() in between (so a pause
+    holds it and a cancel raises Cancelled) and ends once nothing has landed for
+    idle_timeout seconds, if given. Folders in `exclude` and earlier output folders are
+    not watched. on_idle() is called on the iterating thread each time every image that
+    had landed is handed out and the watch starts waiting again (the consumer may set it
+    after construction, as PoleVerifier does to commit its caches).
+    """
+
+    def __init__(self, folder, exclude=(), settle=SETTLE_SECONDS, poll_interval=POLL_INTERVAL,
+                 idle_timeout=None, use_inotify=True, control=None, log=None, on_idle=None):
+        self.folder = folder
+        self.exclude = exclude
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.use_inotify = use_inotify
+        self.control = control or RunControl()
+        self.log = log or print_log
+        self.on_idle = on_idle or ignore
+        self.found = 0
+        self.mode = None  # "inotify" or "polling", once iteration starts
+
+        self._excluded = {os.path.normcase(os.path.abspath(path)) for path in exclude}
+        self._inotify = None
+        self._watches = {}     # wd -> folder
+        self._pending = {}     # Path -> (size, mtime_ns, unchanged since), waiting to settle
+        self._writing = set()  # Created under our watch: complete when closed
+        self._completed = set()  # Handed out and still in the tree
+        self._ready = []
+        self._next_check = 0.0
+
+    def __iter__(self):
+        try:
+            self._start()
+            last_found = time.monotonic()
+            idle = False
+            while True:
+                self.control.check()
+                batch = self._next_batch()
+                for entry in batch:
+                    self.found += 1
+                    yield entry
+                now = time.monotonic()
+                if batch:
+                    last_found = now
+                    idle = False
+                    continue
+                if not idle:
+                    idle = True
+                    self.on_idle()
+                if (self.idle_timeout is not None and not self._pending and not self._writing
+                        and not self._ready and now - last_found >= self.idle_timeout):
+                    self.log(f"Nothing new in {self.folder} for {self.idle_timeout:g} s; stopping the watch",
+                             "black", INFO)
+                    return
+        finally:
+            self.close()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._watches = {}
+
+    def _start(self):
+        if self.use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._watch_tree(self.folder)
+            except OSError as e:
+                self._fall_back(e)
+        self.mode = "inotify" if self._inotify is not None else "polling"
+        if self._inotify is not None:
+            self.log(f"Watching {self.folder} for new images", "black", INFO)
+        else:
+            self.log(f"Watching {self.folder} for new images (rescanning every {self.poll_interval:g} s)",
+                     "black", INFO)
+        # Whatever is already there settles like any other scanned file
+        self._scan(self.folder)
+        self._next_check = time.monotonic()
+
+    def _fall_back(self, error):
+        if self._inotify is not None:
+            self.log(f"inotify unavailable ({error}); polling {self.folder} instead", "orange", WARNING)
+            self._inotify.close()
+            self._inotify = None
+            self._watches = {}
+            self._writing.clear()
+        self.mode = "polling"
+
+    def _next_batch(self):
+        now = time.monotonic()
+        wait = min(WAKE_INTERVAL, max(0.0, self._next_check - now))
+        if self._inotify is not None:
+            self._handle(self._inotify.read(wait))
+            if self._ready:
+                # Let the files landing right behind this one catch up, so a batch keeps name order
+                deadline = time.monotonic() + BATCH_WINDOW
+                while self._inotify is not None and time.monotonic() < deadline:
+                    events = self._inotify.read(max(0.0, deadline - time.monotonic()))
+                    if not events:
+                        break
+                    self._handle(events)
+        elif wait > 0:
+            time.sleep(wait)
+
+        now = time.monotonic()
+        if now >= self._next_check:
+            if self._inotify is None:
+                # Drop what has left the tree (e.g. poles moved out) so memory stays bounded
+                present = self._scan(self.folder)
+                self._completed &= present
+                for path in [path for path in self._pending if path not in present]:
+                    del self._pending[path]
+                self._settle(now, restat=False)
+            else:
+                self._settle(now, restat=True)
+            self._next_check = now + self.poll_interval
+
+        # Images are handed out in name order: one that sorts after a file still settling or
+        # being written waits for it (e.g. a new arrival behind the images found at start)
+        self._ready.sort(key=lambda entry: entry.path)
+        first_unfinished = min(itertools.chain(self._pending, self._writing), default=None)
+        count = len(self._ready)
+        if first_unfinished is not None:
+            count = bisect.bisect_left([entry.path for entry in self._ready], first_unfinished)
+        ready = self._ready[:count]
+        del self._ready[:count]
+        return ready
+
+    ########################################################################################
+
+    def _watch_tree(self, folder):
+        for current, subfolders, files in os.walk(folder):
+            if current != self.folder and OUTPUT_MARKER in files:
+                subfolders[:] = []
+                continue
+            self._watches[self._inotify.add_watch(current)] = current
+            subfolders[:] = sorted(name for name in subfolders
+                                   if os.path.normcase(os.path.abspath(os.path.join(current, name)))
+                                   not in self._excluded)
+
+    def _scan(self, folder):
+        """ Track the images below `folder` that have not been handed out; returns their paths. """
+        now = time.monotonic()
+        present = set()
+        for entry in scan_images(folder, self.exclude):
+            present.add(entry.path)
+            if entry.path in self._completed or entry.path in self._writing:
+                continue
+            pending = self._pending.get(entry.path)
+            if pending is None or pending[:2] != (entry.size, entry.mtime_ns):
+                self._pending[entry.path] = (entry.size, entry.mtime_ns, now)
+        return present
+
+    def _settle(self, now, restat):
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            if restat:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    del self._pending[path]
+                    continue
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    self._pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+                    continue
+            if now - since >= self.settle:
+                self._complete(path, size, mtime_ns)
+
+    def _complete(self, path, size=None, mtime_ns=None):
+        self._pending.pop(path, None)
+        self._writing.discard(path)
+        if path in self._completed:
+            return
+        if size is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return  # Gone again before we got to it
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        self._completed.add(path)
+        self._ready.append(ImageEntry(path, size, mtime_ns))
+
+    def _handle(self, events):
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: anything not handed out yet has to settle again
+                self.log(f"Too many changes at once in {self.folder}; rescanning", "orange", WARNING)
+                self._writing.clear()
+                self._scan(self.folder)
+                continue
+            folder = self._watches.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+            path = os.path.join(folder, name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if os.path.normcase(os.path.abspath(path)) in self._excluded:
+                        continue
+                    # Files may have landed before the watch was in place: scan them too
+                    try:
+                        self._watch_tree(path)
+                    except OSError as e:
+                        self._fall_back(e)
+                        return
+                    self._scan(path)
+                elif mask & IN_MOVED_FROM:
+                    prefix = path + os.sep
+                    self._completed = {done for done in self._completed if not done.startswith(prefix)}
+                continue
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+
+            if mask & IN_CREATE:
+                self._pending.pop(path, None)
+                self._writing.add(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._complete(path)
+            elif mask & (IN_MOVED_FROM | IN_DELETE):
+                self._completed.discard(path)
+                self._pending.pop(path, None)
+                self._writing.discard(path)
@@ -1,6 +1,58 @@
 import os
 import re
-from PIL import Image
+import time
+import struct
+import calendar
+
+JPEG_SOI = b'\xff\xd8'
+EXIF_HEADER = b'Exif\x00\x00'
+XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+XMP_START = b'<x:xmpmeta'
+XMP_END = b'</x:xmpmeta>'
+# The full-file XMP scan reads this much at a time and gives up on packets larger than the cap
+XMP_SCAN_CHUNK = 1024 * 1024
+MAX_XMP_SIZE = 4 * 1024 * 1024
+
+# EXIF IFD pointers that PIL's _getexif() used to fold into the result for us
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+
+DATETIME_ORIGINAL = 36867
+SUBSEC_TIME_ORIGINAL = 37521
+
+# IFD1 tags locating the embedded JPEG thumbnail (offset is relative to the TIFF header)
+THUMBNAIL_OFFSET = 0x0201
+THUMBNAIL_LENGTH = 0x0202
+
+# drone-dji XMP attribute -> DJIImageInfo slot. Some DJI firmware spells it "GpsLongtitude".
+DJI_XMP_FIELDS = {
+    'GimbalPitchDegree': 'gimbal_pitch',
+    'GimbalYawDegree': 'gimbal_yaw',
+    'GimbalRollDegree': 'gimbal_roll',
+    'ImageSource': 'image_source',
+    'RelativeAltitude': 'relative_altitude',
+    'AbsoluteAltitude': 'absolute_altitude',
+    'GpsLatitude': 'latitude',
+    'GpsLongitude': 'longitude',
+    'GpsLongtitude': 'longitude',
+}
+# Matches both drone-dji:Name="value" attributes and <drone-dji:Name>value</...> elements;
+# the element form must follow "<", so closing </drone-dji:Name> tags never match
+DJI_XMP_FIELD_RE = re.compile(
+    r'(?<=<)drone-dji:(?P<element>\w+)>(?P<text>[^<]*)<'
+    r'|drone-dji:(?P<attribute>\w+)\s*=\s*(?:"(?P<double>[^"]*)"|\'(?P<single>[^\']*)\')')
+
+# TIFF field type -> (struct format, size in bytes)
+TIFF_TYPES = {
+    1: ('B', 1),   # BYTE
+    2: ('s', 1),   # ASCII
+    3: ('H', 2),   # SHORT
+    4: ('L', 4),   # LONG
+    5: ('LL', 8),  # RATIONAL
+    7: ('s', 1),   # UNDEFINED
+    9: ('l', 4),   # SLONG
+    10: ('ll', 8), # SRATIONAL
+}
 
 def extract_value_from_xmp(xmp_block, tag_name, log_message_func):
     """Helper function to extract a specific tag's value from the XMP block"""
@@ -22,59 +74,358 @@ def extract_value_from_xmp(xmp_block, tag_name, log_message_func):
         return None
 
 # Function to extract DJI-specific metadata (focus on MakerNote and XMP)
-def extract_dji_metadata(image_path):
+def extract_dji_metadata(image_path, profile=None):
+    """ {'EXIF', 'MakerNote', 'XMP'} of an image; 'XMP' is missing if it has none. Errors
+    reading the file (OSError) are raised, not folded into the result. """
     metadata = {}
-    
+
+    # Walk the JPEG headers once; EXIF and XMP both live in APP1 segments before SOS
+    headers = read_jpeg_headers(image_path, profile)
+    if headers is None:
+        # Not a JPEG (e.g. PNG), fall back to scanning the whole file for XMP
+        start = time.perf_counter()
+        xmp_data = extract_xmp_block(image_path)
+        if profile is not None:
+            profile.record("read", time.perf_counter() - start, _file_size(image_path))
+        if xmp_data:
+            metadata['XMP'] = xmp_data
+        metadata['EXIF'] = None
+        return metadata
+
+    exif_payload, xmp_packet = headers
+    start = time.perf_counter()
+    exif_data = parse_exif_tags(exif_payload) if exif_payload else None
+    if profile is not None:
+        profile.record("exif", time.perf_counter() - start)
+
+    if exif_data is not None:
+        metadata['EXIF'] = exif_data
+        # Extract MakerNote field (usually contains proprietary DJI data)
+        maker_note = exif_data.get(37500)  # 37500 is the standard tag ID for MakerNote
+
+        if maker_note:
+            metadata['MakerNote'] = maker_note
+        else:
+            metadata['MakerNote'] = None
+    else:
+        metadata['EXIF'] = None
+
+    xmp_data = extract_xmpmeta(xmp_packet)
+    if xmp_data:
+        metadata['XMP'] = xmp_data
+
+    return metadata
+
+class DJIImageInfo:
+    """ The per-image fields we classify on. Angles, altitudes and coordinates are floats,
+    capture_time is seconds since the epoch (camera local time, treated as UTC); any of
+    them may be None if the camera didn't write it.
+    """
+    __slots__ = ('gimbal_pitch', 'gimbal_yaw', 'gimbal_roll', 'image_source',
+                 'relative_altitude', 'absolute_altitude', 'latitude', 'longitude', 'capture_time')
+
+    def __init__(self, gimbal_pitch=None, gimbal_yaw=None, gimbal_roll=None, image_source=None,
+                 relative_altitude=None, absolute_altitude=None, latitude=None, longitude=None,
+                 capture_time=None):
+        self.gimbal_pitch = gimbal_pitch
+        self.gimbal_yaw = gimbal_yaw
+        self.gimbal_roll = gimbal_roll
+        self.image_source = image_source
+        self.relative_altitude = relative_altitude
+        self.absolute_altitude = absolute_altitude
+        self.latitude = latitude
+        self.longitude = longitude
+        self.capture_time = capture_time
+
+    def to_list(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+    def __eq__(self, other):
+        return isinstance(other, DJIImageInfo) and self.to_list() == other.to_list()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"DJIImageInfo({fields})"
+
+def parse_dji_xmp(xmp_data, info=None):
+    """ Pull every drone-dji field we know about out of the XMP string in one regex pass. """
+    if info is None:
+        info = DJIImageInfo()
+    for match in DJI_XMP_FIELD_RE.finditer(xmp_data):
+        slot = DJI_XMP_FIELDS.get(match.group('element') or match.group('attribute'))
+        # The first value wins (e.g. GpsLongitude over a later GpsLongtitude)
+        if slot is None or getattr(info, slot) is not None:
+            continue
+        value = next(group for group in match.group('text', 'double', 'single') if group is not None)
+        value = value.strip()
+        if slot != 'image_source':
+            try:
+                value = float(value)
+            except ValueError:
+                value = None
+        setattr(info, slot, value)
+    return info
+
+def extract_dji_info(image_path, profile=None):
+    """ Header-only read parsed into a DJIImageInfo; None if there is no XMP. Raises OSError
+    if the file can't be read (which, unlike None, says nothing about the file itself).
+
+    A RunProfile, if given, gets the "read" (header I/O), "exif" and "xmp" stage times.
+    """
+    metadata = extract_dji_metadata(image_path, profile)
+    if 'XMP' not in metadata:
+        return None
+
+    start = time.perf_counter()
+    info = parse_dji_xmp(metadata['XMP'])
+    exif_data = metadata.get('EXIF') or {}
+    info.capture_time = parse_exif_datetime(exif_data.get(DATETIME_ORIGINAL), exif_data.get(SUBSEC_TIME_ORIGINAL))
+    if info.latitude is None or info.longitude is None:
+        info.latitude, info.longitude = parse_exif_gps(exif_data.get(GPS_IFD_POINTER))
+    if profile is not None:
+        profile.record("xmp", time.perf_counter() - start)
+    return info
+
+def parse_exif_datetime(date_time, sub_sec=None):
+    """ EXIF "YYYY:MM:DD HH:MM:SS" (+ SubSecTime digits) -> float seconds, or None. """
+    if not date_time:
+        return None
+    try:
+        seconds = calendar.timegm(time.strptime(date_time.strip(), "%Y:%m:%d %H:%M:%S"))
+    except ValueError:
+        return None
+    if sub_sec and sub_sec.strip().isdigit():
+        seconds += float('0.' + sub_sec.strip())
+    return float(seconds)
+
+def parse_exif_gps(gps_info):
+    """ EXIF GPS IFD -> (latitude, longitude) in signed decimal degrees, or (None, None). """
     try:
-        # Open the image file
-        image = Image.open(image_path)
-        # Get EXIF data
-        exif_data = image._getexif()
-
-        if exif_data is not None:
-            # Extract MakerNote field (usually contains proprietary DJI data)
-            maker_note = exif_data.get(37500)  # 37500 is the standard tag ID for MakerNote
-            
-            if maker_note:
-                metadata['MakerNote'] = maker_note
+        lat = gps_info[2][0] + gps_info[2][1] / 60 + gps_info[2][2] / 3600
+        lon = gps_info[4][0] + gps_info[4][1] / 60 + gps_info[4][2] / 3600
+    except (TypeError, KeyError, IndexError):
+        return None, None
+    if gps_info.get(1) == 'S':
+        lat = -lat
+    if gps_info.get(3) == 'W':
+        lon = -lon
+    return lat, lon
+
+####################################################################
+
+def read_jpeg_headers(image_path, profile=None):
+    """ Walk the JPEG marker segments up to SOS and return (exif_payload, xmp_packet).
+
+    Only the segment headers are read (usually well under 64 KB); the compressed image
+    data after SOS is never touched. Returns None if the file is not a JPEG.
+    """
+    if profile is None:
+        return _read_jpeg_headers(image_path)
+    start = time.perf_counter()
+    stats = {}
+    headers = _read_jpeg_headers(image_path, stats)
+    if headers is not None:  # Non-JPEGs are timed by the full-file fallback
+        profile.record("read", time.perf_counter() - start, stats.get('bytes_read', 0))
+    return headers
+
+def _read_jpeg_headers(image_path, stats=None):
+    exif_payload = None
+    xmp_packet = None
+
+    with open(image_path, 'rb') as f:
+        if f.read(2) != JPEG_SOI:
+            return None
+
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                break  # Truncated or corrupt header, keep whatever we found so far
+
+            code = marker[1]
+            while code == 0xFF:  # Skip fill bytes between markers
+                fill = f.read(1)
+                if not fill:
+                    return exif_payload, xmp_packet
+                code = fill[0]
+
+            if code == 0xDA or code == 0xD9:  # SOS / EOI, the metadata is behind us
+                break
+            if code == 0x01 or 0xD0 <= code <= 0xD7:  # TEM / RSTn carry no length
+                continue
+
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                break
+            length = struct.unpack('>H', length_bytes)[0] - 2
+            if length < 0:
+                break
+
+            if code == 0xE1:  # APP1 holds both EXIF and XMP
+                payload = f.read(length)
+                if exif_payload is None and payload.startswith(EXIF_HEADER):
+                    exif_payload = payload[len(EXIF_HEADER):]
+                elif xmp_packet is None and payload.startswith(XMP_HEADER):
+                    xmp_packet = payload[len(XMP_HEADER):].decode('utf-8', errors='ignore')
             else:
-                metadata['MakerNote'] = None
+                f.seek(length, os.SEEK_CUR)
+
+        if stats is not None:
+            stats['bytes_read'] = f.tell()  # Header bytes up to SOS; seeks count as read
+    return exif_payload, xmp_packet
 
-            # Attempt to find and extract XMP data manually
-            xmp_data = extract_xmp_block(image_path)
-            if xmp_data:
-                metadata['XMP'] = xmp_data
+def extract_xmpmeta(xmp_packet):
+    """ Trim an XMP packet down to the <x:xmpmeta> element, like extract_xmp_block did. """
+    if not xmp_packet:
+        return None
+    xmp_start = xmp_packet.find('<x:xmpmeta')
+    xmp_end = xmp_packet.find('</x:xmpmeta>')
+    if xmp_start == -1 or xmp_end == -1:
+        return xmp_packet
+    return xmp_packet[xmp_start:xmp_end + 12]  # Include closing tag length
+
+def parse_exif_tags(tiff_data):
+    """ Parse the TIFF structure of an EXIF payload into {tag_id: value}.
 
+    Mirrors PIL's _getexif(): IFD0 and the Exif sub-IFD are merged into one dict and the
+    GPS IFD is stored as a nested dict under its pointer tag (34853).
+    """
+    try:
+        if tiff_data[:2] == b'II':
+            endian = '<'
+        elif tiff_data[:2] == b'MM':
+            endian = '>'
         else:
-            metadata['EXIF'] = None
-    
-    except Exception as e:
-        print(f"Error extracting DJI metadata: {e}")
-        metadata['Error'] = str(e)
-    
-    return metadata
+            return None
 
-# Function to extract XMP block from image
-def extract_xmp_block(image_path):
+        ifd0_offset = struct.unpack(endian + 'L', tiff_data[4:8])[0]
+        tags = read_ifd(tiff_data, ifd0_offset, endian)
+
+        exif_offset = tags.pop(EXIF_IFD_POINTER, None)
+        if isinstance(exif_offset, int):
+            tags.update(read_ifd(tiff_data, exif_offset, endian))
+
+        gps_offset = tags.get(GPS_IFD_POINTER)
+        if isinstance(gps_offset, int):
+            tags[GPS_IFD_POINTER] = read_ifd(tiff_data, gps_offset, endian)
+
+        return tags
+    except (struct.error, IndexError, ValueError):
+        return None
+
+def parse_exif_thumbnail(tiff_data):
+    """ The JPEG thumbnail IFD1 points at (JPEGInterchangeFormat), as bytes, or None. """
     try:
-        # Read the image file as binary
-        with open(image_path, 'rb') as f:
-            img_data = f.read()
-
-        # Find the XMP block (likely contains DJI-specific metadata)
-        xmp_start = img_data.find(b'<x:xmpmeta')
-        xmp_end = img_data.find(b'</x:xmpmeta>') + 12  # Include closing tag length
-
-        if xmp_start != -1 and xmp_end != -1:
-            # Extract the entire XMP block
-            xmp_block = img_data[xmp_start:xmp_end].decode('utf-8', errors='ignore')
-            return xmp_block
+        if tiff_data[:2] == b'II':
+            endian = '<'
+        elif tiff_data[:2] == b'MM':
+            endian = '>'
         else:
             return None
 
-    except Exception as e:
-        print(f"Error extracting XMP data: {e}")
+        ifd0_offset = struct.unpack(endian + 'L', tiff_data[4:8])[0]
+        entry_count = struct.unpack(endian + 'H', tiff_data[ifd0_offset:ifd0_offset + 2])[0]
+        next_ifd = ifd0_offset + 2 + entry_count * 12
+        ifd1_offset = struct.unpack(endian + 'L', tiff_data[next_ifd:next_ifd + 4])[0]
+        if not ifd1_offset:
+            return None
+
+        tags = read_ifd(tiff_data, ifd1_offset, endian)
+        offset = tags.get(THUMBNAIL_OFFSET)
+        length = tags.get(THUMBNAIL_LENGTH)
+        if not isinstance(offset, int) or not isinstance(length, int) or length <= 0:
+            return None
+        thumbnail = tiff_data[offset:offset + length]
+        if len(thumbnail) < length or not thumbnail.startswith(JPEG_SOI):
+            return None
+        return thumbnail
+    except (struct.error, IndexError, ValueError):
+        return None
+
+def extract_exif_thumbnail(image_path):
+    """ The camera's embedded EXIF thumbnail of an image, read from the JPEG headers only
+    (no decode, nothing past SOS). None if the file has none or isn't a JPEG. """
+    try:
+        headers = _read_jpeg_headers(image_path)
+    except OSError:
+        return None
+    if headers is None or not headers[0]:
         return None
+    return parse_exif_thumbnail(headers[0])
+
+def read_ifd(tiff_data, offset, endian):
+    """ Read a single IFD's entries; values are decoded to str, int, float or bytes. """
+    tags = {}
+    entry_count = struct.unpack(endian + 'H', tiff_data[offset:offset + 2])[0]
+    for i in range(entry_count):
+        entry = offset + 2 + i * 12
+        tag, field_type, count = struct.unpack(endian + 'HHL', tiff_data[entry:entry + 8])
+        if field_type not in TIFF_TYPES:
+            continue
+
+        fmt, size = TIFF_TYPES[field_type]
+        total_size = size * count
+        if total_size <= 4:
+            value_offset = entry + 8
+        else:
+            value_offset = struct.unpack(endian + 'L', tiff_data[entry + 8:entry + 12])[0]
+        raw = tiff_data[value_offset:value_offset + total_size]
+        if len(raw) < total_size:
+            continue
+
+        if field_type == 2:
+            value = raw.split(b'\x00', 1)[0].decode('ascii', errors='ignore')
+        elif field_type == 7:
+            value = raw
+        elif field_type in (5, 10):
+            parts = struct.unpack(endian + fmt[0] * (2 * count), raw)
+            value = tuple(parts[j] / parts[j + 1] if parts[j + 1] else 0.0 for j in range(0, len(parts), 2))
+            value = value[0] if count == 1 else value
+        else:
+            value = struct.unpack(endian + fmt * count, raw)
+            value = value[0] if count == 1 else value
+        tags[tag] = value
+    return tags
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+####################################################################
+
+# Function to extract XMP block from image (file scan, only used for non-JPEG files)
+def extract_xmp_block(image_path):
+    """ Scan the file chunk by chunk for the <x:xmpmeta> element, so at most one chunk plus
+    the packet is in memory however large the image is. Read errors are raised. """
+    with open(image_path, 'rb') as f:
+        buffer = b''
+        found = False
+        while True:
+            chunk = f.read(XMP_SCAN_CHUNK)
+            if not chunk:
+                return None
+            buffer += chunk
+
+            if not found:
+                # Find the XMP block (likely contains DJI-specific metadata)
+                xmp_start = buffer.find(XMP_START)
+                if xmp_start == -1:
+                    buffer = buffer[-(len(XMP_START) - 1):]  # The marker may straddle chunks
+                    continue
+                buffer = buffer[xmp_start:]
+                found = True
+
+            xmp_end = buffer.find(XMP_END)
+            if xmp_end != -1:
+                # Extract the entire XMP block, including the closing tag
+                return buffer[:xmp_end + len(XMP_END)].decode('utf-8', errors='ignore')
+            if len(buffer) > MAX_XMP_SIZE:
+                return None
     
 
 ####################################################################
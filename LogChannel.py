@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import deque
+
+# Log levels (same numbers as the logging module). Per-image lines are DEBUG.
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+# Messages kept while nobody drains the channel; older ones are dropped (and counted)
+DEFAULT_MAX_BUFFERED = 20000
+
+def print_log(message, color=None, level=INFO):
+    """ Default `log` callback when none is given: print INFO and above to stdout. """
+    if level >= INFO:
+        print(message)
+
+def ignore(*args):
+    """ Default for optional callbacks: do nothing. """
+    pass
+
+def level_of(log_level):
+    """ A `log_level` argument as a number: either a level, or a callable returning the
+    current one (LogChannel.get_level), read on every use so running jobs follow the GUI. """
+    return log_level() if callable(log_level) else log_level
+
+####################################################################
+
+class LogChannel:
+    """ Thread-safe buffered log. Workers write() from any thread; the UI drain()s whole
+    batches on a timer instead of handling one signal per message.
+
+    Messages below `level` are discarded at write time, so per-image lines cost nothing
+    when the verbosity is turned down.
+    """
+
+    def __init__(self, level=INFO, max_buffered=DEFAULT_MAX_BUFFERED):
+        self.level = level
+        self.dropped = 0
+        self._buffer = deque(maxlen=max_buffered)
+        self._lock = threading.Lock()
+
+    def write(self, message, color=None, level=INFO):
+        if level < self.level:
+            return
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append((time.time(), message, color, level))
+
+    def drain(self, max_items=None):
+        """ Remove and return buffered (timestamp, message, color, level) tuples, oldest first. """
+        with self._lock:
+            if max_items is None or max_items >= len(self._buffer):
+                batch = list(self._buffer)
+                self._buffer.clear()
+            else:
+                batch = [self._buffer.popleft() for _ in range(max_items)]
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            batch.insert(0, (time.time(), f"... {dropped} log messages dropped ...", "red", WARNING))
+        return batch
+
+    def get_level(self):
+        return self.level
+
+    def set_level(self, level):
+        self.level = level
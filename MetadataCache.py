@@ -0,0 +1,50 @@
+import json
+import time
+from GetEXIFTags import DJIImageInfo
+from SqliteStore import SqliteStore
+
+CACHE_FILE_NAME = 'metadata.sqlite'
+# Roughly 200 bytes a row, so the default cap keeps the cache file around 40 MB
+DEFAULT_MAX_ENTRIES = 200000
+# Returned by get() on a miss; None is a valid cached value (file has no DJI XMP)
+CACHE_MISS = object()
+# Bump when the stored row format changes; older caches are dropped, not migrated
+SCHEMA_VERSION = 2
+
+####################################################################
+
+class MetadataCache(SqliteStore):
+    """ Persistent map of image path -> DJIImageInfo, invalidated by file size + mtime.
+
+    Not thread-safe: open, use and close it on the thread that runs the sequence check.
+    """
+    FILE_NAME = CACHE_FILE_NAME
+    TABLE = 'files'
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS files ("
+              " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, fields TEXT, last_used REAL)",
+              "CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+    SCHEMA_VERSION = SCHEMA_VERSION
+
+    def __init__(self, cache_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        super().__init__(cache_path, max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_path, size, mtime_ns):
+        """ Cached DJIImageInfo (or None) for the file, CACHE_MISS if unknown or changed on disk. """
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, fields FROM files WHERE path = ?", (image_path,)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            self.misses += 1
+            return CACHE_MISS
+        self.hits += 1
+        self.touch(image_path)
+        values = json.loads(row[2])
+        return DJIImageInfo.from_list(values) if values is not None else None
+
+    def put(self, image_path, size, mtime_ns, info):
+        values = info.to_list() if info is not None else None
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, fields, last_used) VALUES (?, ?, ?, ?, ?)",
+            (image_path, size, mtime_ns, json.dumps(values), time.time()))
+        self.wrote()
@@ -0,0 +1,187 @@
+import os
+import time
+import sqlite3
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from GetEXIFTags import extract_dji_info
+from MetadataCache import CACHE_MISS
+from FolderScan import ImageEntry
+from LogChannel import WARNING, ignore
+
+# Metadata extraction is I/O-latency bound (NAS / USB readers), so we run more threads than cores
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# How many files may be in flight ahead of the consumer, per worker
+PREFETCH_PER_WORKER = 4
+# Cap on the file bytes being read at once. JPEG header reads are small, but the full-file XMP
+# scan for other formats could otherwise hold prefetch x file size in memory
+MAX_BYTES_IN_FLIGHT = 256 * 1024 * 1024
+HEADER_READ_ESTIMATE = 64 * 1024
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+####################################################################
+
+def iter_metadata(image_files, max_workers=None, prefetch=None, use_processes=False, cache=None,
+                  profile=None, max_bytes_in_flight=MAX_BYTES_IN_FLIGHT, log=None):
+    """ Yield (image_file, DJIImageInfo or None) for every file, in the original order.
+    None means no DJI XMP, or that the file couldn't be read (logged, and not cached).
+
+    image_files may hold paths or ImageEntry objects (whose stat info then saves a stat call
+    per cache lookup) and may be any iterable, including a still-running FolderScanner.
+
+    Extraction runs ahead of the consumer on a thread (or process) pool, bounded by a
+    prefetch window and by max_bytes_in_flight (estimated from the read each file needs),
+    so memory stays flat no matter how many files are queued or how large they are. With
+    max_workers=1 no pool is created and files are read inline. If a MetadataCache is
+    given, unchanged files are answered from it and fresh results are written back; if its
+    file can't be used (locked by another job past SQLite's timeout), that is logged and the
+    run carries on without it.
+
+    A RunProfile gets the extraction stages (see extract_dji_info) and the "cache" lookups;
+    worker processes can't share it, so with use_processes only the lookups are recorded.
+    """
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+    log = log or ignore
+    if cache is not None:
+        cache = _GuardedCache(cache, log)
+    if max_workers <= 1:
+        for item in image_files:
+            image_file, stat_key = _path_and_stat(item, cache)
+            yield image_file, _load_inline(image_file, stat_key, cache, profile, log)
+        return
+
+    if prefetch is None:
+        prefetch = max_workers * PREFETCH_PER_WORKER
+    prefetch = max(prefetch, max_workers)
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    worker_profile = None if use_processes else profile
+    pending = deque()
+    files = iter(image_files)
+    in_flight = [0]  # Estimated bytes being read by the pool
+
+    with executor_class(max_workers=max_workers) as executor:
+
+        def submit(item):
+            # Cache lookups stay on this thread; only misses go to the pool
+            image_file, stat_key = _path_and_stat(item, cache)
+            if stat_key is not None:
+                info = _cache_get(cache, image_file, stat_key, profile)
+                if info is not CACHE_MISS:
+                    future = Future()
+                    future.set_result(info)
+                    pending.append((image_file, future, None, 0))
+                    return
+            cost = _read_cost(item)
+            in_flight[0] += cost
+            pending.append((image_file, executor.submit(extract_dji_info, image_file, worker_profile), stat_key, cost))
+
+        def top_up():
+            # A single file larger than the cap still goes through, on its own
+            while len(pending) < prefetch and in_flight[0] < max_bytes_in_flight:
+                item = next(files, None)
+                if item is None:
+                    return
+                submit(item)
+
+        try:
+            # Fill the window, then keep it topped up as results are consumed in order
+            top_up()
+            while pending:
+                image_file, future, stat_key, cost = pending.popleft()
+                top_up()
+                in_flight[0] -= cost
+                try:
+                    info = future.result()
+                except OSError as e:
+                    info = _read_failed(image_file, e, log)
+                    stat_key = None
+                if stat_key is not None:
+                    cache.put(image_file, *stat_key, info)
+                yield image_file, info
+        finally:
+            # Consumer stopped early (or failed): don't leave queued reads behind
+            for _, future, _, _ in pending:
+                future.cancel()
+
+class _GuardedCache:
+    """ A MetadataCache that is dropped (every lookup a miss, nothing written) after its first
+    sqlite3.OperationalError, so a shared cache file that stays locked doesn't fail the run. """
+
+    def __init__(self, cache, log):
+        self.cache = cache
+        self.log = log
+
+    def get(self, image_file, size, mtime_ns):
+        if self.cache is None:
+            return CACHE_MISS
+        try:
+            return self.cache.get(image_file, size, mtime_ns)
+        except sqlite3.OperationalError as e:
+            self.failed(e)
+            return CACHE_MISS
+
+    def put(self, image_file, size, mtime_ns, info):
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(image_file, size, mtime_ns, info)
+        except sqlite3.OperationalError as e:
+            self.failed(e)
+
+    def failed(self, error):
+        self.log(f"Metadata cache unavailable, reading all files: {error}", "red", WARNING)
+        self.cache = None
+
+def _load_inline(image_file, stat_key, cache, profile=None, log=ignore):
+    info = CACHE_MISS
+    if stat_key is not None:
+        info = _cache_get(cache, image_file, stat_key, profile)
+    if info is CACHE_MISS:
+        try:
+            info = extract_dji_info(image_file, profile)
+        except OSError as e:
+            return _read_failed(image_file, e, log)
+        if stat_key is not None:
+            cache.put(image_file, *stat_key, info)
+    return info
+
+def _read_failed(image_file, error, log):
+    """ A file that couldn't be read is fed as unreadable, but left out of the cache:
+    the error (a flaky NAS / USB reader) may be gone on the next run. """
+    log(f"Could not read {image_file}: {error}", "red", WARNING)
+    return None
+
+def _cache_get(cache, image_file, stat_key, profile):
+    if profile is None:
+        return cache.get(image_file, *stat_key)
+    start = time.perf_counter()
+    info = cache.get(image_file, *stat_key)
+    profile.record("cache", time.perf_counter() - start)
+    return info
+
+def _path_and_stat(item, cache):
+    """ (path, (size, mtime_ns) or None); stat info is only needed when there is a cache. """
+    if isinstance(item, ImageEntry):
+        return item.path, ((item.size, item.mtime_ns) if cache is not None else None)
+    return item, (_stat_key(item) if cache is not None else None)
+
+def _read_cost(item):
+    """ Bytes extract_dji_info is expected to read: the headers of a JPEG, all of anything else. """
+    path = item.path if isinstance(item, ImageEntry) else item
+    if path.lower().endswith(JPEG_EXTENSIONS):
+        return HEADER_READ_ESTIMATE
+    if isinstance(item, ImageEntry):
+        return item.size
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _stat_key(image_file):
+    """ (size, mtime_ns) used to validate cache entries, or None if the file can't be stat'ed. """
+    try:
+        st = os.stat(image_file)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
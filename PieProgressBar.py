@@ -3,14 +3,18 @@ from PyQt5.QtGui import QPainter, QColor, QPen
 from PyQt5.QtCore import Qt
 
 class ProgressPie(QWidget):
-    def __init__(self, parent=None, total_images=100):
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.value = 0  # Initial value for the progress
-        self.total_images = total_images
+        self.span_angle = 0  # Current arc in 1/16th degrees (negative = clockwise)
         self.setMinimumSize(100, 100)
 
-    def setValue(self, value):
-        self.value = value
+    def setPercent(self, percent):
+        # Only repaint when the visible arc moves by at least a whole degree
+        percent = max(0, min(percent, 100))  # Clamp between 0 and 100
+        span_angle = -int(percent / 100 * 360) * 16
+        if span_angle == self.span_angle:
+            return
+        self.span_angle = span_angle
         self.update()
 
     def paintEvent(self, event):
@@ -43,17 +47,10 @@ class ProgressPie(QWidget):
         painter.setBrush(Qt.NoBrush)
         painter.drawEllipse(rect.center(), outer_radius, outer_radius)
 
-        # Calculate the percentage based on total images
-        if self.value > 0:
-            progress_percentage = self.value / self.total_images * 100
-            
-            # Ensure the progress percentage is valid and clamp the span angle
-            progress_percentage = max(0, min(progress_percentage, 100))  # Clamp between 0 and 100
+        # The arc is computed in setPercent, only when it changes
+        if self.span_angle != 0:
             start_angle = 90 * 16  # Start at 90 degrees
-            span_angle = -int(progress_percentage / 100 * 360 * 16)  # Span based on percentage
-            
-            # Ensure span_angle doesn't exceed range
-            span_angle = max(-5760, min(span_angle, 5760))  # Clamping to ensure it's within a valid range
+            span_angle = self.span_angle
             
             painter.setPen(Qt.NoPen)
             painter.setBrush(Qt.green)
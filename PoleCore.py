@@ -0,0 +1,911 @@
+# Qt-free core of Pole.IO: image collection, the NADIR -> orbit -> zoom sequence check and
+# the moves of completed poles. Shared by the GUI worker (ImgProcWorker) and PoleIO-CLI.py.
+import os
+import json
+import time
+import uuid
+import bisect
+import sqlite3
+import datetime
+from collections import deque
+from MetadataPool import iter_metadata
+from MetadataCache import MetadataCache
+from LogChannel import DEBUG, INFO, WARNING, print_log, ignore, level_of
+from FolderScan import ImageEntry, scan_images, FolderScanner
+from FolderWatch import FolderWatcher
+from ShotTable import ShotTable
+from FileMover import FileMover, DEFAULT_MOVE_WORKERS, rewind_moves
+from RunControl import RunControl, Cancelled
+from Fingerprint import FingerprintIndex, iter_unique, DEFAULT_FINGERPRINT_WORKERS
+from PoleIndex import PoleIndex, pole_position, REFLOWN_RADIUS_METERS
+from PoleRules import (DEFAULT_RULES, KIND_NADIR, KIND_ORBIT, KIND_ZOOM, KIND_NADIR_ZOOM, KIND_UNREADABLE,
+                       NADIR_KINDS, classify_rows, group_kinds, merge_positions)
+
+# Order in which images are fed to the sequencer
+ORDER_BY_NAME = "name"        # Scan order: folders and file names (streams, no full pass first)
+ORDER_BY_CAPTURE = "capture"  # EXIF capture time across all folders (survives folder rollovers)
+
+# Progress is reported when the integer percentage changes, or at least this often (seconds)
+PROGRESS_INTERVAL = 1.0
+
+# Run state saved in the output folder while sequencing, so an interrupted run can resume
+CHECKPOINT_NAME = '.poleio-checkpoint.json'
+CHECKPOINT_VERSION = 6
+CHECKPOINT_INTERVAL = 5.0  # Seconds between checkpoints
+
+############################################################################################
+
+def collect_images(folder_path, exclude=()):
+    """ Recursively collect all image files from the folder and subfolders, sorted by name. """
+    return [entry.path for entry in scan_images(folder_path, exclude)]
+
+class SequenceShot:
+    """ One image of the open sequence: its path and kind ("nadir", "orbit" or "zoom"). """
+    __slots__ = ('path', 'kind')
+
+    def __init__(self, path, kind):
+        self.path = path
+        self.kind = kind
+
+    def __repr__(self):
+        return f"SequenceShot({self.path!r}, {self.kind!r})"
+
+############################################################################################
+
+class ProgressThrottle:
+    """ Turns per-image ticks into progress(processed, total, images_per_second, eta_seconds)
+    reports, only when the integer percentage changes or PROGRESS_INTERVAL has passed. """
+
+    def __init__(self, total, callback, interval=PROGRESS_INTERVAL):
+        self.total = total
+        self.callback = callback
+        self.interval = interval
+        self.start_time = time.monotonic()
+        self.last_time = self.start_time
+        self.last_percent = -1
+
+    def update(self, processed):
+        now = time.monotonic()
+        percent = processed * 100 // self.total if self.total else 100
+        if percent == self.last_percent and now - self.last_time < self.interval and processed != self.total:
+            return
+        self.last_percent = percent
+        self.last_time = now
+
+        elapsed = now - self.start_time
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - processed) / rate if rate > 0 else 0.0
+        self.callback(processed, self.total, rate, eta)
+
+############################################################################################
+
+class PoleSequencer:
+    """ The NADIR -> orbit -> zoom state machine, fed one image at a time in capture order
+    (feed), or a whole ShotTable at once (feed_table), with the thresholds of `rules`
+    (a PoleRules, default: the built-in ones).
+
+    on_pole(pole_number, sequence) is called for every valid pole before it is counted;
+    log(message, color, level) receives the same messages the GUI has always shown, with
+    the per-image detections at DEBUG level; they are skipped while log_level (a level, or
+    a callable returning it, see level_of) is above DEBUG.
+    """
+
+    def __init__(self, on_pole=None, log=None, log_level=DEBUG, rules=None):
+        self.on_pole = on_pole or ignore
+        self.rules = rules or DEFAULT_RULES
+        self.log = log or print_log
+        self.log_level = log_level
+
+        self.nadir_found = False
+        self.zoom_found = False
+        self.orbit_count = 0
+        self.pole_count = 0
+        self.incomplete_sequence = False
+        self.valid_sequence = []
+
+        # Counters for tracking the total images, sequences, and issues
+        self.total_images_processed = 0
+        self.total_valid_sequences = 0
+        self.total_poles = 0
+        self.total_broken_sequences = 0
+        self.duplicate_nadir_count = 0
+        self.duplicate_zoom_count = 0
+        self.missing_nadir_count = 0
+        self.missing_zoom_count = 0
+
+        # One entry per sequence closed by a zoom shot (and the open one, if any), for reports
+        self.sequences = []
+        # Images that were skipped: {"type": "unreadable" / "duplicate_nadir" / "duplicate_zoom", "path"}
+        self.anomalies = []
+
+    @property
+    def log_images(self):
+        # Skip even formatting the per-image lines when nobody is going to show them
+        return level_of(self.log_level) <= DEBUG
+
+    def feed(self, image_path, info):
+        """ Advance the state machine with one image's DJIImageInfo (None if unreadable). """
+        self.total_images_processed += 1
+
+        if info is None:
+            self.log(f"Failed to extract metadata for {image_path}", "red", WARNING)
+            self.anomalies.append({"type": "unreadable", "path": image_path})
+            return
+
+        gimbal_pitch = info.gimbal_pitch
+        image_source = info.image_source
+
+        # Check for NADIR (start of a sequence)
+        if self.rules.is_nadir(gimbal_pitch):
+            if self.log_images:
+                self.log(f"NADIR shot detected: {image_path} with pitch {gimbal_pitch}", "orange", DEBUG)
+            if self.nadir_found:
+                self.duplicate_nadir_count += 1  # Count as duplicate NADIR shot
+                self.anomalies.append({"type": "duplicate_nadir", "path": image_path})
+                return
+            self.nadir_found = True
+            self.incomplete_sequence = True  # A sequence has started
+            self.valid_sequence.append(SequenceShot(image_path, "nadir"))
+
+        # Check for zoom shots using ImageSource
+        if self.rules.is_zoom(image_source):
+            if self.log_images:
+                self.log(f"Zoom shot detected: {image_path}", "magenta", DEBUG)
+            if self.zoom_found:
+                self.duplicate_zoom_count += 1  # Count duplicate zoom shots
+                self.anomalies.append({"type": "duplicate_zoom", "path": image_path})
+                return
+            self.zoom_found = True
+            self.valid_sequence.append(SequenceShot(image_path, "zoom"))
+            self.close_sequence()
+
+        # Count orbit shots (assuming orbit is anything between NADIR and zoom)
+        if self.rules.is_orbit(gimbal_pitch, image_source):
+            self.orbit_count += 1
+            self.valid_sequence.append(SequenceShot(image_path, "orbit"))
+            if self.log_images:
+                self.log(f"Orbit shot detected: {image_path}", "blue", DEBUG)
+
+    def feed_table(self, table, order=None, kinds=None):
+        """ Feed every row of a ShotTable (in `order`, row indices, if given) at once.
+
+        The rows are classified column-wise (classify_rows; pass `kinds` if already done)
+        and grouped by kind in one pass; the sequences are then cut at the zoom shots and
+        each one takes its NADIR, orbit and skipped rows as slices of those groups.
+        Counters, sequences, anomalies, on_pole calls and logs come out the same as
+        feeding the rows one by one. This is a generator: it yields the number of rows fed
+        after every closed sequence and at the end, so the caller can checkpoint or stop
+        in between.
+        """
+        if order is None:
+            order = range(len(table))
+        if kinds is None:
+            kinds = classify_rows(table, self.rules, order)
+        positions = group_kinds(kinds)
+        nadirs = merge_positions(positions[KIND_NADIR], positions[KIND_NADIR_ZOOM])
+        groups = (nadirs, positions[KIND_ORBIT], positions[KIND_UNREADABLE])
+
+        start = 0
+        for position in merge_positions(positions[KIND_ZOOM], positions[KIND_NADIR_ZOOM]):
+            if kinds[position] == KIND_NADIR_ZOOM and (
+                    self.nadir_found or bisect.bisect_left(nadirs, start) < bisect.bisect_left(nadirs, position)):
+                continue  # Only a duplicate NADIR: the NADIR check returns before the zoom one
+            self._feed_rows(table, order, kinds, groups, start, position + 1, closed=True)
+            start = position + 1
+            yield start
+        if start < len(kinds):
+            self._feed_rows(table, order, kinds, groups, start, len(kinds), closed=False)
+        yield len(kinds)
+
+    def _feed_rows(self, table, order, kinds, groups, start, end, closed):
+        """ feed() for positions [start, end) of a feed_table run; with closed=True the last
+        one is the zoom shot that ends the sequence and no other row in between is one. """
+        paths = table.paths
+        last = end - 1 if closed else end
+        nadirs, orbits, unreadable = (group[bisect.bisect_left(group, start):bisect.bisect_left(group, last)]
+                                      for group in groups)
+        self.total_images_processed += end - start
+
+        if self.log_images:
+            self._log_rows(table, order, kinds, start, end, closed)
+        else:
+            for position in unreadable:
+                self.log(f"Failed to extract metadata for {paths[order[position]]}", "red", WARNING)
+
+        first_nadir = None
+        duplicates = nadirs
+        if nadirs and not self.nadir_found:
+            first_nadir = nadirs[0]
+            duplicates = nadirs[1:]
+            self.nadir_found = True
+            self.incomplete_sequence = True
+        self.duplicate_nadir_count += len(duplicates)
+        skipped = [(position, "unreadable") for position in unreadable]
+        skipped += [(position, "duplicate_nadir") for position in duplicates]
+        for position, kind in sorted(skipped):
+            self.anomalies.append({"type": kind, "path": paths[order[position]]})
+
+        self.orbit_count += len(orbits)
+        if first_nadir is not None:
+            orbits = list(orbits)
+            bisect.insort(orbits, first_nadir)
+        self.valid_sequence.extend(
+            SequenceShot(paths[order[position]], "nadir" if position == first_nadir else "orbit")
+            for position in orbits)
+
+        if closed:
+            path = paths[order[last]]
+            if kinds[last] == KIND_NADIR_ZOOM:
+                self.nadir_found = True
+                self.incomplete_sequence = True
+                self.valid_sequence.append(SequenceShot(path, "nadir"))
+            self.zoom_found = True
+            self.valid_sequence.append(SequenceShot(path, "zoom"))
+            self.close_sequence()
+
+    def _log_rows(self, table, order, kinds, start, end, closed):
+        """ The per-image DEBUG lines (and unreadable warnings) of feed(), in feed order. """
+        paths = table.paths
+        pitches = table.columns['gimbal_pitch']
+        for position in range(start, end):
+            kind = kinds[position]
+            path = paths[order[position]]
+            if kind == KIND_UNREADABLE:
+                self.log(f"Failed to extract metadata for {path}", "red", WARNING)
+            elif kind == KIND_ORBIT:
+                self.log(f"Orbit shot detected: {path}", "blue", DEBUG)
+            else:
+                if kind in NADIR_KINDS:
+                    self.log(f"NADIR shot detected: {path} with pitch {pitches[order[position]]}", "orange", DEBUG)
+                if kind == KIND_ZOOM or (closed and position == end - 1):
+                    self.log(f"Zoom shot detected: {path}", "magenta", DEBUG)
+
+    def close_sequence(self):
+        """ A zoom shot ends the sequence: count it as a pole or as broken, then reset. """
+        # A valid sequence is found when NADIR and orbit shots precede a zoom shot
+        if self.nadir_found and self.orbit_count >= self.rules.min_orbit_shots:
+            self.pole_count += 1
+            self.total_valid_sequences += 1
+            self.total_poles += 1  # Count unique poles based on zoom shots
+            self.sequences.append(self._sequence_entry("valid", None))
+
+            self.on_pole(self.pole_count, list(self.valid_sequence))
+            self.log(f"Valid pole sequence #{self.pole_count} completed.", "green", INFO)
+        else:
+            # Sequence is incomplete, increment broken sequences only if NADIR or Zoom is missing
+            self.log("Incomplete sequence, missing orbit shots, NADIR, or Zoom.", "red", WARNING)
+            if not self.nadir_found:
+                reason = "missing NADIR"
+            else:
+                reason = f"only {self.orbit_count} orbit shots"
+            self.sequences.append(self._sequence_entry("incomplete", reason))
+            if not self.nadir_found or not self.zoom_found:
+                self.total_broken_sequences += 1
+                if not self.nadir_found:
+                    self.missing_nadir_count += 1
+                if not self.zoom_found:
+                    self.missing_zoom_count += 1
+        self.valid_sequence.clear()
+
+        # Reset sequence tracking
+        self.nadir_found = False
+        self.zoom_found = False
+        self.orbit_count = 0
+        self.incomplete_sequence = False
+
+    def finish(self):
+        """ Report the open sequence (if any) and log the final tally. """
+        if self.incomplete_sequence:
+            first_image = self.valid_sequence[0].path if self.valid_sequence else "Unknown"
+            last_image = self.valid_sequence[-1].path if self.valid_sequence else "Unknown"
+            self.log(f"Incomplete sequence found between {first_image} and {last_image}.", "red", WARNING)
+            self.sequences.append(self._sequence_entry("incomplete", "missing zoom"))
+
+        # Log the final tally with newlines for readability
+        self.log(f"Total Images Processed: {self.total_images_processed}\n", "black", INFO)
+        self.log(f"Total Valid Pole Sequences: {self.total_valid_sequences}\n", "black", INFO)
+        self.log(f"Total Poles (unique zoom shots): {self.total_poles}\n", "black", INFO)
+        self.log(f"Total Broken Image Sequences: {self.total_broken_sequences}\n", "black", INFO)
+        self.log(f"Duplicate NADIR Shots: {self.duplicate_nadir_count}\n", "black", INFO)
+        self.log(f"Duplicate Zoom Shots: {self.duplicate_zoom_count}\n", "black", INFO)
+        self.log(f"Broken Sequences due to missing NADIR: {self.missing_nadir_count}\n", "black", INFO)
+        self.log(f"Broken Sequences due to missing ZOOM: {self.missing_zoom_count}\n", "black", INFO)
+
+        self.log(f"Total valid pole sequences: {self.pole_count}", "black", INFO)
+
+    def summary(self):
+        return {
+            "total_images_processed": self.total_images_processed,
+            "total_valid_sequences": self.total_valid_sequences,
+            "total_poles": self.total_poles,
+            "total_broken_sequences": self.total_broken_sequences,
+            "duplicate_nadir_count": self.duplicate_nadir_count,
+            "duplicate_zoom_count": self.duplicate_zoom_count,
+            "missing_nadir_count": self.missing_nadir_count,
+            "missing_zoom_count": self.missing_zoom_count,
+        }
+
+    # Everything feed() depends on, for checkpoints
+    STATE_FIELDS = ('nadir_found', 'zoom_found', 'orbit_count', 'pole_count', 'incomplete_sequence',
+                    'valid_sequence', 'total_images_processed', 'total_valid_sequences', 'total_poles',
+                    'total_broken_sequences', 'duplicate_nadir_count', 'duplicate_zoom_count',
+                    'missing_nadir_count', 'missing_zoom_count', 'sequences', 'anomalies')
+
+    def state(self):
+        """ JSON-serialisable snapshot of the counters and the open sequence. """
+        state = {field: getattr(self, field) for field in self.STATE_FIELDS}
+        state['valid_sequence'] = [[shot.path, shot.kind] for shot in self.valid_sequence]
+        return state
+
+    def restore(self, state):
+        """ Continue from a state() snapshot, as if its images had just been fed. """
+        for field in self.STATE_FIELDS:
+            setattr(self, field, state[field])
+        self.valid_sequence = [SequenceShot(path, kind) for path, kind in state['valid_sequence']]
+
+    def _sequence_entry(self, status, reason):
+        paths = {"nadir": None, "zoom": None, "orbit": []}
+        for shot in self.valid_sequence:
+            if shot.kind == "orbit":
+                paths["orbit"].append(shot.path)
+            else:
+                paths[shot.kind] = shot.path
+        return {
+            "pole": self.pole_count if status == "valid" else None,
+            "status": status,
+            "reason": reason,
+            "nadir": paths["nadir"],
+            "orbits": paths["orbit"],
+            "zoom": paths["zoom"],
+        }
+
+############################################################################################
+
+class PoleVerifier:
+    """ One verification run: extract metadata for image_files, sequence them and move every
+    valid pole into output_folder (nothing is moved with dry_run=True).
+
+    image_files is a list of paths / ImageEntry objects, a FolderScanner (processing starts
+    while the folder is still being walked) or a FolderWatcher (images are sequenced as they
+    are copied in). Sequences follow capture time or scan `order` and the thresholds of
+    `rules` (a PoleRules). Optional stages: resume from the checkpoint of an interrupted run,
+    dedupe copies of images already seen, and check each pole against the PoleIndex.
+
+    `control` (a RunControl) pauses or cancels the run between images; a RunProfile, if
+    given, collects the stage timings. Callbacks: log(message, color, level),
+    progress(processed, total, images_per_second, eta_seconds) (throttled, see
+    ProgressThrottle) and pole_count(count). run() returns a report dict with the summary
+    counters and one entry per sequence.
+    """
+
+    def __init__(self, image_files, output_folder, max_workers=None, use_processes=False,
+                 use_cache=True, cache_path=None, log=None, progress=None, pole_count=None,
+                 log_level=DEBUG, order=ORDER_BY_CAPTURE, move_workers=DEFAULT_MOVE_WORKERS,
+                 dry_run=False, resume=False, control=None, profile=None, rules=None, dedupe=False,
+                 fingerprint_path=None, use_pole_index=True, pole_index_path=None):
+        if isinstance(image_files, FolderWatcher):
+            order = ORDER_BY_NAME
+            max_workers = 1
+        self.image_files = image_files
+        self.output_folder = output_folder
+        self.max_workers = max_workers  # None = MetadataPool default, 1 = read files inline
+        self.use_processes = use_processes
+        self.use_cache = use_cache
+        self.cache_path = cache_path    # None = per-user cache dir
+        self.cache = None
+        self.log = log or print_log
+        self.progress = progress or ignore
+        self.pole_count = pole_count or ignore
+        self.log_level = log_level
+        self.order = order
+        self.move_workers = move_workers
+        self.dry_run = dry_run
+        self.resume = resume
+        self.control = control or RunControl()
+        self.profile = profile
+        self.rules = rules or DEFAULT_RULES
+        self.dedupe = dedupe
+        self.fingerprint_path = fingerprint_path  # None = per-user cache dir
+        self.fingerprints = None
+        self.relocate_fingerprints = True  # Off once the index couldn't be written to
+        self.duplicates = []
+        self.relocated = deque()  # (pole_number, [(src, dst), ...]) of moved poles, from the mover threads
+        # Moved files whose name FileMover changed to avoid a clash (all others keep their name)
+        self.renamed = {}
+        self.use_pole_index = use_pole_index
+        self.pole_index_path = pole_index_path  # None = per-user cache dir
+        self.pole_index = None
+        self.closed_poles = deque()  # (pole_number, sequence) waiting for a position
+        self.open_shots = {}         # Path -> GPS of the images fed since the last sequence closed
+        self.pole_locations = {}     # Pole number -> (position, poles nearby)
+        # Keys this run's poles in the PoleIndex; a resumed run continues with its checkpoint's
+        self.run_id = uuid.uuid4().hex
+        self.mover = None
+        self.failed_moves = set()
+
+        self.checkpoint_path = os.path.join(output_folder, CHECKPOINT_NAME)
+        self.last_checkpoint = time.monotonic()
+        # Images fed so far that are still in the input tree (all but those of moved poles)
+        self.unmoved = {}
+        self.pole_paths = {}
+        self.moved_poles = deque()  # Filled by the mover threads, applied on the run thread
+        self.skipped = 0
+
+    def run(self):
+        sequencer = PoleSequencer(on_pole=self.move_pole, log=self.log, log_level=self.log_level,
+                                  rules=self.rules)
+        scanner = self.image_files if isinstance(self.image_files, (FolderScanner, FolderWatcher)) else None
+        resumed = not self.dry_run and self.resume_from_checkpoint(sequencer)
+
+        image_files = self.image_files
+        if resumed and scanner is None:
+            image_files = [item for item in image_files if _item_path(item) not in self.unmoved]
+            self.skipped = len(self.image_files) - len(image_files)
+        elif resumed:
+            image_files = self.skip_seen(scanner)
+        listed = None if scanner else len(image_files)
+        progress = ProgressThrottle(listed or 0, self.progress)
+
+        # The cache's SQLite connection belongs to the thread that runs the verification
+        cache = None
+        if self.use_cache:
+            try:
+                cache = self.cache = MetadataCache(self.cache_path)
+            except Exception as e:
+                self.log(f"Metadata cache unavailable, reading all files: {e}", "red", WARNING)
+
+        if self.use_pole_index:
+            try:
+                self.pole_index = PoleIndex(self.pole_index_path, record=not self.dry_run)
+            except Exception as e:
+                self.log(f"Pole index unavailable, not checking for re-flown poles: {e}", "red", WARNING)
+
+        # Copies of images seen before are dropped here, before any metadata is read
+        unique_stream = None
+        if self.dedupe:
+            try:
+                self.fingerprints = FingerprintIndex(self.fingerprint_path)
+            except Exception as e:
+                self.log(f"Fingerprint index unavailable, not checking for duplicates: {e}", "red", WARNING)
+        if self.fingerprints is not None:
+            image_files = unique_stream = iter_unique(image_files, self.fingerprints, on_duplicate=self.duplicate_found,
+                                                      max_workers=self.max_workers or DEFAULT_FINGERPRINT_WORKERS,
+                                                      profile=self.profile, log=self.log)
+
+        if isinstance(self.image_files, FolderWatcher):
+            # Nothing is written while the watch waits: don't keep the shared files locked meanwhile
+            self.image_files.on_idle = self.flush_stores
+        if not self.dry_run:
+            self.mover = FileMover(self.output_folder, max_workers=self.move_workers, log=self.log,
+                                   on_batch_done=self.pole_moved, control=self.control,
+                                   profile=self.profile,
+                                   on_files_moved=self.files_moved, run_id=self.run_id)
+        # Metadata is extracted ahead on a pool but handed back in the original sorted order
+        metadata_stream = iter_metadata(image_files, max_workers=self.max_workers,
+                                        use_processes=self.use_processes, cache=cache,
+                                        profile=self.profile, log=self.log)
+        completed = False
+        cancelled = False
+        try:
+
+            if self.order == ORDER_BY_CAPTURE:
+                # Header-only pass over everything first (kept column-wise, see ShotTable),
+                # then sequence by capture time
+                table = ShotTable()
+                for image_file, info in metadata_stream:
+                    self.control.check()
+                    table.append(image_file, info)
+                    self.update_progress(progress, scanner, listed, len(table))
+                # Sequencing and moving write nothing to these: don't hold their files meanwhile
+                self.flush_stores()
+
+                start = time.perf_counter()
+                order = table.capture_order()
+                if self.profile is not None:
+                    self.profile.record("order", time.perf_counter() - start)
+                out_of_order = sum(1 for position, index in enumerate(order) if position != index)
+                if out_of_order:
+                    self.log(f"Capture time order moves {out_of_order} images from their file name position",
+                             "orange", INFO)
+                self.feed_table(sequencer, table, order)
+            else:
+                for idx, (image_file, info) in enumerate(metadata_stream):
+                    self.feed(sequencer, image_file, info)
+                    self.update_progress(progress, scanner, listed, idx + 1)
+            completed = True
+        except Cancelled:
+            cancelled = True
+            self.log(f"Cancelled after {sequencer.total_images_processed} images; "
+                     f"finishing the moves already queued", "orange", WARNING)
+        finally:
+            # Stops the reads queued ahead on the pool (and with them the folder scan)
+            metadata_stream.close()
+            if unique_stream is not None:
+                unique_stream.close()
+            if cache is not None:
+                self.log(f"Metadata cache: {cache.hits} hits, {cache.misses} misses", "black", INFO)
+                self.close_store(cache, "Metadata cache")
+                self.cache = None
+            # Detection is done; wait for the moves still in flight
+            if self.mover is not None:
+                start = time.perf_counter()
+                self.mover.close()
+                if self.profile is not None:
+                    self.profile.record("move_wait", time.perf_counter() - start)
+                self.apply_relocations()
+                if completed:
+                    self.remove_checkpoint()
+                else:
+                    # Every move has settled, so this checkpoint matches the folder exactly
+                    self.save_checkpoint(sequencer)
+            if self.fingerprints is not None:
+                if self.duplicates:
+                    self.log(f"Skipped {len(self.duplicates)} images that were copies of images seen before "
+                             f"({self.fingerprints.full_hashes} full-file checks)", "orange", INFO)
+                self.close_store(self.fingerprints, "Fingerprint index")
+            if self.pole_index is not None:
+                reflown = sum(1 for position, nearby in self.pole_locations.values() if nearby)
+                if reflown:
+                    self.log(f"{reflown} poles were found where a pole had already been flown", "orange", INFO)
+                self.close_store(self.pole_index, "Pole index")
+
+        for entry in sequencer.sequences:
+            if entry["status"] == "valid":
+                entry["moved"] = not self.dry_run and entry["pole"] not in self.failed_moves
+                if entry["moved"]:
+                    entry["moved_to"] = {"nadir": self.destination(entry["nadir"]),
+                                         "orbits": [self.destination(path) for path in entry["orbits"]],
+                                         "zoom": self.destination(entry["zoom"])}
+                self.add_location(entry)
+        if not cancelled:
+            sequencer.finish()
+        return {
+            "output_folder": self.output_folder,
+            "dry_run": self.dry_run,
+            "resumed": resumed,
+            "cancelled": cancelled,
+            "rules": self.rules.to_dict(),
+            "summary": sequencer.summary(),
+            "sequences": sequencer.sequences,
+            "anomalies": sequencer.anomalies,
+            "duplicates": self.duplicates,
+        }
+
+    def feed(self, sequencer, image_file, info):
+        self.control.check()
+        if info is not None:
+            self.open_shots[image_file] = (info.latitude, info.longitude, info.absolute_altitude)
+        if self.profile is None:
+            sequencer.feed(image_file, info)
+        else:
+            start = time.perf_counter()
+            sequencer.feed(image_file, info)
+            self.profile.record("sequence", time.perf_counter() - start)
+        if self.closed_poles:
+            self.locate_poles(self.open_shots.get)
+        if not sequencer.valid_sequence:
+            self.open_shots.clear()  # No open sequence left to need them
+        self.unmoved[image_file] = None
+        if self.relocated:
+            self.apply_relocations()
+        self.maybe_checkpoint(sequencer)
+
+    def update_progress(self, progress, scanner, listed, processed):
+        # Skipped copies never reach the sequencer, so they don't count towards the total
+        found = scanner.found - self.skipped if scanner is not None else listed
+        progress.total = found - len(self.duplicates)
+        progress.update(processed)
+
+    def feed_table(self, sequencer, table, order):
+        start = time.perf_counter()
+        kinds = classify_rows(table, self.rules, order)
+        if self.profile is not None:
+            self.profile.record("classify", time.perf_counter() - start)
+
+        fed = 0
+        self.control.check()
+        start = time.perf_counter()
+        # Resumes between sequences: a pause / cancel / checkpoint never splits one
+        for position in sequencer.feed_table(table, order, kinds):
+            if self.profile is not None:
+                self.profile.record("sequence", time.perf_counter() - start)
+            if self.closed_poles:
+                # The pole closed this step is made of rows fed in it (or restored from a checkpoint)
+                rows = {table.paths[index]: index for index in order[fed:position]}
+                self.locate_poles(lambda path: _table_gps(table, rows.get(path)))
+            for index in order[fed:position]:
+                self.unmoved[table.paths[index]] = None
+            fed = position
+            if self.relocated:
+                self.apply_relocations()
+            self.maybe_checkpoint(sequencer)
+            self.control.check()
+            start = time.perf_counter()
+
+    def maybe_checkpoint(self, sequencer):
+        if not self.dry_run and time.monotonic() - self.last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.save_checkpoint(sequencer)
+
+    def skip_seen(self, image_files):
+        """ Drop the images a resumed checkpoint has already fed to the sequencer. """
+        for item in image_files:
+            if _item_path(item) in self.unmoved:
+                self.skipped += 1
+                continue
+            yield item
+
+    def move_pole(self, pole_number, sequence):
+        self.closed_poles.append((pole_number, sequence))
+        paths = pole_files(shot.path for shot in sequence)
+        if self.dry_run:
+            self.log(f"Pole #{pole_number}: would move {len(paths)} images", "black", DEBUG)
+            self.pole_count(pole_number)
+            return
+        # Queued, not waited on: the mover logs "Moved ..." (or rolls back) when it is done
+        self.pole_paths[pole_number] = paths
+        self.mover.submit(pole_number, paths)
+        self.pole_count(pole_number)
+
+    def locate_poles(self, shot_gps):
+        """ Position the poles closed since the last call and check them against the pole index.
+        shot_gps(path) gives (latitude, longitude, altitude) of a fed image, or None. """
+        job = os.path.abspath(self.output_folder)
+        while self.closed_poles:
+            pole_number, sequence = self.closed_poles.popleft()
+            start = time.perf_counter()
+            shots = []
+            zoom = nadir = None
+            for shot in sequence:
+                gps = shot_gps(shot.path)
+                if gps is not None:
+                    shots.append((shot.kind,) + gps)
+                # Updated to where the files end up once they are moved (see apply_relocations)
+                if shot.kind == "zoom":
+                    zoom = shot.path
+                elif shot.kind == "nadir":
+                    nadir = shot.path
+            position = pole_position(shots)
+            nearby = []
+            if position is None:
+                self.log(f"Pole #{pole_number} has no GPS position; not checked for a re-flown pole",
+                         "orange", INFO)
+            elif self.pole_index is not None:
+                latitude, longitude, altitude = position
+                try:
+                    nearby = self.pole_index.within(latitude, longitude, REFLOWN_RADIUS_METERS,
+                                                    exclude=(self.run_id, pole_number))
+                    self.pole_index.add(self.run_id, pole_number, job, latitude, longitude, altitude,
+                                        nadir=nadir, zoom=zoom)
+                except sqlite3.OperationalError as e:
+                    self.pole_index = self.store_failed(self.pole_index, "Pole index", e)
+                for other in nearby:
+                    where = "this run" if other["run"] == self.run_id else other["job"]
+                    self.log(f"Pole #{pole_number} is {other['distance']:.1f} m from pole #{other['pole']} "
+                             f"of {where}: flown twice?", "orange", WARNING)
+            self.pole_locations[pole_number] = (position, nearby)
+            if self.profile is not None:
+                self.profile.record("locate", time.perf_counter() - start)
+
+    def add_location(self, entry):
+        """ The position and re-flown matches of a valid sequence's report entry (None for
+        poles sequenced before a resumed checkpoint). """
+        position, nearby = self.pole_locations.get(entry["pole"], (None, []))
+        entry["position"] = None
+        if position is not None:
+            entry["position"] = {"latitude": position[0], "longitude": position[1], "altitude": position[2]}
+        entry["reflown_of"] = [{"job": other["job"], "pole": other["pole"], "distance": other["distance"]}
+                               for other in nearby]
+
+    def duplicate_found(self, image_path, original_path):
+        self.duplicates.append({"path": image_path, "original": original_path})
+        if level_of(self.log_level) <= DEBUG:
+            self.log(f"Skipping {image_path}: same image as {original_path}", "orange", DEBUG)
+
+    def flush_stores(self):
+        """ Commit the pending writes of the metadata cache and the fingerprint index. """
+        for store in (self.cache, self.fingerprints):
+            if store is not None:
+                try:
+                    store.flush()
+                except sqlite3.OperationalError as e:
+                    # Kept pending; the next commit tries again
+                    self.log(f"Could not commit to {store.path}: {e}", "orange", WARNING)
+
+    def store_failed(self, store, name, error):
+        """ Carry on without a shared index whose file can't be used (locked by another job past
+        SQLite's timeout) instead of failing the job; returns the None to replace it with. """
+        self.log(f"{name} unavailable, continuing without it: {error}", "red", WARNING)
+        self.close_store(store, name)
+        return None
+
+    def close_store(self, store, name):
+        try:
+            store.close()
+        except sqlite3.Error as e:
+            self.log(f"{name}: last writes not saved: {e}", "red", WARNING)
+
+    def files_moved(self, pole_number, moves):
+        self.relocated.append((pole_number, moves))
+
+    def apply_relocations(self):
+        # The indexes are used on the run thread only
+        while self.relocated:
+            pole_number, moves = self.relocated.popleft()
+            for src, dst in moves:
+                if dst != os.path.join(self.output_folder, os.path.basename(src)):
+                    self.renamed[src] = dst
+                if self.fingerprints is not None and self.relocate_fingerprints:
+                    try:
+                        self.fingerprints.relocate(src, dst)
+                    except sqlite3.OperationalError as e:
+                        # Not closed: the dedupe stream may still be using it
+                        self.log(f"Fingerprint index not updated for moved files: {e}", "red", WARNING)
+                        self.relocate_fingerprints = False
+            if self.pole_index is not None:
+                try:
+                    self.pole_index.relocate(self.run_id, pole_number, dict(moves))
+                except sqlite3.OperationalError as e:
+                    self.pole_index = self.store_failed(self.pole_index, "Pole index", e)
+
+    def destination(self, path):
+        """ Where a moved image is now. """
+        if path is None:
+            return None
+        return self.renamed.get(path) or os.path.join(self.output_folder, os.path.basename(path))
+
+    def pole_moved(self, pole_number, moved_ok):
+        if not moved_ok:
+            self.failed_moves.add(pole_number)
+        self.moved_poles.append((pole_number, moved_ok))
+
+    ########################################################################################
+
+    def resume_from_checkpoint(self, sequencer):
+        """ Restore the state of an interrupted run, if there is one. Returns True if resumed. """
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            self.log(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {e}", "red", WARNING)
+            return False
+
+        if not self.resume:
+            self.log(f"{self.output_folder} holds the checkpoint of an interrupted run; starting over "
+                     f"(resume to continue from it)", "orange", WARNING)
+            return False
+        if (checkpoint.get("version") != CHECKPOINT_VERSION or checkpoint.get("order") != self.order
+                or checkpoint.get("rules") != self.rules.to_dict()):
+            self.log("The checkpoint was written by a different version, image order or rule set; starting over",
+                     "orange", WARNING)
+            return False
+
+        state = checkpoint["sequencer"]
+        # Moves after the checkpoint are undone, so the images they took are sequenced again
+        self.run_id = checkpoint["run_id"]
+        self.renamed = checkpoint["renamed"]
+        rewind_moves(self.output_folder, self.run_id, state["pole_count"], log=self.log,
+                     on_files_moved=self.files_moved)
+        sequencer.restore(state)
+        self.failed_moves = set(checkpoint["failed_moves"])
+        self.unmoved = dict.fromkeys(checkpoint["unmoved"])
+        self.pole_count(sequencer.pole_count)
+        self.log(f"Resuming after {sequencer.total_images_processed} images and {sequencer.pole_count} poles",
+                 "green", INFO)
+        return True
+
+    def save_checkpoint(self, sequencer):
+        # Images of poles that have left the tree need not be remembered any more
+        while self.moved_poles:
+            pole_number, moved_ok = self.moved_poles.popleft()
+            paths = self.pole_paths.pop(pole_number, ())
+            if moved_ok:
+                for path in paths:
+                    self.unmoved.pop(path, None)
+
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "run_id": self.run_id,
+            "order": self.order,
+            "rules": self.rules.to_dict(),
+            "sequencer": sequencer.state(),
+            "failed_moves": sorted(self.failed_moves),
+            "unmoved": list(self.unmoved),
+            "renamed": self.renamed,
+        }
+        temp_path = self.checkpoint_path + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(checkpoint, f)
+            os.replace(temp_path, self.checkpoint_path)
+        except OSError as e:
+            self.log(f"Could not save checkpoint: {e}", "red", WARNING)
+        self.last_checkpoint = time.monotonic()
+
+    def remove_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+def pole_files(paths):
+    """ The files of a pole, each once and in sequence order: a zoom shot pointing straight
+    down (KIND_NADIR_ZOOM) is both the pole's NADIR and its zoom, but one file. """
+    return list(dict.fromkeys(paths))
+
+def _item_path(item):
+    return item.path if isinstance(item, ImageEntry) else item
+
+def _table_gps(table, index):
+    """ (latitude, longitude, altitude) of a ShotTable row, None values for missing fields. """
+    if index is None or not table.readable[index]:
+        return None
+    values = [table.columns[name][index] for name in ('latitude', 'longitude', 'absolute_altitude')]
+    return tuple(None if value != value else value for value in values)  # NaN = missing
+
+
+############################################################################################
+
+MANIFEST_VERSION = 1
+
+def write_manifest(report, manifest_path, folder=None, node_name=None):
+    """ Save a dry-run report as a move manifest: one entry per pole with its NADIR, orbit
+    and zoom paths, plus the incomplete sequences, anomalies and skipped copies for review. """
+    poles = []
+    for entry in report["sequences"]:
+        if entry["status"] != "valid":
+            continue
+        poles.append({
+            "pole": entry["pole"],
+            "nadir": entry["nadir"],
+            "orbits": entry["orbits"],
+            "zoom": entry["zoom"],
+            "count": len(pole_files([entry["nadir"]] + entry["orbits"] + [entry["zoom"]])),
+            "position": entry.get("position"),
+        })
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "folder": folder,
+        "node": node_name,
+        "output_folder": report["output_folder"],
+        "summary": report["summary"],
+        "poles": poles,
+        "incomplete": [entry for entry in report["sequences"] if entry["status"] != "valid"],
+        "anomalies": report.get("anomalies", []),
+        "duplicates": report.get("duplicates", []),
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def apply_manifest(manifest_path, log=None, move_workers=DEFAULT_MOVE_WORKERS):
+    """ Move every pole listed in a manifest into its output folder in one bulk pass, using
+    the same journaled FileMover as a live run. Poles with missing files are skipped whole.
+    Returns (poles_moved, poles_skipped). """
+    log = log or print_log
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version: {manifest.get('version')}")
+
+    output_folder = manifest["output_folder"]
+    os.makedirs(output_folder, exist_ok=True)
+
+    results = []
+    skipped = 0
+    mover = FileMover(output_folder, max_workers=move_workers, log=log)
+    try:
+        for pole in manifest["poles"]:
+            paths = pole_files([pole["nadir"]] + pole["orbits"] + [pole["zoom"]])
+            missing = [path for path in paths if not os.path.exists(path)]
+            if missing:
+                skipped += 1
+                log(f"Skipping pole #{pole['pole']}: {len(missing)} of its images are gone (e.g. {missing[0]})",
+                    "red", WARNING)
+                continue
+            results.append(mover.submit(pole["pole"], paths))
+    finally:
+        mover.close()
+
+    moved = sum(1 for future in results if future.result())
+    return moved, skipped + len(results) - moved
@@ -0,0 +1,360 @@
+import os
+import sys
+import csv
+import json
+import time
+import signal
+import argparse
+import datetime
+import threading
+from PoleCore import PoleVerifier, ORDER_BY_CAPTURE, ORDER_BY_NAME, write_manifest, apply_manifest
+from FolderScan import FolderScanner
+from FolderWatch import FolderWatcher, SETTLE_SECONDS, POLL_INTERVAL
+from BatchScheduler import BatchScheduler, DEFAULT_MAX_JOBS, DEFAULT_PER_DISK
+from LogChannel import DEBUG, INFO, ERROR
+from FileMover import recover_moves
+from RunControl import RunControl
+from RunProfile import RunProfile, run_with_cprofile
+from PoleRules import load_rules
+from PoleIndex import PoleIndex, DEFAULT_QUERY_RADIUS_METERS
+
+# Headless entry point: same verification as the GUI, without importing Qt.
+#   python PoleIO-CLI.py verify <folder> --node NAME [--jobs N] [--report out.json|out.csv]
+#   python PoleIO-CLI.py batch --job <folder> <node> [--job ...] [--list jobs.csv] [--parallel N]
+#   python PoleIO-CLI.py plan <folder> --node NAME --manifest plan.json   (moves nothing)
+#   python PoleIO-CLI.py plan <folder> --node NAME --manifest plan.json --rules rules.json --rule-set acme
+#   python PoleIO-CLI.py batch --list jobs.csv --dedupe   (skip copies of images seen before)
+#   python PoleIO-CLI.py apply plan.json
+#   python PoleIO-CLI.py watch <ingest folder> --node NAME [--idle-exit 600]   (verify cards as they are copied)
+#   python PoleIO-CLI.py poles <latitude> <longitude> [--radius 50]   (poles of earlier runs nearby)
+#   python PoleIO-CLI.py recover <output folder> [--resume]
+
+####################################################################
+
+# Jobs, pool workers and mover threads all log; one line is printed at a time. Reentrant:
+# the Ctrl+C handler logs on the main thread, maybe while it is printing
+_log_lock = threading.RLock()
+
+def log_message(message, color=None, level=INFO):
+    current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    line = f"{current_time}: {message.rstrip()}"
+    with _log_lock:
+        print(line, flush=True)
+
+def make_logger(args):
+    """ log(message, color, level) for the chosen verbosity: --verbose adds per-image lines,
+    --quiet keeps only errors. """
+    if args.verbose:
+        min_level = DEBUG
+    elif args.quiet:
+        min_level = ERROR
+    else:
+        min_level = INFO
+
+    def log(message, color=None, level=INFO):
+        if level >= min_level:
+            log_message(message, color, level)
+    log.level = min_level
+    return log
+
+def cancel_on_interrupt(control):
+    """ The first Ctrl+C cancels the run cleanly (moves finish, a checkpoint is saved);
+    a second one aborts at once. """
+    def interrupted(signum, frame):
+        log_message("Cancelling, press Ctrl+C again to abort at once...")
+        control.cancel()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGINT, interrupted)
+
+def run_profiled(args, run, profile):
+    """ run() under cProfile if --cprofile was given; then log and save the --profile timings. """
+    if args.cprofile:
+        result = run_with_cprofile(run, args.cprofile)
+        log_message(f"cProfile stats written to {args.cprofile}")
+    else:
+        result = run()
+    if profile is not None:
+        for line in profile.format_lines():
+            log_message(line)
+        profile.save(args.profile)
+        log_message(f"Run profile written to {args.profile}")
+    return result
+
+def rules_from_args(args):
+    """ The --rules / --rule-set PoleRules, or None for the built-in ones. """
+    if args.rules is None:
+        if args.rule_set is not None:
+            raise ValueError("--rule-set needs --rules <file>")
+        return None
+    rules = load_rules(args.rules, args.rule_set)
+    log_message(f"Using rule set {rules.name!r} from {args.rules}")
+    return rules
+
+def write_report(report, report_path):
+    """ Write the run report as JSON, or as CSV (one row per sequence) if the name ends in .csv. """
+    if report_path.lower().endswith('.csv'):
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["pole", "status", "reason", "nadir", "orbit_count", "zoom", "first_orbit", "last_orbit"])
+            for seq in report["sequences"]:
+                orbits = seq["orbits"]
+                writer.writerow([seq["pole"] or "", seq["status"], seq["reason"] or "", seq["nadir"] or "",
+                                 len(orbits), seq["zoom"] or "",
+                                 orbits[0] if orbits else "", orbits[-1] if orbits else ""])
+    else:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+####################################################################
+
+def verify_command(args):
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        log_message(f"Not a folder: {folder}")
+        return 1
+
+    try:
+        rules = rules_from_args(args)
+    except (OSError, ValueError) as e:
+        log_message(f"Can't load rules: {e}")
+        return 1
+
+    # Same layout as the GUI: the node folder is created inside the image folder
+    dry_run = args.command == "plan"
+    output_folder = os.path.join(folder, args.node)
+    if not os.path.exists(output_folder) and not dry_run:
+        os.makedirs(output_folder)
+        log_message(f"Created output folder at: {output_folder}")
+
+    profile = RunProfile() if args.profile else None
+    log = make_logger(args)
+    control = RunControl()
+    cancel_on_interrupt(control)
+    watching = args.command == "watch"
+    if watching:
+        # Runs until Ctrl+C (or --idle-exit); poles are moved as soon as their zoom shot lands
+        scanner = FolderWatcher(folder, exclude=[output_folder], settle=args.settle,
+                                poll_interval=args.poll_interval, idle_timeout=args.idle_exit,
+                                use_inotify=not args.polling, control=control, log=log)
+    else:
+        # Metadata extraction starts while the folder is still being walked
+        log_message(f"Scanning {folder}...")
+        scanner = FolderScanner(folder, exclude=[output_folder], profile=profile)
+    verifier = PoleVerifier(scanner, output_folder,
+                            max_workers=args.jobs,
+                            use_processes=args.processes,
+                            use_cache=not args.no_cache,
+                            cache_path=args.cache,
+                            log=log,
+                            log_level=log.level,
+                            order=args.order,
+                            dry_run=dry_run,
+                            resume=args.resume,
+                            control=control,
+                            profile=profile,
+                            rules=rules,
+                            dedupe=args.dedupe,
+                            fingerprint_path=args.fingerprints,
+                            use_pole_index=not args.no_pole_index,
+                            pole_index_path=args.pole_index)
+    report = run_profiled(args, verifier.run, profile)
+    report["folder"] = folder
+    report["node"] = args.node
+
+    if report["cancelled"] and watching:
+        log_message("Stopped watching; run again with --resume to continue the open sequence")
+        return 0
+    if report["cancelled"]:
+        log_message("Cancelled" if dry_run else "Cancelled; run again with --resume to continue")
+    elif dry_run:
+        manifest = write_manifest(report, args.manifest, folder=folder, node_name=args.node)
+        log_message(f"Manifest with {len(manifest['poles'])} poles written to {args.manifest}")
+
+    if args.report:
+        write_report(report, args.report)
+        log_message(f"Report written to {args.report}")
+    else:
+        for key, value in report["summary"].items():
+            print(f"{key}: {value}")
+    return 1 if report["cancelled"] else 0
+
+def read_job_list(list_path):
+    """ folder,node pairs from a CSV file (one job per line, '#' lines ignored). """
+    jobs = []
+    with open(list_path, newline='') as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().startswith('#'):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"Expected 'folder,node' in {list_path}, got: {','.join(row)}")
+            jobs.append((row[0].strip(), row[1].strip()))
+    return jobs
+
+def batch_command(args):
+    job_specs = list(args.job or [])
+    if args.list:
+        job_specs.extend(read_job_list(args.list))
+    if not job_specs:
+        log_message("No jobs given, use --job <folder> <node> or --list jobs.csv")
+        return 1
+
+    def job_finished(job):
+        totals = scheduler.totals()
+        log_message(f"Job {job.node_name} {job.status}: {job.pole_count} poles from {job.image_count} images "
+                    f"({totals['done'] + totals['failed']}/{totals['jobs']} jobs, {totals['poles']} poles total)")
+
+    try:
+        rules = rules_from_args(args)
+    except (OSError, ValueError) as e:
+        log_message(f"Can't load rules: {e}")
+        return 1
+
+    log = make_logger(args)
+    profile = RunProfile() if args.profile else None
+    scheduler = BatchScheduler(max_jobs=args.parallel, per_disk=args.per_disk, max_workers=args.jobs,
+                               use_processes=args.processes, use_cache=not args.no_cache, cache_path=args.cache,
+                               log=log, log_level=log.level, order=args.order, resume=args.resume,
+                               on_job_finished=job_finished, profile=profile, rules=rules,
+                               dedupe=args.dedupe, fingerprint_path=args.fingerprints,
+                               use_pole_index=not args.no_pole_index, pole_index_path=args.pole_index)
+    cancel_on_interrupt(scheduler.control)
+    for folder, node_name in job_specs:
+        if not os.path.isdir(folder):
+            log_message(f"Skipping {folder}: not a folder")
+            continue
+        scheduler.submit(folder, node_name)
+
+    jobs = run_profiled(args, scheduler.run, profile)
+    totals = scheduler.totals()
+
+    if args.report:
+        if args.report.lower().endswith('.csv'):
+            with open(args.report, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["folder", "node", "status", "image_count", "pole_count", "broken_sequences", "error"])
+                for job in jobs:
+                    summary = job.report["summary"] if job.report else {}
+                    writer.writerow([job.folder, job.node_name, job.status, job.image_count, job.pole_count,
+                                     summary.get("total_broken_sequences", ""), job.error or ""])
+        else:
+            with open(args.report, 'w') as f:
+                json.dump({"totals": totals, "jobs": [job.to_dict() for job in jobs]}, f, indent=2)
+        log_message(f"Report written to {args.report}")
+
+    log_message(f"{totals['done']} jobs done, {totals['failed']} failed, {totals['cancelled']} cancelled, "
+                f"{totals['images']} images, {totals['poles']} poles")
+    return 1 if totals['failed'] or totals['cancelled'] else 0
+
+def apply_command(args):
+    moved, failed = apply_manifest(args.manifest, log=log_message)
+    log_message(f"Applied {args.manifest}: {moved} poles moved, {failed} skipped or failed")
+    return 1 if failed else 0
+
+def poles_command(args):
+    try:
+        index = PoleIndex(args.pole_index)
+    except Exception as e:
+        log_message(f"Can't open the pole index: {e}")
+        return 1
+    try:
+        start = time.perf_counter()
+        poles = index.within(args.latitude, args.longitude, args.radius)
+        elapsed = time.perf_counter() - start
+        for pole in poles:
+            print(f"{pole['distance']:8.1f} m  pole #{pole['pole']} of {pole['job']}  "
+                  f"({pole['latitude']:.6f}, {pole['longitude']:.6f})  {pole['zoom'] or ''}")
+        log_message(f"{len(poles)} poles within {args.radius:g} m ({len(index)} indexed, {elapsed * 1000:.1f} ms)")
+    finally:
+        index.close()
+    return 0
+
+def recover_command(args):
+    output_folder = os.path.abspath(args.output_folder)
+    recovered = recover_moves(output_folder, resume=args.resume, log=log_message)
+    log_message(f"Recovered {recovered} unfinished move batches in {output_folder}")
+    return 0
+
+def add_common_arguments(parser):
+    parser.add_argument("--jobs", type=int, default=None, help="metadata reader threads (1 = no pool)")
+    parser.add_argument("--processes", action="store_true",
+                        help="read metadata in --jobs worker processes instead of threads")
+    parser.add_argument("--report", help="write the run report to this .json or .csv file")
+    parser.add_argument("--cache", help="metadata cache file (default: per-user cache dir)")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the metadata cache")
+    parser.add_argument("--order", choices=[ORDER_BY_CAPTURE, ORDER_BY_NAME], default=ORDER_BY_CAPTURE,
+                        help="sequence images by EXIF capture time (default) or by folder / file name")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint in the output folder")
+    parser.add_argument("--rules", help="JSON file of named classification rule sets (default: built-in rules)")
+    parser.add_argument("--rule-set", help="rule set to use from --rules (default: the file's default set)")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="skip exact copies of images already seen in this or an earlier run")
+    parser.add_argument("--fingerprints", help="fingerprint index for --dedupe (default: per-user cache dir)")
+    parser.add_argument("--pole-index", help="pole position index (default: per-user cache dir)")
+    parser.add_argument("--no-pole-index", action="store_true",
+                        help="don't check poles against (or add them to) the index of earlier runs")
+    parser.add_argument("--profile", help="write per-stage timings (counts, percentiles, bytes) to this .json file")
+    parser.add_argument("--cprofile", help="run under cProfile and write the stats to this file (best with --jobs 1)")
+    parser.add_argument("--verbose", action="store_true", help="also log every NADIR / orbit / zoom shot")
+    parser.add_argument("--quiet", action="store_true", help="only log errors and the summary")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="poleio", description="Pole.IO image sequence verification")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    verify = commands.add_parser("verify", help="verify one image folder and move valid poles into <folder>/<node>")
+    verify.add_argument("folder", help="folder with the drone images (searched recursively)")
+    verify.add_argument("--node", required=True, help="node name, used as the output folder name")
+    add_common_arguments(verify)
+    verify.set_defaults(func=verify_command)
+
+    plan = commands.add_parser("plan", help="classify a folder and write a move manifest, without moving anything")
+    plan.add_argument("folder", help="folder with the drone images (searched recursively)")
+    plan.add_argument("--node", required=True, help="node name, used as the output folder name")
+    plan.add_argument("--manifest", required=True, help="write the move manifest to this .json file")
+    add_common_arguments(plan)
+    plan.set_defaults(func=verify_command)
+
+    watch = commands.add_parser("watch", help="verify images as they are copied into a folder, until Ctrl+C")
+    watch.add_argument("folder", help="ingest folder the cards are copied into (watched recursively)")
+    watch.add_argument("--node", required=True, help="node name, used as the output folder name")
+    watch.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                       help="seconds a file found by a scan must stay unchanged to count as copied (default: 5)")
+    watch.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                       help="seconds between rescans when polling (default: 2)")
+    watch.add_argument("--polling", action="store_true", help="rescan the folder instead of using inotify")
+    watch.add_argument("--idle-exit", type=float, help="stop once no image has landed for this many seconds")
+    add_common_arguments(watch)
+    watch.set_defaults(func=verify_command)
+
+    apply = commands.add_parser("apply", help="move the poles listed in a manifest written by 'plan'")
+    apply.add_argument("manifest", help="manifest .json file")
+    apply.set_defaults(func=apply_command)
+
+    batch = commands.add_parser("batch", help="verify many folders (one per node / flight) concurrently")
+    batch.add_argument("--job", nargs=2, action="append", metavar=("FOLDER", "NODE"), help="add a folder + node job")
+    batch.add_argument("--list", help="CSV file with one 'folder,node' job per line")
+    batch.add_argument("--parallel", type=int, default=DEFAULT_MAX_JOBS, help="jobs running at once")
+    batch.add_argument("--per-disk", type=int, default=DEFAULT_PER_DISK, help="jobs running at once on the same disk")
+    add_common_arguments(batch)
+    batch.set_defaults(func=batch_command)
+
+    poles = commands.add_parser("poles", help="list the indexed poles of earlier runs near a GPS position")
+    poles.add_argument("latitude", type=float, help="decimal degrees, negative south")
+    poles.add_argument("longitude", type=float, help="decimal degrees, negative west")
+    poles.add_argument("--radius", type=float, default=DEFAULT_QUERY_RADIUS_METERS, help="metres (default: 50)")
+    poles.add_argument("--pole-index", help="pole position index (default: per-user cache dir)")
+    poles.set_defaults(func=poles_command)
+
+    recover = commands.add_parser("recover", help="roll back (or --resume) pole moves an interrupted run left open")
+    recover.add_argument("output_folder", help="the node output folder holding the move journal")
+    recover.add_argument("--resume", action="store_true", help="finish the moves instead of undoing them")
+    recover.set_defaults(func=recover_command)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,32 +1,38 @@
+import time
+START_TIME = time.perf_counter()  # Before the Qt imports: startup time is measured from here
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QTextEdit, QWidget, QMessageBox, QInputDialog, QLCDNumber, QPlainTextEdit
+import datetime
+import functools
+from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QWidget, QMessageBox, QInputDialog, QLCDNumber, QPlainTextEdit
 from PyQt5.QtGui import QColor, QTextCursor, QTextCharFormat
-from PyQt5.QtCore import Qt, QThread
-from PyQt5 import uic
-from GetEXIFTags import extract_dji_metadata  # DJI XMP Metadata extractor
-from GetEXIFTags import extract_value_from_xmp
+from PyQt5.QtCore import Qt, QThread, QTimer
+from PoleIO_UI import Ui_MainWindow  # Compiled from PoleIO-UI.ui (pyuic5 PoleIO-UI.ui -o PoleIO_UI.py)
 from PieProgressBar import ProgressPie  # Import the custom widget
-from ImgProcWorker import ImageProcessingWorker
-import datetime
-import shutil # Import for moving files
-from concurrent.futures import ThreadPoolExecutor
+from LogChannel import LogChannel, DEBUG, INFO, WARNING
+# The workers, PoleCore and the review dialog are imported on first use, not at startup
+
+# Log view refresh rate and size: messages are rendered in batches, the view keeps a bounded history
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_MAX_BLOCKS = 5000
+# logLevelCombo index -> LogChannel level
+LOG_LEVELS = [DEBUG, INFO, WARNING]
+# Launch to first paint; slower starts are logged as a warning
+STARTUP_TARGET_SECONDS = 1.0
 
 ####################################################################
-class PoleIOApp(QMainWindow):
+class PoleIOApp(QMainWindow, Ui_MainWindow):
     def __init__(self):
         super().__init__()
-        # Check if running as a standalone PyInstaller executable
-        if hasattr(sys, '_MEIPASS'):
-            ui_path = os.path.join(sys._MEIPASS, 'PoleIO-UI.ui')
-        else:
-            ui_path = os.path.join(os.path.dirname(__file__), 'PoleIO-UI.ui')
-
-        uic.loadUi(ui_path, self)
+        self.setupUi(self)
         
         # Hook up the buttons to their actions
         self.browseButton.clicked.connect(self.browse_folder)
         self.verifyButton.clicked.connect(self.verify_images)
+        self.pauseButton.clicked.connect(self.toggle_pause)
+        self.cancelButton.clicked.connect(self.cancel_processing)
+        self.saveProfileButton.clicked.connect(self.save_profile)
+        self.reviewButton.clicked.connect(self.review_sequences)
         
         # Initialize logTextBox (make sure this is the correct name of your log text field)
         self.logOutput = self.findChild(QPlainTextEdit, "logTextView")  
@@ -34,6 +40,15 @@ class PoleIOApp(QMainWindow):
         if self.logOutput is None:
             QMessageBox.critical(self, "Error", "logTextView not found in the UI. Please check the UI object name.")
             return
+
+        # Workers (and this window) write to the log channel; a timer renders it in batches
+        self.log_channel = LogChannel(level=INFO)
+        self.logOutput.setMaximumBlockCount(LOG_MAX_BLOCKS)
+        self.logLevelCombo.setCurrentIndex(LOG_LEVELS.index(INFO))
+        self.logLevelCombo.currentIndexChanged.connect(self.set_log_level)
+        self.logTimer = QTimer(self)
+        self.logTimer.timeout.connect(self.flush_log)
+        self.logTimer.start(LOG_FLUSH_INTERVAL_MS)
         
        # Initialize pie progress bar
         self.progressPieContainer = self.findChild(QWidget, "progressPieContainer")
@@ -45,42 +60,129 @@ class PoleIOApp(QMainWindow):
         
         # Placeholder for image folder path
         self.image_folder_path = None
+        # The running BatchProcessingWorker, if any (new folders are queued on it)
+        self.worker = None
+        # (folder, node name) picked while the last batch was winding down; started with the next one
+        self.queued_folders = []
+        # Stage timings of the current / last batch
+        self.profile = None
+        # VerifyJobs of the last finished batch, for the review dialog
+        self.finished_jobs = []
         self.poleCountDisplay.display(0)  # Set initial value to 0
 
 ####################################################################
     
-    def update_pie_progress(self, progress):
-        # Update the pie progress bar based on the progress emitted by the worker
-        self.pieProgressBar.setValue(progress)
+    def update_pie_progress(self, percent, processed, total, rate, eta):
+        # Update the pie progress bar based on the (throttled) progress emitted by the worker
+        self.pieProgressBar.setPercent(percent)
+        minutes, seconds = divmod(int(eta), 60)
+        self.statusbar.showMessage(f"{processed}/{total} images, {rate:.1f} images/s, ETA {minutes}:{seconds:02d}")
     
-    def processing_finished(self):
-        # This method can handle when the image processing finishes
+    def processing_finished(self, worker):
+        # Bound to the worker that emitted it, which need not be self.worker any more
         self.log_message(f"Processing Completed!")
+        if worker.profile is not None:
+            for line in worker.profile.format_lines():
+                self.log_message(line, "gray")
+            self.saveProfileButton.setEnabled(True)
+        self.finished_jobs = [job for job in worker.scheduler.jobs if job.report]
+        self.reviewButton.setEnabled(bool(self.finished_jobs))
+        if worker is not self.worker:
+            return
+        self.worker = None
         self.verifyButton.setEnabled(True)
+        self.pauseButton.setEnabled(False)
+        self.pauseButton.setText("Pause")
+        self.cancelButton.setEnabled(False)
+
+    def toggle_pause(self):
+        if self.worker is None:
+            return
+        if self.pauseButton.text() == "Pause":
+            self.worker.pause()
+            self.pauseButton.setText("Resume")
+            self.log_message("Paused", "orange")
+        else:
+            self.worker.resume()
+            self.pauseButton.setText("Pause")
+            self.log_message("Resumed", "orange")
+
+    def save_profile(self):
+        if self.profile is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save Run Profile", "poleio-profile.json", "JSON (*.json)")
+        if path:
+            try:
+                self.profile.save(path)
+                self.log_message(f"Run profile saved to {path}")
+            except OSError as e:
+                QMessageBox.critical(self, "Error", f"Could not save the run profile: {e}")
+
+    def review_sequences(self):
+        # Previews come from the EXIF thumbnails (cached), never from the full-size images
+        from SequenceReview import SequenceReviewDialog
+        dialog = SequenceReviewDialog(self.finished_jobs, self)
+        dialog.exec_()
+
+    def cancel_processing(self):
+        # The worker winds down on its own thread and emits finished when it is done
+        if self.worker is None:
+            return
+        self.worker.cancel()
+        if self.queued_folders:
+            self.log_message(f"Dropped {len(self.queued_folders)} queued folders", "orange")
+            self.queued_folders = []
+        self.pauseButton.setEnabled(False)
+        self.cancelButton.setEnabled(False)
+        self.verifyButton.setEnabled(False)
+        self.log_message("Cancelling: finishing the poles being moved...", "orange")
 
 
 ####################################################################
 
 
-    def log_message(self, message, color=None):
-        # Logs a message to the log text view with optional color.
-        current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Create a QTextCursor to interact with the logOutput text editor
+    def log_message(self, message, color=None, level=INFO):
+        # Queue a message for the log view; flush_log renders it on the next tick
+        self.log_channel.write(message, color, level)
+
+    def set_log_level(self, index):
+        self.log_channel.set_level(LOG_LEVELS[index])
+
+    def flush_log(self):
+        # Render everything queued since the last tick as one edit, one format change per color run
+        batch = self.log_channel.drain()
+        if not batch:
+            return
+        start = time.perf_counter()
+
         cursor = self.logOutput.textCursor()
         cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
 
-        # Set the text color if specified
-        if color:
-            text_format = QTextCharFormat()
-            text_format.setForeground(QColor(color))  # Set the desired color
-            cursor.setCharFormat(text_format)
+        run_color = None
+        run_lines = []
+        for timestamp, message, color, level in batch:
+            if color != run_color and run_lines:
+                self.insert_log_run(cursor, run_color, run_lines)
+                run_lines = []
+            run_color = color
+            current_time = datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            run_lines.append(f"{current_time}: {message}\n")
+        self.insert_log_run(cursor, run_color, run_lines)
 
-        # Insert the log message with the specified color
-        cursor.insertText(f"{current_time}: {message}\n")
+        cursor.endEditBlock()
 
         # Move the cursor to the end to ensure new messages are appended properly
         self.logOutput.moveCursor(QTextCursor.End)
+        if self.worker is not None and self.profile is not None:
+            self.profile.record("log", time.perf_counter() - start)
+
+    def insert_log_run(self, cursor, color, lines):
+        text_format = QTextCharFormat()
+        if color:
+            text_format.setForeground(QColor(color))  # Set the desired color
+        cursor.setCharFormat(text_format)
+        cursor.insertText("".join(lines))
 
 ####################################################################
     
@@ -105,18 +207,8 @@ class PoleIOApp(QMainWindow):
             return
     
         try:
-            # Prevent starting a new thread if the previous one is still running
-            if hasattr(self, 'thread') and isinstance(self.thread, QThread) and self.thread.isRunning():
-                self.log_message("Processing is already running. Please wait.")
-                return
-            
             # Get the full path of the image folder
             full_folder_path = os.path.abspath(self.image_folder_path)
-            self.log_message(f"Processing images from folder: {full_folder_path}")
-
-            #Disable the button
-            self.verifyButton.setEnabled(False)
-        
 
             # Check if the "Node Name" text box has a value first
             node_name = self.textNodeName.toPlainText().strip()
@@ -128,59 +220,83 @@ class PoleIOApp(QMainWindow):
                 if not ok or not output_folder_name:
                     self.log_message("No output folder name provided. Aborting.")
                     return
-                
-                if not ok or not output_folder_name:
-                    self.log_message("No output folder name provided. Aborting.")
-                    return
-
-            # Create the output folder inside the full folder path (not in the parent directory)
-            output_folder_path = os.path.join(full_folder_path, output_folder_name)
-            # Print the output folder path
-            #print(f"Joined output folder path: {output_folder_path}")
-
-
-            if not os.path.exists(output_folder_path):
-                os.makedirs(output_folder_path)
-                self.log_message(f"Created output folder at: {output_folder_path}")
 
-            # Recursively collect all image files from the folder and subfolders
-            image_files = self.collect_images(full_folder_path)
-            
-            self.log_message(f"Found {len(image_files)} images...") 
-
-            # Create a QThread and move the worker to that thread
-            self.thread = QThread()
-            self.worker = ImageProcessingWorker(image_files, output_folder_path)
-            self.worker.moveToThread(self.thread)
+            # While a batch is running, further folders are queued on it (the output folder
+            # <folder>/<node name> is created by the job when it starts)
+            if self.worker is not None and self.worker.submit(full_folder_path, output_folder_name):
+                self.log_message(f"Queued {full_folder_path} as node {output_folder_name}")
+                return
+            # The batch has stopped taking jobs but its thread is still winding down: the folder
+            # starts the next batch once that thread has finished
+            if self.worker is not None or self.queued_folders:
+                self.queued_folders.append((full_folder_path, output_folder_name))
+                self.log_message(f"Queued {full_folder_path} as node {output_folder_name} for the next batch")
+                return
 
-            # Connect worker signals
-            self.worker.progress.connect(self.update_pie_progress)  # Connect progress to update method
-            self.worker.log_message_signal.connect(self.log_message)  # Connect log signal
-            self.worker.finished.connect(self.processing_finished)   # Connect finished signal
-            self.worker.pole_count_signal.connect(self.poleCountDisplay.display) # Connect the pole count LCD
-            self.worker.finished.connect(self.thread.quit)  # Quit the thread when finished
-            self.worker.finished.connect(self.worker.deleteLater)  # Clean up the worker
-            self.thread.finished.connect(self.thread.deleteLater)  # Clean up the thread
+            self.start_batch([(full_folder_path, output_folder_name)])
 
-            # Start processing when the thread starts
-            self.thread.started.connect(self.worker.process_image_sequence)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Verify Images: Exception Thrown: {e}")
+            self.log_message(f"Exception thrown in Verify Images: {e}")
 
-            # Start the thread
-            self.thread.start()
+    def start_batch(self, folders):
+        for folder, node_name in folders:
+            self.log_message(f"Processing images from folder: {folder}")
+        from ImgProcWorker import BatchProcessingWorker
+        from RunProfile import RunProfile
+
+        # Create a QThread and move the worker to that thread
+        self.thread = QThread()
+        self.profile = RunProfile()
+        self.saveProfileButton.setEnabled(False)
+        self.reviewButton.setEnabled(False)
+        self.worker = BatchProcessingWorker(log_channel=self.log_channel, profile=self.profile)
+        for folder, node_name in folders:
+            self.worker.submit(folder, node_name)
+        self.worker.moveToThread(self.thread)
+
+        # Connect worker signals
+        self.worker.progress.connect(self.update_pie_progress)  # Connect progress to update method
+        self.worker.finished.connect(functools.partial(self.processing_finished, self.worker))
+        self.worker.pole_count_signal.connect(self.poleCountDisplay.display) # Connect the pole count LCD
+        self.worker.finished.connect(self.thread.quit)  # Quit the thread when finished
+        self.worker.finished.connect(self.worker.deleteLater)  # Clean up the worker
+        self.thread.finished.connect(self.thread.deleteLater)  # Clean up the thread
+        # Folders picked while this batch was winding down start the next one
+        self.thread.finished.connect(self.start_queued)
+
+        # Start processing when the thread starts
+        self.thread.started.connect(self.worker.run)
+
+        # Start the thread
+        self.thread.start()
+        self.verifyButton.setEnabled(True)
+        self.pauseButton.setEnabled(True)
+        self.cancelButton.setEnabled(True)
 
+    def start_queued(self):
+        if not self.queued_folders or self.worker is not None:
+            return
+        folders = self.queued_folders
+        self.queued_folders = []
+        try:
+            self.start_batch(folders)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Verify Images: Exception Thrown: {e}")
             self.log_message(f"Exception thrown in Verify Images: {e}")
 
 ############################################################################################
-    def collect_images(self, folder_path):
-        """ Recursively collect all image files from the folder and subfolders, sorted by name. """
-        image_files = []
-        for root, dirs, files in os.walk(folder_path):  # Recursively walk through all subdirectories
-            for file in sorted(files):  # Sort files by name (which includes timestamp)
-                if file.lower().endswith(('.jpg', '.jpeg', '.png')):  # Only image files
-                    image_files.append(os.path.join(root, file))
-        return image_files
+    def report_startup_time(self, exit_after=False):
+        """ Called once the event loop has painted the window: log the launch time, or print it
+        and quit for --startup-time. """
+        elapsed = time.perf_counter() - START_TIME
+        if exit_after:
+            print(f"Startup time: {elapsed * 1000:.0f} ms (target {STARTUP_TARGET_SECONDS * 1000:.0f} ms)")
+            QApplication.instance().exit(0 if elapsed <= STARTUP_TARGET_SECONDS else 1)
+            return
+        self.statusbar.showMessage(f"Ready (started in {elapsed:.2f} s)", 10000)
+        if elapsed > STARTUP_TARGET_SECONDS:
+            self.log_message(f"Startup took {elapsed:.2f} s (target {STARTUP_TARGET_SECONDS:.1f} s)", "orange", WARNING)
 
 ############################################################################################
     
@@ -189,7 +305,11 @@ class PoleIOApp(QMainWindow):
             
 
 if __name__ == '__main__':
+    # --startup-time: print the time from launch to the first painted window and exit
+    # (exit code 1 above STARTUP_TARGET_SECONDS), for packaging checks
+    measure_only = '--startup-time' in sys.argv
     app = QApplication(sys.argv)
     window = PoleIOApp()
     window.show()
+    QTimer.singleShot(0, lambda: window.report_startup_time(exit_after=measure_only))
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,54 @@
+# -*- mode: python ; coding: utf-8 -*-
+# One-folder build: dist/PoleIO/ holds the executable next to its libraries, so a launch
+# starts straight away instead of unpacking a one-file archive to a temp dir first.
+# UPX is off: decompressing the Qt libraries on every launch costs more than it saves.
+#   pyinstaller PoleIO-onedir.spec
+
+
+a = Analysis(
+    ['PoleIO-Main.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['tkinter', 'PIL'],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='PoleIO',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='PoleIO',
+)
+app = BUNDLE(
+    coll,
+    name='PoleIO.app',
+    icon=None,
+    bundle_identifier=None,
+)
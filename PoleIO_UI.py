@@ -12,24 +12,24 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 
 
 class Ui_MainWindow(object):
-    def setupUi(self, MainWindow): 
+    def setupUi(self, MainWindow):
         MainWindow.setObjectName("MainWindow")
         MainWindow.resize(800, 600)
         MainWindow.setAutoFillBackground(False)
         self.centralwidget = QtWidgets.QWidget(MainWindow)
         self.centralwidget.setObjectName("centralwidget")
-        self.pieChartWidget = QtWidgets.QWidget(self.centralwidget)
-        self.pieChartWidget.setGeometry(QtCore.QRect(540, 10, 241, 191))
-        self.pieChartWidget.setObjectName("pieChartWidget")
+        self.progressPieContainer = QtWidgets.QWidget(self.centralwidget)
+        self.progressPieContainer.setGeometry(QtCore.QRect(540, 10, 241, 191))
+        self.progressPieContainer.setObjectName("progressPieContainer")
         self.logTextView = QtWidgets.QPlainTextEdit(self.centralwidget)
         self.logTextView.setGeometry(QtCore.QRect(30, 340, 721, 191))
         self.logTextView.setObjectName("logTextView")
-        self.textEdit = QtWidgets.QTextEdit(self.centralwidget)
-        self.textEdit.setGeometry(QtCore.QRect(40, 50, 291, 31))
-        self.textEdit.setObjectName("textEdit")
-        self.btnBrowse = QtWidgets.QPushButton(self.centralwidget)
-        self.btnBrowse.setGeometry(QtCore.QRect(340, 50, 71, 32))
-        self.btnBrowse.setObjectName("btnBrowse")
+        self.imageFolderInput = QtWidgets.QTextEdit(self.centralwidget)
+        self.imageFolderInput.setGeometry(QtCore.QRect(40, 50, 291, 31))
+        self.imageFolderInput.setObjectName("imageFolderInput")
+        self.browseButton = QtWidgets.QPushButton(self.centralwidget)
+        self.browseButton.setGeometry(QtCore.QRect(340, 50, 71, 32))
+        self.browseButton.setObjectName("browseButton")
         self.label = QtWidgets.QLabel(self.centralwidget)
         self.label.setGeometry(QtCore.QRect(40, 20, 161, 21))
         self.label.setObjectName("label")
@@ -39,9 +39,31 @@ class Ui_MainWindow(object):
         self.label_2 = QtWidgets.QLabel(self.centralwidget)
         self.label_2.setGeometry(QtCore.QRect(40, 110, 161, 21))
         self.label_2.setObjectName("label_2")
-        self.buttonVerify = QtWidgets.QPushButton(self.centralwidget)
-        self.buttonVerify.setGeometry(QtCore.QRect(40, 200, 131, 41))
-        self.buttonVerify.setObjectName("buttonVerify")
+        self.verifyButton = QtWidgets.QPushButton(self.centralwidget)
+        self.verifyButton.setGeometry(QtCore.QRect(40, 200, 131, 41))
+        self.verifyButton.setObjectName("verifyButton")
+        self.logLevelCombo = QtWidgets.QComboBox(self.centralwidget)
+        self.logLevelCombo.setGeometry(QtCore.QRect(190, 205, 141, 32))
+        self.logLevelCombo.setObjectName("logLevelCombo")
+        self.logLevelCombo.addItem("")
+        self.logLevelCombo.addItem("")
+        self.logLevelCombo.addItem("")
+        self.pauseButton = QtWidgets.QPushButton(self.centralwidget)
+        self.pauseButton.setEnabled(False)
+        self.pauseButton.setGeometry(QtCore.QRect(40, 250, 131, 32))
+        self.pauseButton.setObjectName("pauseButton")
+        self.cancelButton = QtWidgets.QPushButton(self.centralwidget)
+        self.cancelButton.setEnabled(False)
+        self.cancelButton.setGeometry(QtCore.QRect(190, 250, 141, 32))
+        self.cancelButton.setObjectName("cancelButton")
+        self.saveProfileButton = QtWidgets.QPushButton(self.centralwidget)
+        self.saveProfileButton.setEnabled(False)
+        self.saveProfileButton.setGeometry(QtCore.QRect(350, 250, 121, 32))
+        self.saveProfileButton.setObjectName("saveProfileButton")
+        self.reviewButton = QtWidgets.QPushButton(self.centralwidget)
+        self.reviewButton.setEnabled(False)
+        self.reviewButton.setGeometry(QtCore.QRect(490, 250, 121, 32))
+        self.reviewButton.setObjectName("reviewButton")
         self.lcdPoleCount = QtWidgets.QLCDNumber(self.centralwidget)
         self.lcdPoleCount.setGeometry(QtCore.QRect(630, 210, 121, 61))
         self.lcdPoleCount.setObjectName("lcdPoleCount")
@@ -69,8 +91,19 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "Pole.IO"))
-        self.btnBrowse.setText(_translate("MainWindow", "Browse"))
+        self.browseButton.setText(_translate("MainWindow", "Browse"))
         self.label.setText(_translate("MainWindow", "Image Sequence Directory"))
         self.label_2.setText(_translate("MainWindow", "Node Name"))
-        self.buttonVerify.setText(_translate("MainWindow", "Verify Images"))
+        self.verifyButton.setText(_translate("MainWindow", "Verify Images"))
+        self.logLevelCombo.setToolTip(_translate("MainWindow", "How much detail the log shows"))
+        self.logLevelCombo.setItemText(0, _translate("MainWindow", "Per-image detail"))
+        self.logLevelCombo.setItemText(1, _translate("MainWindow", "Poles and totals"))
+        self.logLevelCombo.setItemText(2, _translate("MainWindow", "Problems only"))
+        self.pauseButton.setText(_translate("MainWindow", "Pause"))
+        self.cancelButton.setToolTip(_translate("MainWindow", "Stop after the poles being moved; the run can be resumed later"))
+        self.cancelButton.setText(_translate("MainWindow", "Cancel"))
+        self.saveProfileButton.setToolTip(_translate("MainWindow", "Save the stage timings of the last run as JSON"))
+        self.saveProfileButton.setText(_translate("MainWindow", "Save Profile..."))
+        self.reviewButton.setToolTip(_translate("MainWindow", "Review the poles and broken sequences of the last run from the cameras\' embedded previews"))
+        self.reviewButton.setText(_translate("MainWindow", "Review..."))
         self.label_3.setText(_translate("MainWindow", "POLE COUNT"))
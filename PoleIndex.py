@@ -0,0 +1,135 @@
+import math
+import time
+from SqliteStore import SqliteStore
+
+POLE_INDEX_FILE_NAME = 'poles.sqlite'
+# Grid cell edge in degrees (~55 m of latitude): a 50 m query touches a 3 x 3 block of cells
+GRID_CELL_DEGREES = 0.0005
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+# Two poles closer than this are taken to be the same pole flown twice (utility poles stand
+# 30-60 m apart; an orbit centroid is good to a couple of metres)
+REFLOWN_RADIUS_METERS = 5.0
+DEFAULT_QUERY_RADIUS_METERS = 50.0
+# Bump when the table layout changes; older indexes are dropped, not migrated
+SCHEMA_VERSION = 2
+
+####################################################################
+
+def distance_meters(lat1, lon1, lat2, lon2):
+    """ Great-circle (haversine) distance between two points in decimal degrees. """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+def grid_cell(latitude, longitude):
+    """ (cell_x, cell_y) of the GRID_CELL_DEGREES grid holding a point. """
+    return math.floor(longitude / GRID_CELL_DEGREES), math.floor(latitude / GRID_CELL_DEGREES)
+
+def grid_span(latitude, longitude, radius):
+    """ (min_x, max_x, min_y, max_y) of the grid cells a circle of `radius` metres can touch. """
+    lat_degrees = radius / METERS_PER_DEGREE
+    # A degree of longitude shrinks towards the poles; clamp so the span stays finite
+    lon_degrees = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    min_x, min_y = grid_cell(latitude - lat_degrees, longitude - lon_degrees)
+    max_x, max_y = grid_cell(latitude + lat_degrees, longitude + lon_degrees)
+    return min_x, max_x, min_y, max_y
+
+def pole_position(shots):
+    """ (latitude, longitude, altitude) of a pole from its shots' (kind, latitude, longitude,
+    altitude) tuples, or None without GPS.
+
+    The orbit shots circle the pole, so their centroid is the pole itself; without orbit
+    GPS the NADIR shot (taken straight above the pole) is used. Altitude is the mean
+    absolute altitude of the same shots (None if they have none). """
+    for kinds in (("orbit",), ("nadir",)):
+        located = [shot for shot in shots if shot[0] in kinds and shot[1] is not None and shot[2] is not None]
+        if located:
+            break
+    else:
+        return None
+    latitude = sum(shot[1] for shot in located) / len(located)
+    longitude = sum(shot[2] for shot in located) / len(located)
+    altitudes = [shot[3] for shot in located if shot[3] is not None]
+    altitude = sum(altitudes) / len(altitudes) if altitudes else None
+    return latitude, longitude, altitude
+
+####################################################################
+
+class PoleIndex(SqliteStore):
+    """ Persistent index of pole positions across every job, bucketed on a lat / lon grid so
+    that "poles within 50 m" reads a handful of cells instead of comparing with every pole.
+
+    A pole is keyed by the id of the run that found it and its pole number (pole numbers
+    restart with every run, even into the same output folder); `job` is the output folder,
+    for display. A resumed run keeps its id, so the poles it sequences again replace their
+    own earlier rows instead of being flagged against them. With record=False (dry runs)
+    new poles are kept in memory for the run only, so they are still checked against each
+    other but never written.
+
+    Not thread-safe, like MetadataCache: every job opens its own connection. Never evicted.
+    """
+    FILE_NAME = POLE_INDEX_FILE_NAME
+    TABLE = 'poles'
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS poles ("
+              " run TEXT, pole INTEGER, job TEXT, latitude REAL, longitude REAL, altitude REAL,"
+              " cell_x INTEGER, cell_y INTEGER, nadir TEXT, zoom TEXT, added REAL,"
+              " PRIMARY KEY (run, pole))",
+              "CREATE INDEX IF NOT EXISTS poles_cell ON poles (cell_y, cell_x)")
+    SCHEMA_VERSION = SCHEMA_VERSION
+
+    def __init__(self, index_path=None, record=True):
+        super().__init__(index_path)
+        self.record = record
+        self._unrecorded = {}  # (run, pole) -> row, for record=False
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM poles").fetchone()[0] + len(self._unrecorded)
+
+    def add(self, run, pole, job, latitude, longitude, altitude=None, nadir=None, zoom=None):
+        """ Store (or replace) a pole's position. Committed right away, so jobs running at the
+        same time see each other's poles. """
+        cell_x, cell_y = grid_cell(latitude, longitude)
+        row = (run, pole, job, latitude, longitude, altitude, cell_x, cell_y, nadir, zoom, time.time())
+        if not self.record:
+            self._unrecorded[(run, pole)] = row
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO poles"
+            " (run, pole, job, latitude, longitude, altitude, cell_x, cell_y, nadir, zoom, added)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        self.conn.commit()
+
+    def relocate(self, run, pole, moves):
+        """ A pole's files were moved: `moves` maps their old paths to the new ones. """
+        row = self.conn.execute("SELECT nadir, zoom FROM poles WHERE run = ? AND pole = ?", (run, pole)).fetchone()
+        if row is None:
+            return
+        nadir, zoom = (moves.get(path, path) for path in row)
+        self.conn.execute("UPDATE poles SET nadir = ?, zoom = ? WHERE run = ? AND pole = ?", (nadir, zoom, run, pole))
+        self.conn.commit()
+
+    def within(self, latitude, longitude, radius=DEFAULT_QUERY_RADIUS_METERS, exclude=None):
+        """ Poles within `radius` metres of a point, nearest first, as dicts with run, pole,
+        job, latitude, longitude, altitude, nadir, zoom and distance. `exclude` is a
+        (run, pole) key to leave out. """
+        min_x, max_x, min_y, max_y = grid_span(latitude, longitude, radius)
+        rows = self.conn.execute(
+            "SELECT run, pole, job, latitude, longitude, altitude, cell_x, cell_y, nadir, zoom FROM poles"
+            " WHERE cell_y BETWEEN ? AND ? AND cell_x BETWEEN ? AND ?", (min_y, max_y, min_x, max_x)).fetchall()
+        rows.extend(row[:10] for row in self._unrecorded.values()
+                    if min_y <= row[7] <= max_y and min_x <= row[6] <= max_x)
+
+        found = {}
+        for run, pole, job, other_lat, other_lon, altitude, _, _, nadir, zoom in rows:
+            if (run, pole) == exclude:
+                continue
+            distance = distance_meters(latitude, longitude, other_lat, other_lon)
+            if distance <= radius:
+                # An unrecorded pole replaces the stored one with the same key
+                found[(run, pole)] = {"run": run, "pole": pole, "job": job, "latitude": other_lat,
+                                      "longitude": other_lon, "altitude": altitude, "nadir": nadir, "zoom": zoom,
+                                      "distance": round(distance, 2)}
+        return sorted(found.values(), key=lambda pole: pole["distance"])
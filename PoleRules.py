@@ -0,0 +1,173 @@
+import json
+import heapq
+from array import array
+
+try:
+    import numpy
+except ImportError:  # Optional: the same results in pure Python, only slower on huge jobs
+    numpy = None
+
+# Default sequence rules, the ones Pole.IO has always used (see PoleSequencer.feed)
+NADIR_MAX_PITCH = -89
+MIN_ORBIT_SHOTS = 25
+ZOOM_SOURCE = "ZoomCamera"
+WIDE_SOURCE = "WideCamera"
+DEFAULT_RULES_NAME = "default"
+
+# What a row is to the sequencer, from its metadata alone
+KIND_OTHER = 0
+KIND_NADIR = 1
+KIND_ORBIT = 2
+KIND_ZOOM = 3
+KIND_NADIR_ZOOM = 4   # A zoom shot pointing straight down: NADIR first, then zoom
+KIND_UNREADABLE = 5
+KIND_COUNT = 6
+
+NADIR_KINDS = (KIND_NADIR, KIND_NADIR_ZOOM)
+
+####################################################################
+
+class PoleRules:
+    """ The thresholds of the NADIR -> orbit -> zoom check, for one drone model or client.
+
+    A NADIR shot has a gimbal pitch <= nadir_max_pitch, a zoom shot comes from one of
+    zoom_sources, an orbit shot is any other shot from one of wide_sources, and a pole
+    needs at least min_orbit_shots orbits.
+    """
+
+    def __init__(self, name=DEFAULT_RULES_NAME, nadir_max_pitch=NADIR_MAX_PITCH,
+                 min_orbit_shots=MIN_ORBIT_SHOTS, zoom_sources=(ZOOM_SOURCE,), wide_sources=(WIDE_SOURCE,)):
+        if isinstance(zoom_sources, str) or isinstance(wide_sources, str):
+            raise ValueError("zoom_sources and wide_sources must be lists of image sources")
+        if set(zoom_sources) & set(wide_sources):
+            raise ValueError(f"Rules {name}: an image source can't be both zoom and wide")
+        self.name = name
+        self.nadir_max_pitch = float(nadir_max_pitch)
+        self.min_orbit_shots = int(min_orbit_shots)
+        self.zoom_sources = tuple(zoom_sources)
+        self.wide_sources = tuple(wide_sources)
+
+    def __eq__(self, other):
+        return isinstance(other, PoleRules) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"PoleRules({self.to_dict()!r})"
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "nadir_max_pitch": self.nadir_max_pitch,
+            "min_orbit_shots": self.min_orbit_shots,
+            "zoom_sources": list(self.zoom_sources),
+            "wide_sources": list(self.wide_sources),
+        }
+
+    @classmethod
+    def from_dict(cls, values, name=None):
+        values = dict(values)
+        unknown = set(values) - {"name", "nadir_max_pitch", "min_orbit_shots", "zoom_sources", "wide_sources"}
+        if unknown:
+            raise ValueError(f"Unknown rule setting(s): {', '.join(sorted(unknown))}")
+        if name is not None:
+            values["name"] = name
+        return cls(**values)
+
+    def is_nadir(self, gimbal_pitch):
+        return gimbal_pitch is not None and gimbal_pitch <= self.nadir_max_pitch
+
+    def is_zoom(self, image_source):
+        return image_source in self.zoom_sources
+
+    def is_orbit(self, gimbal_pitch, image_source):
+        return gimbal_pitch is not None and gimbal_pitch > self.nadir_max_pitch and image_source in self.wide_sources
+
+DEFAULT_RULES = PoleRules()
+
+def load_rules(rules_path, name=None):
+    """ Read one rule set from a JSON file of named sets, e.g.
+
+        {"default": "M30T",
+         "rules": {"M30T": {"min_orbit_shots": 25},
+                   "acme-poles": {"nadir_max_pitch": -85, "min_orbit_shots": 18,
+                                  "wide_sources": ["WideCamera", "VisualCamera"]}}}
+
+    Settings left out keep the built-in defaults. `name` picks the set (default: the file's
+    "default" entry, or the only set); raises ValueError for unknown names or settings. """
+    with open(rules_path) as f:
+        config = json.load(f)
+    rule_sets = config.get("rules", {})
+    if name is None:
+        name = config.get("default")
+        if name is None and len(rule_sets) == 1:
+            name = next(iter(rule_sets))
+    if name not in rule_sets:
+        known = ", ".join(sorted(rule_sets)) or "none"
+        raise ValueError(f"No rule set {name!r} in {rules_path} (has: {known})")
+    return PoleRules.from_dict(rule_sets[name], name=name)
+
+####################################################################
+# Column-wise classification of a ShotTable
+
+def classify_rows(table, rules, order=None):
+    """ The KIND_* of every row of a ShotTable, in `order` (row indices) if given.
+
+    Evaluated a column at a time: a NumPy int8 array when NumPy is installed, else an
+    array('b') built in one pass over the columns. """
+    zoom_codes = [code for code, source in enumerate(table.sources) if source in rules.zoom_sources]
+    wide_codes = [code for code, source in enumerate(table.sources) if source in rules.wide_sources]
+    if numpy is not None and len(table):
+        return _classify_numpy(table, rules, order, zoom_codes, wide_codes)
+
+    zoom_codes = frozenset(zoom_codes)
+    wide_codes = frozenset(wide_codes)
+    nadir_max_pitch = rules.nadir_max_pitch
+    kinds = array('b')
+    # NaN (no pitch) fails both comparisons, like a None pitch in PoleSequencer.feed
+    for readable, pitch, code in zip(table.readable, table.columns['gimbal_pitch'], table.source_codes):
+        if not readable:
+            kinds.append(KIND_UNREADABLE)
+        elif pitch <= nadir_max_pitch:
+            kinds.append(KIND_NADIR_ZOOM if code in zoom_codes else KIND_NADIR)
+        elif code in zoom_codes:
+            kinds.append(KIND_ZOOM)
+        elif pitch > nadir_max_pitch and code in wide_codes:
+            kinds.append(KIND_ORBIT)
+        else:
+            kinds.append(KIND_OTHER)
+    if order is not None:
+        kinds = array('b', [kinds[index] for index in order])
+    return kinds
+
+def _classify_numpy(table, rules, order, zoom_codes, wide_codes):
+    pitch = numpy.frombuffer(table.columns['gimbal_pitch'], dtype=numpy.float64)
+    codes = numpy.frombuffer(table.source_codes, dtype=numpy.uint16)
+    readable = numpy.frombuffer(table.readable, dtype=numpy.int8).astype(bool)
+    if order is not None:
+        index = numpy.asarray(order, dtype=numpy.intp)
+        pitch, codes, readable = pitch[index], codes[index], readable[index]
+
+    with numpy.errstate(invalid='ignore'):
+        nadir = pitch <= rules.nadir_max_pitch
+        above = pitch > rules.nadir_max_pitch
+    zoom = numpy.isin(codes, zoom_codes)
+    wide = numpy.isin(codes, wide_codes)
+
+    kinds = numpy.full(len(pitch), KIND_OTHER, dtype=numpy.int8)
+    kinds[above & wide] = KIND_ORBIT
+    kinds[zoom] = KIND_ZOOM
+    kinds[nadir] = KIND_NADIR
+    kinds[nadir & zoom] = KIND_NADIR_ZOOM
+    kinds[~readable] = KIND_UNREADABLE
+    return kinds
+
+def group_kinds(kinds):
+    """ For every KIND_*, the ascending list of positions holding it (one pass). """
+    if numpy is not None and isinstance(kinds, numpy.ndarray):
+        return [numpy.flatnonzero(kinds == kind).tolist() for kind in range(KIND_COUNT)]
+    positions = [[] for _ in range(KIND_COUNT)]
+    for position, kind in enumerate(kinds):
+        positions[kind].append(position)
+    return positions
+
+def merge_positions(*position_lists):
+    return list(heapq.merge(*position_lists))
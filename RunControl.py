@@ -0,0 +1,46 @@
+import threading
+
+####################################################################
+
+class Cancelled(Exception):
+    """ Raised by RunControl.check() in the worker once the run has been cancelled. """
+
+class RunControl:
+    """ Cancel / pause flags shared by the UI (or a signal handler) and the worker threads.
+
+    Workers call check() between units of work: it blocks while the run is paused and
+    raises Cancelled once it has been cancelled. Cancelling also releases a pause, so
+    paused workers wake up and wind down.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()  # Cleared while paused
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    def pause(self):
+        if not self._cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def wait_while_paused(self):
+        self._running.wait()
+
+    def check(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise Cancelled()
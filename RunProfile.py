@@ -0,0 +1,106 @@
+import time
+import json
+import random
+import cProfile
+import threading
+
+# Latency samples kept per stage for the percentiles; beyond that a uniform sample is kept
+PROFILE_SAMPLES = 4096
+PERCENTILES = (50, 90, 99)
+
+####################################################################
+
+class StageStats:
+    """ Count, total / min / max seconds, bytes and a bounded latency sample for one stage. """
+    __slots__ = ('count', 'total', 'min', 'max', 'bytes', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.bytes = 0
+        self.samples = []
+
+    def add(self, seconds, bytes_read, rng):
+        self.count += 1
+        self.total += seconds
+        self.bytes += bytes_read
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        # Reservoir sampling: every call has the same chance to be in the sample
+        if len(self.samples) < PROFILE_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            slot = rng.randrange(self.count)
+            if slot < PROFILE_SAMPLES:
+                self.samples[slot] = seconds
+
+    def to_dict(self):
+        ordered = sorted(self.samples)
+        result = {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "min_ms": (self.min or 0.0) * 1000,
+            "max_ms": self.max * 1000,
+            "bytes": self.bytes,
+        }
+        for percentile in PERCENTILES:
+            index = min(len(ordered) - 1, len(ordered) * percentile // 100)
+            result[f"p{percentile}_ms"] = ordered[index] * 1000 if ordered else 0.0
+        return result
+
+class RunProfile:
+    """ Thread-safe per-stage timings of a run: scan, read, exif, xmp, cache, sequence, move,
+    log... Stages record themselves with record(); the stage names are free-form and show
+    up in the order they were first used.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def record(self, stage, seconds, bytes_read=0):
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.add(seconds, bytes_read, self._rng)
+
+    def to_dict(self):
+        with self._lock:
+            stages = {name: stats.to_dict() for name, stats in self.stages.items()}
+        return {"wall_seconds": time.monotonic() - self.started, "stages": stages}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def format_lines(self):
+        """ One line per stage, for the log view / console. """
+        profile = self.to_dict()
+        lines = [f"Run profile ({profile['wall_seconds']:.1f} s wall time):"]
+        for name, stats in profile["stages"].items():
+            line = (f"  {name:<9} {stats['count']:>7} x  total {stats['total_seconds']:8.2f} s  "
+                    f"p50 {stats['p50_ms']:7.2f} ms  p99 {stats['p99_ms']:7.2f} ms")
+            if stats["bytes"]:
+                line += f"  {stats['bytes'] / 1048576:.1f} MB"
+            lines.append(line)
+        return lines
+
+####################################################################
+
+def run_with_cprofile(func, stats_path):
+    """ Call func() under cProfile and dump the stats to stats_path (open with pstats or
+    snakeviz). Only the calling thread is profiled, so pool workers show up as waits; use
+    a single reader thread (--jobs 1) to see the extraction itself. """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(stats_path)
@@ -0,0 +1,138 @@
+import os
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QListWidget, QListWidgetItem, QListView,
+                             QLabel, QSplitter)
+from PyQt5.QtGui import QPixmap, QIcon, QColor, QDesktopServices
+from PyQt5.QtCore import Qt, QSize, QUrl, pyqtSignal
+from ThumbnailCache import ThumbnailCache, ThumbnailLoader
+
+# Size of the previews in the review grid (EXIF thumbnails are usually 160 x 120)
+PREVIEW_SIZE = QSize(160, 120)
+
+####################################################################
+
+def review_entries(job):
+    """ (title, color, [(kind, path)]) for every sequence and skipped image of a finished
+    VerifyJob, broken sequences first. Valid poles point into the output folder they were
+    moved to. """
+    report = job.report
+    if not report:
+        return []
+    broken = []
+    valid = []
+    for entry in report["sequences"]:
+        # Where FileMover put the files, which may have been renamed to avoid a clash
+        paths = entry["moved_to"] if entry.get("moved", False) else entry
+        shots = []
+        if paths["nadir"]:
+            shots.append(("NADIR", paths["nadir"]))
+        shots.extend(("orbit", path) for path in paths["orbits"])
+        if paths["zoom"]:
+            shots.append(("zoom", paths["zoom"]))
+        count = len(set(path for _, path in shots))  # A NADIR that is also the zoom is one image
+
+        if entry["status"] == "valid":
+            title = f"[{job.node_name}] Pole #{entry['pole']} ({count} images)"
+            valid.append((title, "green", shots))
+        else:
+            title = f"[{job.node_name}] Broken: {entry['reason']} ({count} images)"
+            broken.append((title, "red", shots))
+
+    anomalies = [(anomaly["type"].replace("_", " "), anomaly["path"]) for anomaly in report.get("anomalies", [])]
+    skipped = [(f"[{job.node_name}] Skipped images ({len(anomalies)})", "orange", anomalies)] if anomalies else []
+    return broken + skipped + valid
+
+class SequenceReviewDialog(QDialog):
+    """ Sequences of the last batch on the left, the previews of the selected one on the right.
+
+    Previews are the cameras' embedded EXIF thumbnails, loaded on a background pool and kept
+    in a ThumbnailCache, so reviewing a pole reads a few KB of header per image instead of
+    the full-size JPEGs. Double-click a preview to open the image itself.
+    """
+    thumbnailReady = pyqtSignal(str, object)  # path, JPEG bytes or None (from the loader threads)
+
+    def __init__(self, jobs, parent=None, cache_path=None):
+        super().__init__(parent)
+        self.setWindowTitle("Review Sequences")
+        self.resize(1000, 650)
+
+        self.sequenceList = QListWidget()
+        self.previewList = QListWidget()
+        self.previewList.setViewMode(QListView.IconMode)
+        self.previewList.setIconSize(PREVIEW_SIZE)
+        self.previewList.setResizeMode(QListView.Adjust)
+        self.previewList.setMovement(QListView.Static)
+        self.previewList.setSpacing(6)
+        self.previewList.setWordWrap(True)
+        self.statusLabel = QLabel()
+
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.sequenceList)
+        splitter.addWidget(self.previewList)
+        splitter.setStretchFactor(1, 3)
+        layout = QVBoxLayout(self)
+        layout.addWidget(splitter)
+        layout.addWidget(self.statusLabel)
+
+        self.entries = []
+        for job in jobs:
+            self.entries.extend(review_entries(job))
+        for title, color, shots in self.entries:
+            item = QListWidgetItem(title)
+            item.setForeground(QColor(color))
+            self.sequenceList.addItem(item)
+
+        # Path -> preview items of the selected sequence showing it
+        self.preview_items = {}
+        try:
+            cache = ThumbnailCache(cache_path)
+        except Exception as e:
+            cache = None
+            self.statusLabel.setText(f"Preview cache unavailable: {e}")
+        self.loader = ThumbnailLoader(cache, on_ready=self.thumbnailReady.emit)
+        self.thumbnailReady.connect(self.show_thumbnail)
+
+        self.sequenceList.currentRowChanged.connect(self.show_sequence)
+        self.previewList.itemDoubleClicked.connect(self.open_image)
+        if self.entries:
+            self.sequenceList.setCurrentRow(0)
+        else:
+            self.statusLabel.setText("No finished jobs to review.")
+
+    def show_sequence(self, row):
+        # Previews of the previous selection that haven't started are not needed any more
+        self.loader.cancel_pending()
+        self.previewList.clear()
+        self.preview_items = {}
+        if row < 0:
+            return
+        title, color, shots = self.entries[row]
+        self.statusLabel.setText(title)
+        for kind, path in shots:
+            item = QListWidgetItem(f"{kind}\n{os.path.basename(path)}")
+            item.setData(Qt.UserRole, path)
+            item.setToolTip(path)
+            item.setSizeHint(QSize(PREVIEW_SIZE.width() + 20, PREVIEW_SIZE.height() + 50))
+            self.previewList.addItem(item)
+            self.preview_items.setdefault(path, []).append(item)
+            self.loader.request(path)
+
+    def show_thumbnail(self, path, jpeg):
+        # Late arrivals for a sequence that is no longer shown are dropped (they are cached)
+        items = self.preview_items.get(path)
+        if not items:
+            return
+        pixmap = QPixmap()
+        if jpeg is None or not pixmap.loadFromData(jpeg, "JPG"):
+            for item in items:
+                item.setText(item.text() + "\n(no preview)")
+            return
+        icon = QIcon(pixmap.scaled(PREVIEW_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        for item in items:
+            item.setIcon(icon)
+
+    def open_image(self, item):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(item.data(Qt.UserRole)))
+
+    def done(self, result):
+        self.loader.close()
+        super().done(result)
@@ -0,0 +1,53 @@
+import math
+from array import array
+from GetEXIFTags import DJIImageInfo
+
+# DJIImageInfo slots stored as float64 columns (NaN = None); image_source is stored as a code
+NUMERIC_FIELDS = tuple(name for name in DJIImageInfo.__slots__ if name != 'image_source')
+NONE = float('nan')
+
+####################################################################
+
+class ShotTable:
+    """ Column store of (path, DJIImageInfo) records for a whole job.
+
+    One float64 array per numeric field, a small code per image source and a readable flag
+    take about 75 bytes per image plus the path, instead of a tuple, a DJIImageInfo and a
+    boxed float per field (~290 bytes), so 100k-image jobs stay small.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.columns = {name: array('d') for name in NUMERIC_FIELDS}
+        self.source_codes = array('H')
+        self.sources = [None]           # code -> image_source string; 0 = None
+        self._source_index = {None: 0}
+        self.readable = array('b')
+
+    def __len__(self):
+        return len(self.paths)
+
+    def append(self, path, info):
+        self.paths.append(path)
+        self.readable.append(info is not None)
+        for name, column in self.columns.items():
+            value = getattr(info, name) if info is not None else None
+            column.append(NONE if value is None else value)
+        source = info.image_source if info is not None else None
+        code = self._source_index.get(source)
+        if code is None:
+            code = self._source_index[source] = len(self.sources)
+            self.sources.append(source)
+        self.source_codes.append(code)
+
+    def capture_order(self):
+        """ Row indices sorted by capture time. Ties keep scan order and an image without a
+        time inherits the previous image's, so it stays next to the shots it was found with. """
+        times = array('d', self.columns['capture_time'])
+        last_time = float('-inf')
+        for index, capture_time in enumerate(times):
+            if math.isnan(capture_time):
+                times[index] = last_time
+            else:
+                last_time = capture_time
+        return array('l', sorted(range(len(times)), key=times.__getitem__))
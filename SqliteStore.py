@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import sqlite3
+
+# Commit (and evict) after this many writes, so a crash loses at most one batch
+DEFAULT_FLUSH_EVERY = 500
+# ... or once the oldest uncommitted write is this old: the open write transaction locks the
+# file for every other job and process sharing it (they give up after SQLite's 30 s timeout)
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+def default_cache_dir():
+    """ Per-user cache directory for Pole.IO (LOCALAPPDATA / ~/Library/Caches / XDG_CACHE_HOME). """
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'PoleIO')
+
+####################################################################
+
+class SqliteStore:
+    """ One SQLite file in the per-user cache directory, keyed by image path: the base of
+    MetadataCache, FingerprintIndex, ThumbnailCache and PoleIndex.
+
+    Subclasses set FILE_NAME, TABLE and SCHEMA (the CREATE statements). With a
+    SCHEMA_VERSION, a file written with another version has TABLE dropped, not migrated.
+    Writes are committed every `flush_every` wrote() / touch() calls, or at the first wrote() once
+    `flush_interval` seconds have passed since the first uncommitted write; callers that go
+    quiet for a while (a watch waiting for files) flush() themselves. Rows marked with
+    touch() get their last_used bumped in bulk then, and past max_entries the least
+    recently used rows of TABLE are dropped.
+
+    Not thread-safe: callers sharing a store across threads lock around it.
+    """
+    FILE_NAME = None
+    TABLE = None
+    SCHEMA = ()
+    SCHEMA_VERSION = None
+
+    def __init__(self, path=None, max_entries=None, flush_every=DEFAULT_FLUSH_EVERY,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, check_same_thread=True):
+        if path is None:
+            path = os.path.join(default_cache_dir(), self.FILE_NAME)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._pending_writes = 0
+        self._first_write = None  # time.monotonic() of the first uncommitted write
+        self._touched = []
+
+        # Batch runs open one connection per job; wait on each other's commits instead of failing
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=check_same_thread)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if (self.SCHEMA_VERSION is not None
+                and self.conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION):
+            self.conn.execute(f"DROP TABLE IF EXISTS {self.TABLE}")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def touch(self, path):
+        """ Mark a row as used; last_used is bumped on flush instead of one UPDATE per hit.
+        Touches count towards flush_every like writes, so a read-only run stays bounded. """
+        self._touched.append(path)
+        self.wrote()
+
+    def wrote(self):
+        self._pending_writes += 1
+        now = time.monotonic()
+        if self._first_write is None:
+            self._first_write = now
+        if self._pending_writes >= self.flush_every or now - self._first_write >= self.flush_interval:
+            self._flush()
+
+    def flush(self):
+        """ Commit what is pending (a no-op when nothing is). """
+        if self._pending_writes or self._touched:
+            self._flush()
+
+    def evict(self):
+        """ Drop the least recently used rows once the table grows past max_entries. """
+        if self.max_entries is None:
+            return
+        count = self.conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE path IN"
+                f" (SELECT path FROM {self.TABLE} ORDER BY last_used LIMIT ?)", (excess,))
+
+    def close(self):
+        try:
+            self._flush()
+        finally:
+            self.conn.close()
+
+    def _flush(self):
+        if self._touched:
+            now = time.time()
+            self.conn.executemany(f"UPDATE {self.TABLE} SET last_used = ? WHERE path = ?",
+                                  ((now, path) for path in self._touched))
+            self._touched = []
+        self._pending_writes = 0
+        self._first_write = None
+        self.evict()
+        self.conn.commit()
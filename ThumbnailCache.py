@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from GetEXIFTags import extract_exif_thumbnail
+from LogChannel import ignore
+from MetadataCache import CACHE_MISS
+from SqliteStore import SqliteStore
+
+THUMBNAIL_CACHE_NAME = 'thumbnails.sqlite'
+# DJI EXIF thumbnails are ~5-15 KB, so the default cap keeps the file around 200 MB
+DEFAULT_MAX_THUMBNAILS = 20000
+# Commit (and evict) after this many writes
+THUMBNAIL_FLUSH_EVERY = 50
+DEFAULT_THUMBNAIL_WORKERS = 4
+
+####################################################################
+
+class ThumbnailCache(SqliteStore):
+    """ Persistent map of image path -> embedded EXIF thumbnail (JPEG bytes), invalidated by
+    file size + mtime. An image without a thumbnail is stored too (as None), so it is not
+    read again.
+
+    Unlike MetadataCache it is shared by the ThumbnailLoader threads: every access takes
+    a lock around the one connection.
+    """
+    FILE_NAME = THUMBNAIL_CACHE_NAME
+    TABLE = 'thumbnails'
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS thumbnails ("
+              " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, jpeg BLOB, last_used REAL)",
+              "CREATE INDEX IF NOT EXISTS thumbnails_last_used ON thumbnails (last_used)")
+
+    def __init__(self, cache_path=None, max_entries=DEFAULT_MAX_THUMBNAILS):
+        super().__init__(cache_path, max_entries, flush_every=THUMBNAIL_FLUSH_EVERY, check_same_thread=False)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, image_path, size, mtime_ns):
+        """ Cached thumbnail bytes (or None) for the file, CACHE_MISS if unknown or changed. """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, jpeg FROM thumbnails WHERE path = ?", (image_path,)).fetchone()
+            if row is None or row[0] != size or row[1] != mtime_ns:
+                self.misses += 1
+                return CACHE_MISS
+            self.hits += 1
+            self.touch(image_path)
+            return bytes(row[2]) if row[2] is not None else None
+
+    def put(self, image_path, size, mtime_ns, jpeg):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thumbnails (path, size, mtime_ns, jpeg, last_used) VALUES (?, ?, ?, ?, ?)",
+                (image_path, size, mtime_ns, jpeg, time.time()))
+            self.wrote()
+
+    def flush(self):
+        with self._lock:
+            super().flush()
+
+    def close(self):
+        with self._lock:
+            super().close()
+
+####################################################################
+
+class ThumbnailLoader:
+    """ Fetches EXIF thumbnails on a small thread pool, from the ThumbnailCache when the
+    file hasn't changed, else from the image's JPEG headers.
+
+    request(path) is asynchronous: on_ready(path, jpeg_bytes_or_None) is called from a
+    pool thread once the thumbnail is there. Requests already in flight for a path are
+    not repeated; cancel_pending() drops the ones that have not started (e.g. when the
+    reviewer moves on to another pole).
+    """
+
+    def __init__(self, cache=None, max_workers=DEFAULT_THUMBNAIL_WORKERS, on_ready=None, log=None):
+        self.cache = cache
+        self.on_ready = on_ready or ignore
+        self.log = log or ignore
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def request(self, image_path):
+        with self._lock:
+            if self._closed or image_path in self._pending:
+                return
+            self._pending[image_path] = self._pool.submit(self._load, image_path)
+
+    def cancel_pending(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending = {path: future for path, future in self._pending.items() if not future.cancelled()}
+
+    def close(self):
+        """ Drop queued requests, wait for the running ones and close the cache. """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.cancel_pending()
+        self._pool.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    def load(self, image_path):
+        """ The thumbnail of one image, synchronously (cache first). """
+        try:
+            stat = os.stat(image_path)
+        except OSError as e:
+            self.log(f"No preview for {image_path}: {e}")
+            return None
+        if self.cache is not None:
+            jpeg = self.cache.get(image_path, stat.st_size, stat.st_mtime_ns)
+            if jpeg is not CACHE_MISS:
+                return jpeg
+        jpeg = extract_exif_thumbnail(image_path)
+        if self.cache is not None:
+            self.cache.put(image_path, stat.st_size, stat.st_mtime_ns, jpeg)
+        return jpeg
+
+    def _load(self, image_path):
+        try:
+            jpeg = self.load(image_path)
+        except Exception as e:
+            self.log(f"Could not load the preview of {image_path}: {e}")
+            jpeg = None
+        finally:
+            with self._lock:
+                self._pending.pop(image_path, None)
+        self.on_ready(image_path, jpeg)
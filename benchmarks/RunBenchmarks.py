@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+# Headless benchmark of the Pole.IO pipeline, stage by stage, on a synthetic flight (or a real
+# folder). Run from anywhere:
+#
+#   python benchmarks/RunBenchmarks.py [--poles 50] [--size 4000000] [--stages legacy,info,pool]
+#   python benchmarks/RunBenchmarks.py --folder /media/sdcard --json results.json
+#
+# Per stage it reports wall time, images/s, bytes read per image (Linux /proc/self/io) and
+# peak Python memory (tracemalloc, measured in a second pass so it doesn't skew the timing).
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GetEXIFTags import extract_dji_metadata, extract_dji_info, extract_value_from_xmp
+from MetadataPool import iter_metadata
+from MetadataCache import MetadataCache
+from PoleCore import PoleSequencer, PoleVerifier, collect_images
+from ShotTable import ShotTable
+from FolderScan import FolderScanner
+from LogChannel import INFO, ignore
+from SyntheticDJI import generate_flight, DEFAULT_POLES, DEFAULT_ORBITS, DEFAULT_FILE_SIZE
+
+####################################################################
+
+def read_bytes():
+    """ Bytes this process has read so far (rchar, page cache hits included), or None off Linux. """
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def drop_page_cache():
+    """ Make the next stage read from disk instead of RAM (root only). """
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return True
+    except OSError:
+        return False
+
+####################################################################
+# Stages: each takes the image list and returns how many images it handled
+
+def legacy_xmp_block(image_path):
+    """ The original extract_xmp_block: the whole file in memory, then two searches. """
+    with open(image_path, 'rb') as f:
+        img_data = f.read()
+    xmp_start = img_data.find(b'<x:xmpmeta')
+    xmp_end = img_data.find(b'</x:xmpmeta>') + 12
+    if xmp_start != -1 and xmp_end != -1:
+        return img_data[xmp_start:xmp_end].decode('utf-8', errors='ignore')
+    return None
+
+def stage_legacy(image_files, context):
+    """ The original per-image path: read the whole file to find the XMP block, then one
+    string search per tag (PIL's EXIF pass, which is not installed here, came on top). """
+    for image_path in image_files:
+        metadata = {'XMP': legacy_xmp_block(image_path)}
+        extract_value_from_xmp(metadata, 'drone-dji:GimbalPitchDegree', ignore)
+        extract_value_from_xmp(metadata, 'drone-dji:ImageSource', ignore)
+    return len(image_files)
+
+def stage_headers(image_files, context):
+    """ JPEG header walk (EXIF + XMP segments only) with the old per-tag string lookups. """
+    for image_path in image_files:
+        metadata = extract_dji_metadata(image_path)
+        extract_value_from_xmp(metadata, 'drone-dji:GimbalPitchDegree', ignore)
+        extract_value_from_xmp(metadata, 'drone-dji:ImageSource', ignore)
+    return len(image_files)
+
+def stage_info(image_files, context):
+    """ Header walk parsed into a DJIImageInfo in one regex pass (one thread). """
+    context['infos'] = [(image_path, extract_dji_info(image_path)) for image_path in image_files]
+    return len(image_files)
+
+def stage_pool(image_files, context):
+    """ extract_dji_info on the MetadataPool thread pool, no cache. """
+    return sum(1 for _ in iter_metadata(image_files, max_workers=context['workers']))
+
+def stage_cache(image_files, context):
+    """ MetadataPool answered from a warm MetadataCache (a re-run of the same folder). """
+    cache_path = os.path.join(context['scratch'], 'bench-cache.sqlite')
+    if not os.path.exists(cache_path):
+        cache = MetadataCache(cache_path)
+        for _ in iter_metadata(image_files, max_workers=context['workers'], cache=cache):
+            pass
+        cache.close()
+    cache = MetadataCache(cache_path)
+    try:
+        return sum(1 for _ in iter_metadata(image_files, max_workers=context['workers'], cache=cache))
+    finally:
+        cache.close()
+
+def stage_sequence(image_files, context):
+    """ The NADIR -> orbit -> zoom state machine alone, on metadata already in memory. """
+    if 'infos' not in context:
+        stage_info(image_files, context)
+    sequencer = PoleSequencer(log=ignore, log_level=context['log_level'])
+    for image_path, info in context['infos']:
+        sequencer.feed(image_path, info)
+    context['poles'] = sequencer.pole_count
+    return len(context['infos'])
+
+def stage_table(image_files, context):
+    """ The same sequencing as `sequence`, column-wise over a ShotTable (feed_table). """
+    if 'table' not in context:
+        if 'infos' not in context:
+            stage_info(image_files, context)
+        context['table'] = ShotTable()
+        for image_path, info in context['infos']:
+            context['table'].append(image_path, info)
+    sequencer = PoleSequencer(log=ignore, log_level=context['log_level'])
+    for _ in sequencer.feed_table(context['table']):
+        pass
+    context['poles'] = sequencer.pole_count
+    return len(context['table'])
+
+def stage_verify(image_files, context):
+    """ End to end: folder scan, pooled metadata, capture-time ordering and sequencing
+    (dry run, so the flight can be reused). """
+    verifier = PoleVerifier(FolderScanner(context['folder']), os.path.join(context['scratch'], 'out'),
+                            max_workers=context['workers'], use_cache=False, log=ignore,
+                            log_level=context['log_level'], dry_run=True)
+    report = verifier.run()
+    return report["summary"]["total_images_processed"]
+
+STAGES = {
+    'legacy': stage_legacy,
+    'headers': stage_headers,
+    'info': stage_info,
+    'pool': stage_pool,
+    'cache': stage_cache,
+    'sequence': stage_sequence,
+    'table': stage_table,
+    'verify': stage_verify,
+}
+
+####################################################################
+
+def run_stage(name, image_files, context, repeat=1, memory=True, cold=False):
+    """ Best-of-`repeat` timing of one stage, plus bytes read and peak traced memory. """
+    stage = STAGES[name]
+    best = None
+    for _ in range(repeat):
+        if cold:
+            drop_page_cache()
+        bytes_before = read_bytes()
+        start = time.perf_counter()
+        count = stage(image_files, context)
+        elapsed = time.perf_counter() - start
+        bytes_after = read_bytes()
+        if best is None or elapsed < best[0]:
+            best = (elapsed, count, None if bytes_before is None else bytes_after - bytes_before)
+
+    elapsed, count, bytes_read = best
+    result = {
+        "stage": name,
+        "images": count,
+        "seconds": elapsed,
+        "images_per_second": count / elapsed if elapsed > 0 else 0.0,
+        "bytes_per_image": bytes_read / count if bytes_read is not None and count else None,
+        "peak_memory": None,
+    }
+    if memory:
+        tracemalloc.start()
+        stage(image_files, context)
+        result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def format_size(size):
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def print_results(results):
+    print(f"{'stage':<10} {'images':>7} {'seconds':>9} {'images/s':>10} {'read/image':>11} {'peak mem':>10}")
+    for result in results:
+        print(f"{result['stage']:<10} {result['images']:>7} {result['seconds']:>9.3f} "
+              f"{result['images_per_second']:>10.1f} {format_size(result['bytes_per_image']):>11} "
+              f"{format_size(result['peak_memory']):>10}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Pole.IO pipeline stage by stage")
+    parser.add_argument("--folder", help="benchmark an existing image folder instead of a synthetic flight")
+    parser.add_argument("--poles", type=int, default=DEFAULT_POLES)
+    parser.add_argument("--orbits", type=int, default=DEFAULT_ORBITS)
+    parser.add_argument("--size", type=int, default=DEFAULT_FILE_SIZE, help="bytes per synthetic image")
+    parser.add_argument("--faults", type=int, default=7,
+                        help="make every Nth pole faulty (short orbit, missing / duplicate shots); 0 = none")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated, from: " + ", ".join(STAGES))
+    parser.add_argument("--workers", type=int, default=None, help="MetadataPool threads (default: its own)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is reported")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--cold", action="store_true", help="drop the page cache before each run (needs root)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic flight and cache")
+    args = parser.parse_args(argv)
+
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    if args.cold and not drop_page_cache():
+        print("Can't drop the page cache (not root?), timings are warm-cache", file=sys.stderr)
+        args.cold = False
+
+    scratch = tempfile.mkdtemp(prefix="poleio-bench-")
+    try:
+        folder = args.folder
+        if folder is None:
+            folder = os.path.join(scratch, "flight")
+            faults = args.faults
+            count = generate_flight(folder, args.poles, args.orbits, args.size,
+                                    short_orbit_every=faults, missing_nadir_every=faults and faults * 2,
+                                    missing_zoom_every=faults and faults * 3,
+                                    duplicate_nadir_every=faults and faults * 4,
+                                    duplicate_zoom_every=faults and faults * 5)
+            print(f"Generated {count} images of {format_size(args.size)} in {folder}")
+
+        image_files = collect_images(folder)
+        context = {'folder': folder, 'scratch': scratch, 'workers': args.workers, 'log_level': INFO}
+        results = []
+        for name in stages:
+            results.append(run_stage(name, image_files, context, repeat=max(1, args.repeat),
+                                     memory=not args.no_memory, cold=args.cold))
+        print_results(results)
+        if 'poles' in context:
+            print(f"Poles counted: {context['poles']}")
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({"folder": args.folder, "poles": args.poles, "orbits": args.orbits, "size": args.size,
+                           "images": len(image_files), "cold": args.cold, "results": results}, f, indent=2)
+    finally:
+        if args.keep:
+            print(f"Kept {scratch}")
+        else:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+
+# Synthetic DJI flight generator for the benchmarks: JPEGs with the same header layout as a
+# Zenmuse H20 / M30 capture (JFIF, EXIF APP1 with GPS and an IFD1 thumbnail, XMP APP1 with the
+# drone-dji fields and packet padding, quantisation tables, SOS) followed by filler "scan" data.
+# The pixels don't decode; only the headers matter to Pole.IO.
+#
+#   python benchmarks/SyntheticDJI.py <folder> [--poles 50] [--orbits 30] [--size 6000000] ...
+
+# Defaults close to a real pole inspection flight
+DEFAULT_POLES = 20
+DEFAULT_ORBITS = 30
+DEFAULT_FILE_SIZE = 2 * 1024 * 1024  # Real wide shots are 4-8 MB; smaller keeps generation quick
+DEFAULT_THUMBNAIL_SIZE = 10 * 1024
+IMAGES_PER_FOLDER = 999              # DJI starts a new xxxMEDIA folder after 999 files
+SHOT_INTERVAL = 2.0                  # Seconds between orbit shots
+POLE_INTERVAL = 45.0                 # Seconds flying from one pole to the next
+START_TIME = 1714557600              # 2024-05-01 10:00:00
+XMP_PADDING = 2048                   # Writers leave room to edit the packet in place
+
+####################################################################
+
+def _segment(code, payload):
+    return b'\xff' + bytes([code]) + struct.pack('>H', len(payload) + 2) + payload
+
+def _filler(rng, size):
+    # Entropy-coded data never holds a bare 0xFF, so neither does the filler
+    return rng.randbytes(size).replace(b'\xff', b'\xfe')
+
+def build_tiff(capture_time, latitude, longitude, altitude, thumbnail):
+    """ Little-endian TIFF: IFD0 (Make, Model, Exif / GPS pointers) -> Exif IFD
+    (DateTimeOriginal, SubSecTimeOriginal, MakerNote), GPS IFD, and IFD1 pointing at a
+    JPEG thumbnail. """
+    date_time = time.strftime('%Y:%m:%d %H:%M:%S', time.gmtime(capture_time)).encode() + b'\x00'
+    sub_sec = f"{int((capture_time % 1) * 1000):03d}".encode() + b'\x00'
+
+    def rational_dms(value):
+        value = abs(value)
+        degrees = int(value)
+        minutes = int((value - degrees) * 60)
+        seconds = round(((value - degrees) * 60 - minutes) * 60 * 10000)
+        return struct.pack('<6L', degrees, 1, minutes, 1, seconds, 10000)
+
+    # (tag, type, value bytes); values over 4 bytes go to the data area, None = filled in below
+    ifd0 = [(0x010F, 2, b'DJI\x00'), (0x0110, 2, b'ZH20T\x00'), (0x8769, 4, None), (0x8825, 4, None)]
+    exif = [(36867, 2, date_time), (37521, 2, sub_sec), (37500, 7, b'DJI\x00' + bytes(60))]
+    gps = [(1, 2, b'N\x00' if latitude >= 0 else b'S\x00'), (2, 5, rational_dms(latitude)),
+           (3, 2, b'E\x00' if longitude >= 0 else b'W\x00'), (4, 5, rational_dms(longitude)),
+           (6, 5, struct.pack('<2L', int(altitude * 1000), 1000))]
+    ifd1 = [(0x0103, 3, struct.pack('<H', 6)), (0x0201, 4, None), (0x0202, 4, struct.pack('<L', len(thumbnail)))]
+
+    ifds = [ifd0, exif, gps, ifd1]
+    offsets = []
+    offset = 8
+    for entries in ifds:
+        offsets.append(offset)
+        offset += 2 + len(entries) * 12 + 4
+    data_start = offset
+
+    data = bytearray()
+
+    def place(value):
+        position = data_start + len(data)
+        data.extend(value)
+        if len(data) % 2:
+            data.extend(b'\x00')
+        return position
+
+    thumbnail_offset = None
+    out = bytearray(b'II*\x00' + struct.pack('<L', offsets[0]))
+    sizes = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1}
+    for index, entries in enumerate(ifds):
+        out += struct.pack('<H', len(entries))
+        for tag, field_type, value in entries:
+            if tag == 0x8769:
+                value = struct.pack('<L', offsets[1])
+            elif tag == 0x8825:
+                value = struct.pack('<L', offsets[2])
+            elif tag == 0x0201:
+                thumbnail_offset = len(out) + 8
+                value = struct.pack('<L', 0)  # Patched once the thumbnail is placed
+            count = len(value) // sizes[field_type]
+            if len(value) <= 4:
+                out += struct.pack('<HHL', tag, field_type, count) + value.ljust(4, b'\x00')
+            else:
+                out += struct.pack('<HHLL', tag, field_type, count, place(value))
+        next_ifd = offsets[3] if index == 0 else 0  # IFD0 -> IFD1 chain
+        out += struct.pack('<L', next_ifd)
+    out += data
+    out[thumbnail_offset:thumbnail_offset + 4] = struct.pack('<L', len(out))
+    out += thumbnail
+    return bytes(out)
+
+def build_xmp(pitch, source, yaw, latitude, longitude, relative_altitude, absolute_altitude):
+    fields = {
+        'AbsoluteAltitude': f"{absolute_altitude:+.3f}",
+        'RelativeAltitude': f"{relative_altitude:+.3f}",
+        'GpsLatitude': f"{latitude:.9f}",
+        'GpsLongtitude': f"{longitude:.9f}",  # Sic, as written by DJI firmware
+        'GimbalRollDegree': "+0.00",
+        'GimbalYawDegree': f"{yaw:+.2f}",
+        'GimbalPitchDegree': f"{pitch:+.2f}",
+        'FlightRollDegree': "+1.20",
+        'FlightYawDegree': f"{yaw:+.2f}",
+        'FlightPitchDegree': "-2.30",
+        'CamReverse': "0",
+        'GimbalReverse': "0",
+        'SelfData': "Undefined",
+        'RtkFlag': "50",
+        'ImageSource': source,
+    }
+    attributes = "\n   ".join(f'drone-dji:{name}="{value}"' for name, value in fields.items())
+    return ('<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>\n'
+            '<x:xmpmeta xmlns:x="adobe:ns:meta/">\n'
+            ' <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">\n'
+            '  <rdf:Description rdf:about="DJI Meta Data"\n'
+            '   xmlns:tiff="http://ns.adobe.com/tiff/1.0/"\n'
+            '   xmlns:drone-dji="http://www.dji.com/drone-dji/1.0/"\n'
+            f'   {attributes}>\n'
+            '  </rdf:Description>\n'
+            ' </rdf:RDF>\n'
+            '</x:xmpmeta>\n'
+            + ' ' * XMP_PADDING +
+            '\n<?xpacket end="w"?>')
+
+def write_dji_jpeg(path, pitch, source, capture_time, size=DEFAULT_FILE_SIZE, yaw=0.0,
+                   latitude=45.5034, longitude=-73.2514, relative_altitude=30.1,
+                   thumbnail_size=DEFAULT_THUMBNAIL_SIZE, rng=None):
+    """ Write one synthetic DJI JPEG of about `size` bytes. """
+    rng = rng or random.Random(0)
+    thumbnail = b'\xff\xd8' + _filler(rng, max(0, thumbnail_size - 4)) + b'\xff\xd9'
+    tiff = build_tiff(capture_time, latitude, longitude, relative_altitude + 60, thumbnail)
+    xmp = build_xmp(pitch, source, yaw, latitude, longitude, relative_altitude, relative_altitude + 60)
+
+    header = b'\xff\xd8'
+    header += _segment(0xE0, b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00')
+    header += _segment(0xE1, b'Exif\x00\x00' + tiff)
+    header += _segment(0xE1, b'http://ns.adobe.com/xap/1.0/\x00' + xmp.encode('utf-8'))
+    header += _segment(0xDB, b'\x00' + bytes(range(1, 65)))
+    header += _segment(0xDB, b'\x01' + bytes(range(2, 66)))
+    header += _segment(0xC0, b'\x08\x0b\xb8\x0f\xa0\x03\x01\x21\x00\x02\x11\x01\x03\x11\x01')
+    header += _segment(0xDA, b'\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00')
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(_filler(rng, max(0, size - len(header) - 2)))
+        f.write(b'\xff\xd9')
+
+####################################################################
+
+def generate_flight(folder, poles=DEFAULT_POLES, orbits=DEFAULT_ORBITS, file_size=DEFAULT_FILE_SIZE,
+                    short_orbit_every=0, missing_nadir_every=0, missing_zoom_every=0,
+                    duplicate_nadir_every=0, duplicate_zoom_every=0, images_per_folder=IMAGES_PER_FOLDER,
+                    thumbnail_size=DEFAULT_THUMBNAIL_SIZE, seed=0):
+    """ Write a flight of `poles` NADIR -> orbit -> zoom sequences into DJI-style
+    xxxMEDIA folders below `folder`.
+
+    Every Nth pole can be made faulty: short_orbit_every (too few orbit shots),
+    missing_nadir_every, missing_zoom_every, duplicate_nadir_every, duplicate_zoom_every.
+    The same arguments and seed always write the same files. Returns the number of images.
+    """
+    rng = random.Random(seed)
+    shots = []  # (pitch, source)
+    for pole in range(1, poles + 1):
+        faulty = lambda every: every and pole % every == 0
+        orbit_count = orbits if not faulty(short_orbit_every) else max(1, orbits // 3)
+        pole_shots = []
+        if not faulty(missing_nadir_every):
+            pole_shots.append((-90.0, "WideCamera"))
+            if faulty(duplicate_nadir_every):
+                pole_shots.append((-90.0, "WideCamera"))
+        for _ in range(orbit_count):
+            pole_shots.append((round(rng.uniform(-45.0, -15.0), 1), "WideCamera"))
+        if not faulty(missing_zoom_every):
+            pole_shots.append((-30.0, "ZoomCamera"))
+            if faulty(duplicate_zoom_every):
+                pole_shots.append((-30.0, "ZoomCamera"))
+        shots.append(pole_shots)
+
+    capture_time = float(START_TIME)
+    latitude, longitude = 45.5034, -73.2514
+    count = 0
+    for pole_shots in shots:
+        latitude += 0.0004
+        longitude += rng.uniform(-0.0002, 0.0002)
+        for index, (pitch, source) in enumerate(pole_shots):
+            media_folder = os.path.join(folder, f"DCIM/{100 + count // images_per_folder}MEDIA")
+            if count % images_per_folder == 0:
+                os.makedirs(media_folder, exist_ok=True)
+            suffix = "Z" if source == "ZoomCamera" else "W"
+            stamp = time.strftime('%Y%m%d%H%M%S', time.gmtime(capture_time))
+            path = os.path.join(media_folder, f"DJI_{stamp}_{count % images_per_folder + 1:04d}_{suffix}.JPG")
+            write_dji_jpeg(path, pitch, source, capture_time, size=file_size, yaw=index * 12.0 % 360 - 180,
+                           latitude=latitude, longitude=longitude, thumbnail_size=thumbnail_size, rng=rng)
+            capture_time += SHOT_INTERVAL + rng.randint(0, 999) / 1000.0
+            count += 1
+        capture_time += POLE_INTERVAL
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic DJI pole inspection flight")
+    parser.add_argument("folder")
+    parser.add_argument("--poles", type=int, default=DEFAULT_POLES)
+    parser.add_argument("--orbits", type=int, default=DEFAULT_ORBITS)
+    parser.add_argument("--size", type=int, default=DEFAULT_FILE_SIZE, help="bytes per image")
+    parser.add_argument("--short-orbit-every", type=int, default=0)
+    parser.add_argument("--missing-nadir-every", type=int, default=0)
+    parser.add_argument("--missing-zoom-every", type=int, default=0)
+    parser.add_argument("--duplicate-nadir-every", type=int, default=0)
+    parser.add_argument("--duplicate-zoom-every", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    count = generate_flight(args.folder, args.poles, args.orbits, args.size,
+                            args.short_orbit_every, args.missing_nadir_every, args.missing_zoom_every,
+                            args.duplicate_nadir_every, args.duplicate_zoom_every, seed=args.seed)
+    print(f"Wrote {count} images for {args.poles} poles to {args.folder}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
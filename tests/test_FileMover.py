@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FileMover import (FileMover, MoveJournal, JOURNAL_NAME, PARTIAL_SUFFIX, recover_moves, rewind_moves)
+from LogChannel import ignore
+
+class FileMoverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'in')
+        self.output = os.path.join(self.folder, 'out')
+        os.makedirs(self.source)
+        os.makedirs(self.output)
+        self.journal_path = os.path.join(self.output, JOURNAL_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def make(self, *names):
+        paths = []
+        for name in names:
+            path = os.path.join(self.source, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            paths.append(path)
+        return paths
+
+    def out(self, name):
+        return os.path.join(self.output, name)
+
+    def crash(self, run_id, batch_id, moves, moved=()):
+        """ Journal what a run that died in the middle of a batch leaves behind. """
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps({"run": run_id, "batch": batch_id, "op": "begin", "moves": moves}) + "\n")
+            for src, dst in moved:
+                os.rename(src, dst)
+                f.write(json.dumps({"run": run_id, "batch": batch_id, "op": "moved", "src": src, "dst": dst}) + "\n")
+
+    def test_batch_moves_and_journal_is_removed(self):
+        paths = self.make('a.JPG', 'b.JPG')
+        moved = []
+        mover = FileMover(self.output, log=ignore, on_files_moved=lambda batch_id, done: moved.extend(done))
+        self.assertTrue(mover.submit(1, paths).result())
+        mover.close()
+        self.assertEqual(sorted(os.listdir(self.source)), [])
+        self.assertEqual(sorted(dst for _, dst in moved), [self.out('a.JPG'), self.out('b.JPG')])
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_failed_batch_is_rolled_back(self):
+        paths = self.make('a.JPG', 'b.JPG')
+        done = []
+        mover = FileMover(self.output, max_workers=1, log=ignore,
+                          on_batch_done=lambda batch_id, ok: done.append((batch_id, ok)))
+        self.assertFalse(mover.submit(1, paths + [os.path.join(self.source, 'gone.JPG')]).result())
+        mover.close()
+        self.assertEqual(done, [(1, False)])
+        self.assertEqual(sorted(os.listdir(self.source)), ['a.JPG', 'b.JPG'])
+        self.assertFalse(os.path.exists(self.out('a.JPG')))
+
+    def test_clashing_names_get_a_suffix(self):
+        os.makedirs(os.path.join(self.source, 'sub'))
+        first = self.make('a.JPG')
+        second = self.make(os.path.join('sub', 'a.JPG'))
+        mover = FileMover(self.output, log=ignore)
+        mover.submit(1, first).result()
+        mover.submit(2, second).result()
+        mover.close()
+        self.assertTrue(os.path.exists(self.out('a.JPG')))
+        self.assertTrue(os.path.exists(self.out('a_1.JPG')))
+
+    def test_later_run_does_not_hide_an_open_batch(self):
+        crashed = self.make('a.JPG', 'b.JPG')
+        self.crash('old', 1, [[crashed[0], self.out('a.JPG')], [crashed[1], self.out('b.JPG')]],
+                   moved=[(crashed[0], self.out('a.JPG'))])
+        # A fresh run commits its own pole #1 into the same folder
+        mover = FileMover(self.output, log=ignore, run_id='new')
+        self.assertTrue(mover.keep_journal)
+        mover.submit(1, self.make('c.JPG')).result()
+        mover.close()
+
+        batches = MoveJournal(self.journal_path).batches()
+        self.assertEqual(sorted(batches), ['new:1', 'old:1'])
+        self.assertEqual(list(MoveJournal(self.journal_path).open_batches()), ['old:1'])
+
+        self.assertEqual(recover_moves(self.output, log=ignore), 1)
+        self.assertEqual(sorted(os.listdir(self.source)), ['a.JPG', 'b.JPG'])
+        self.assertTrue(os.path.exists(self.out('c.JPG')))
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_recover_finishes_and_removes_partial_copies(self):
+        paths = self.make('a.JPG', 'b.JPG')
+        self.crash('old', 1, [[paths[0], self.out('a.JPG')], [paths[1], self.out('b.JPG')]],
+                   moved=[(paths[0], self.out('a.JPG'))])
+        with open(self.out('b.JPG') + PARTIAL_SUFFIX, 'w') as f:
+            f.write('b')
+        self.assertEqual(recover_moves(self.output, resume=True, log=ignore), 1)
+        self.assertEqual(sorted(os.listdir(self.output)), ['a.JPG', 'b.JPG'])
+        self.assertEqual(os.listdir(self.source), [])
+
+    def test_rewind_only_touches_its_own_run(self):
+        older = self.make('a.JPG')
+        mover = FileMover(self.output, log=ignore, run_id='old')
+        mover.submit(5, older).result()
+        mover.journal.close()  # Left behind as if the process had died
+        mine = self.make('b.JPG', 'c.JPG')
+        mover = FileMover(self.output, log=ignore, run_id='mine')
+        mover.submit(1, mine[:1]).result()
+        mover.submit(2, mine[1:]).result()
+        mover.journal.close()
+
+        finished = []
+        rewind_moves(self.output, 'mine', 1, log=ignore, on_files_moved=lambda *args: finished.append(args))
+        # Pole #2 came after the checkpoint and is undone; the older run's #5 stays
+        self.assertEqual(sorted(os.listdir(self.source)), ['c.JPG'])
+        self.assertTrue(os.path.exists(self.out('a.JPG')))
+        self.assertTrue(os.path.exists(self.out('b.JPG')))
+        self.assertEqual(finished, [])
+
+    def test_rebegun_batch_is_kept_apart(self):
+        paths = self.make('a.JPG')
+        with open(self.journal_path, 'w') as f:
+            for op in ({"op": "begin", "moves": [[paths[0], self.out('a.JPG')]]}, {"op": "rollback"},
+                       {"op": "begin", "moves": [[paths[0], self.out('a_1.JPG')]]}):
+                f.write(json.dumps(dict(op, run='mine', batch=3)) + "\n")
+        batches = MoveJournal(self.journal_path).batches()
+        self.assertEqual([(key, batch["state"]) for key, batch in batches.items()],
+                         [('mine:3', 'rollback'), ('mine:3#2', 'open')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GetEXIFTags import parse_dji_xmp
+
+ATTRIBUTE_XMP = ('<rdf:Description drone-dji:GimbalPitchDegree="-90.0" drone-dji:ImageSource="WideCamera"'
+                 ' drone-dji:GpsLatitude="+45.5038" drone-dji:GpsLongtitude="-73.2514"/>')
+
+ELEMENT_XMP = '''<rdf:Description>
+ <drone-dji:GimbalPitchDegree>-30.5</drone-dji:GimbalPitchDegree>
+ <drone-dji:ImageSource>ZoomCamera</drone-dji:ImageSource>
+ <drone-dji:RelativeAltitude>+41.20</drone-dji:RelativeAltitude>
+ <drone-dji:GpsLongitude>-73.2514</drone-dji:GpsLongitude>
+ <drone-dji:GpsLongtitude>12.0</drone-dji:GpsLongtitude>
+</rdf:Description>'''
+
+class ParseDJIXMPTest(unittest.TestCase):
+
+    def test_attribute_form(self):
+        info = parse_dji_xmp(ATTRIBUTE_XMP)
+        self.assertEqual(info.gimbal_pitch, -90.0)
+        self.assertEqual(info.image_source, "WideCamera")
+        self.assertEqual(info.latitude, 45.5038)
+        self.assertEqual(info.longitude, -73.2514)
+
+    def test_element_form(self):
+        info = parse_dji_xmp(ELEMENT_XMP)
+        self.assertEqual(info.gimbal_pitch, -30.5)
+        self.assertEqual(info.image_source, "ZoomCamera")
+        self.assertEqual(info.relative_altitude, 41.2)
+
+    def test_first_value_wins(self):
+        self.assertEqual(parse_dji_xmp(ELEMENT_XMP).longitude, -73.2514)
+
+if __name__ == '__main__':
+    unittest.main()
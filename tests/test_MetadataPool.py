@@ -0,0 +1,49 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MetadataCache import MetadataCache, CACHE_MISS
+from MetadataPool import iter_metadata, _stat_key
+
+class IterMetadataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.plain = os.path.join(self.folder, 'plain.JPG')
+        with open(self.plain, 'wb') as f:
+            f.write(b'no XMP in here')
+        # Stat'able but not readable as a file: stands in for a read error (EIO on a NAS)
+        self.broken = os.path.join(self.folder, 'broken.JPG')
+        os.makedirs(self.broken)
+        self.cache = MetadataCache(os.path.join(self.folder, 'metadata.sqlite'))
+        self.logged = []
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.folder)
+
+    def log(self, message, color, level):
+        self.logged.append(message)
+
+    def check(self, max_workers):
+        results = list(iter_metadata([self.broken, self.plain], max_workers=max_workers,
+                                     cache=self.cache, log=self.log))
+        self.assertEqual(results, [(self.broken, None), (self.plain, None)])
+        self.assertEqual(len(self.logged), 1)
+        self.assertIn(self.broken, self.logged[0])
+        # Only the definite "no DJI XMP" is cached
+        self.assertIsNone(self.cache.get(self.plain, *_stat_key(self.plain)))
+        self.assertIs(self.cache.get(self.broken, *_stat_key(self.broken)), CACHE_MISS)
+
+    def test_read_error_is_logged_not_cached_inline(self):
+        self.check(max_workers=1)
+
+    def test_read_error_is_logged_not_cached_on_the_pool(self):
+        self.check(max_workers=4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from PoleCore import PoleSequencer, PoleVerifier, ORDER_BY_CAPTURE, ORDER_BY_NAME, write_manifest
+from PoleRules import PoleRules
+from ShotTable import ShotTable
+from GetEXIFTags import DJIImageInfo
+from LogChannel import DEBUG, INFO, LogChannel, ignore
+from SyntheticDJI import write_dji_jpeg, START_TIME
+
+class NadirZoomPoleTest(unittest.TestCase):
+    """ A zoom shot pointing straight down is the pole's NADIR and its zoom, in one file. """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'in')
+        self.output = os.path.join(self.folder, 'out')
+        os.makedirs(self.source)
+        os.makedirs(self.output)
+        self.paths = []
+        for index, (pitch, source) in enumerate(((-30.0, "WideCamera"), (-35.0, "WideCamera"),
+                                                 (-90.0, "ZoomCamera"))):
+            path = os.path.join(self.source, f"DJI_{index:04d}.JPG")
+            write_dji_jpeg(path, pitch, source, START_TIME + index * 2.0, size=4096)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def verify(self, order, dry_run=False):
+        verifier = PoleVerifier(list(self.paths), self.output, max_workers=1, use_cache=False, log=ignore,
+                                order=order, dry_run=dry_run, rules=PoleRules(min_orbit_shots=2),
+                                use_pole_index=False)
+        return verifier.run()
+
+    def test_moved_once(self):
+        for order in (ORDER_BY_NAME, ORDER_BY_CAPTURE):
+            with self.subTest(order=order):
+                report = self.verify(order)
+                entry, = report["sequences"]
+                self.assertTrue(entry["moved"])
+                self.assertEqual(entry["nadir"], entry["zoom"])
+                self.assertEqual(os.listdir(self.source), [])
+                self.assertEqual(sorted(name for name in os.listdir(self.output) if name.endswith('.JPG')),
+                                 ['DJI_0000.JPG', 'DJI_0001.JPG', 'DJI_0002.JPG'])
+                for path in self.paths:  # Put them back for the next order
+                    os.rename(os.path.join(self.output, os.path.basename(path)), path)
+
+    def test_manifest_counts_once(self):
+        report = self.verify(ORDER_BY_CAPTURE, dry_run=True)
+        manifest = write_manifest(report, os.path.join(self.folder, 'manifest.json'))
+        self.assertEqual([pole["count"] for pole in manifest["poles"]], [3])
+
+class FeedTableTest(unittest.TestCase):
+    """ feed_table() must leave the sequencer exactly as feeding the rows one by one does. """
+
+    def run_rows(self, rows, split, rules, use_table):
+        logged = []
+        poles = []
+        log = lambda message, color, level: logged.append((message, level))
+        on_pole = lambda number, sequence: poles.append((number, [(shot.path, shot.kind) for shot in sequence]))
+        # The first rows go through feed(), then a checkpoint restore, like a resumed run
+        sequencer = PoleSequencer(on_pole=on_pole, log=log, log_level=DEBUG, rules=rules)
+        for path, info in rows[:split]:
+            sequencer.feed(path, info)
+        resumed = PoleSequencer(on_pole=on_pole, log=log, log_level=DEBUG, rules=rules)
+        resumed.restore(sequencer.state())
+        rest = rows[split:]
+        table = ShotTable()
+        for path, info in rest:
+            table.append(path, info)
+        order = table.capture_order()
+        if use_table:
+            list(resumed.feed_table(table, order))
+        else:
+            for index in order:
+                resumed.feed(*rest[index])
+        resumed.finish()
+        return resumed.state(), poles, logged
+
+    def test_matches_feed(self):
+        rng = random.Random(5)
+        for trial in range(500):
+            rules = PoleRules(min_orbit_shots=rng.choice([0, 2, 4]))
+            rows = []
+            for index in range(rng.randint(0, 50)):
+                info = None
+                if rng.random() > 0.05:
+                    info = DJIImageInfo(gimbal_pitch=rng.choice([None, -90.0, -45.0]),
+                                        image_source=rng.choice([None, "ZoomCamera", "WideCamera", "WideCamera"]),
+                                        capture_time=rng.choice([None, float(index), float(index // 3)]))
+                rows.append((f"/flight/DJI_{index:04d}.JPG", info))
+            split = rng.randint(0, len(rows))
+            with self.subTest(trial=trial):
+                self.assertEqual(self.run_rows(rows, split, rules, use_table=True),
+                                 self.run_rows(rows, split, rules, use_table=False))
+
+class LogLevelTest(unittest.TestCase):
+
+    def test_follows_the_channel_level(self):
+        channel = LogChannel(level=INFO)
+        sequencer = PoleSequencer(log=channel.write, log_level=channel.get_level)
+        orbit = DJIImageInfo(gimbal_pitch=-30.0, image_source="WideCamera")
+        sequencer.feed('/flight/DJI_0001.JPG', orbit)
+        channel.set_level(DEBUG)  # Switched in the GUI while the job runs
+        sequencer.feed('/flight/DJI_0002.JPG', orbit)
+        self.assertEqual([message for _, message, _, _ in channel.drain()],
+                         ["Orbit shot detected: /flight/DJI_0002.JPG"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MetadataCache import MetadataCache, CACHE_MISS
+from MetadataPool import iter_metadata
+from Fingerprint import FingerprintIndex, iter_unique
+from SqliteStore import SqliteStore
+
+class CountStore(SqliteStore):
+    TABLE = 'files'
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, count INTEGER, last_used REAL)",)
+    SCHEMA_VERSION = 1
+
+    def put(self, path, count, last_used):
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (path, count, last_used))
+        self.wrote()
+
+    def paths(self):
+        return [row[0] for row in self.conn.execute("SELECT path FROM files ORDER BY path")]
+
+class SqliteStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'store.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_flush_evicts_least_recently_used(self):
+        store = CountStore(self.path, max_entries=2, flush_every=100)
+        for index, path in enumerate(('a', 'b', 'c')):
+            store.put(path, index, float(index))
+        store.touch('a')
+        store.close()
+
+        store = CountStore(self.path)
+        self.assertEqual(store.paths(), ['a', 'c'])
+        store.close()
+
+    def test_commits_every_flush_every_writes(self):
+        store = CountStore(self.path, flush_every=2)
+        store.put('a', 1, 0.0)
+        store.put('b', 2, 0.0)
+        other = CountStore(self.path)
+        self.assertEqual(other.paths(), ['a', 'b'])
+        other.close()
+        store.close()
+
+    def test_commits_once_the_first_write_is_old_enough(self):
+        store = CountStore(self.path, flush_every=100, flush_interval=0.0)
+        store.put('a', 1, 0.0)
+        other = CountStore(self.path)
+        self.assertEqual(other.paths(), ['a'])
+        other.close()
+        store.close()
+
+    def test_flush_releases_the_write_lock(self):
+        store = CountStore(self.path, flush_every=100)
+        store.put('a', 1, 0.0)
+        store.flush()
+        other = CountStore(self.path)
+        other.conn.execute("PRAGMA busy_timeout = 0")
+        other.put('b', 2, 0.0)
+        other.close()
+        store.close()
+
+    def test_touches_are_flushed_every_flush_every(self):
+        store = CountStore(self.path, flush_every=3)
+        store.put('a', 1, 0.0)
+        store.put('b', 2, 0.0)
+        store.put('c', 3, 0.0)
+        for _ in range(3):
+            store.touch('a')
+        self.assertEqual(store._touched, [])
+        other = CountStore(self.path)
+        self.assertGreater(other.conn.execute("SELECT last_used FROM files WHERE path = 'a'").fetchone()[0], 0.0)
+        other.close()
+        store.close()
+
+    def test_other_schema_version_is_dropped(self):
+        store = CountStore(self.path)
+        store.put('a', 1, 0.0)
+        store.close()
+        CountStore.SCHEMA_VERSION = 2
+        try:
+            store = CountStore(self.path)
+            self.assertEqual(store.paths(), [])
+            store.close()
+        finally:
+            CountStore.SCHEMA_VERSION = 1
+
+    def test_metadata_cache_round_trip(self):
+        cache = MetadataCache(self.path)
+        cache.put('/img/DJI_0001.JPG', 10, 20, None)
+        self.assertIsNone(cache.get('/img/DJI_0001.JPG', 10, 20))
+        self.assertIs(cache.get('/img/DJI_0001.JPG', 11, 20), CACHE_MISS)
+        cache.close()
+
+class LockedStoreTest(unittest.TestCase):
+    """ Another job holding the write lock on a shared file past the timeout. """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.images = []
+        for name in ('a.JPG', 'b.JPG', 'c.JPG'):
+            path = os.path.join(self.folder, name)
+            with open(path, 'wb') as f:
+                f.write(b'not a DJI image')
+            self.images.append(path)
+        self.logged = []
+
+    def tearDown(self):
+        self.other.rollback()
+        self.other.close()
+        shutil.rmtree(self.folder)
+
+    def lock(self, store):
+        store.conn.execute("PRAGMA busy_timeout = 0")
+        self.other = sqlite3.connect(store.path)
+        self.other.execute("BEGIN IMMEDIATE")
+
+    def log(self, message, color, level):
+        self.logged.append(message)
+
+    def test_metadata_carries_on_without_the_cache(self):
+        cache = MetadataCache(os.path.join(self.folder, 'metadata.sqlite'))
+        self.lock(cache)
+        results = list(iter_metadata(self.images, max_workers=1, cache=cache, log=self.log))
+        self.assertEqual([path for path, _ in results], self.images)
+        self.assertEqual(len(self.logged), 1)
+        cache.conn.close()
+
+    def test_dedupe_carries_on_without_the_index(self):
+        index = FingerprintIndex(os.path.join(self.folder, 'fingerprints.sqlite'))
+        self.lock(index)
+        self.assertEqual(list(iter_unique(self.images, index, max_workers=2, log=self.log)), self.images)
+        self.assertEqual(len(self.logged), 1)
+        index.conn.close()
+
+if __name__ == '__main__':
+    unittest.main()